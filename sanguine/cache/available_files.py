@@ -18,7 +18,7 @@ def _file_origins_task_func(param: tuple[list[bytes, str]]) -> tuple[list[tuple[
         # TODO: multi-picklecache for file origins
         origins = file_origins_for_file(fpath)
         if origins is None:
-            warn('Available: file without known origin {}'.format(fpath))
+            warn('Available: file without known origin {}', fpath)
         else:
             allorigins.append((fhash, origins))
     return (allorigins,)
@@ -159,7 +159,7 @@ class AvailableFiles:
                 if ext in all_archive_plugins_extensions():
                     self._root_data.start_hashing_archive(parallel, ar.file_path, ar.file_hash, ar.file_size)
                 else:
-                    warn('Available: file with unknown extension {}, ignored'.format(ar.file_path))
+                    warn('Available: file with unknown extension {}, ignored', ar.file_path)
 
     def _startorigins_owntask_datadeps(self) -> tasks.TaskDataDependencies:
         return tasks.TaskDataDependencies(
@@ -249,7 +249,8 @@ if __name__ == '__main__':
                                         [normalize_dir_path('../../../../MO2/downloads')],
                                         [GithubFolder('KTAGirl', 'KTA',
                                                       normalize_dir_path('../../../KTA\\'))], {})
-            with tasks.Parallel(None, dbg_serialize=False,
+            with tasks.Parallel(normalize_dir_path('../../../sanguine.cache\\') + 'availablefiles.weights.json',
+                                dbg_serialize=False,
                                 taskstatsofinterest=tavailable.stats_of_interest()) as tparallel:
                 tavailable.start_tasks(tparallel)
                 tparallel.run([])  # all necessary tasks were already added in acache.start_tasks()
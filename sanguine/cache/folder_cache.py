@@ -116,14 +116,16 @@ class _FolderScanStats:
 
 class _FolderScanDirOut:
     root: str
-    scanned_files: dict[str, FileOnDisk]
+    scanned_files: list[FileOnDisk]  # only within scanning task, main process gets scanned_table instead
+    scanned_table: tasks.SharedFileTableParam | None
     requested_dirs: list[str]
     requested_files: list[tuple[str, float, int]]
     scan_stats: dict[str, int]  # fpath -> nfiles
 
     def __init__(self, root: str) -> None:
         self.root = root
-        self.scanned_files = {}
+        self.scanned_files = []
+        self.scanned_table = None
         self.requested_dirs = []
         self.requested_files = []
         self.scan_stats = {}
@@ -140,12 +142,41 @@ def _scan_task_nf_threshold_heuristics() -> int:
     return int(sec_threshold * 20000)  # scans per second
 
 
-def _scan_task_time_estimate(nf: int) -> float:
-    return float(nf) / 20000.
+_SCAN_COST_FAMILY = 'sanguine.foldercache.scan'  # units: files (as of previous scan)
+_HASHING_COST_FAMILY = 'sanguine.foldercache.hash'  # units: bytes, items: files
 
 
-def _hashing_file_time_estimate(fsize: int) -> float:
-    return float(fsize) / 1048576. / 30.
+def _add_cost_families(parallel: tasks.Parallel) -> None:  # priors, Parallel will learn real costs
+    parallel.add_task_cost_family(_SCAN_COST_FAMILY, 0., 1. / 20000.)  # 20000 files/s
+    parallel.add_task_cost_family(_HASHING_COST_FAMILY, 0., 1. / 1048576. / 30.)  # 30 MByte/s
+
+
+def _describe_metrics(metrics: tasks.Metrics) -> None:  # per-worker rates come from Parallel's task units
+    metrics.describe('sanguine_foldercache_scanned_files_total', 'counter', 'Files scanned', ('cache',))
+    metrics.describe('sanguine_foldercache_hashed_files_total', 'counter', 'Files hashed', ('cache',))
+    metrics.describe('sanguine_foldercache_hashed_bytes_total', 'counter', 'Bytes hashed', ('cache',))
+
+
+def _scan_task_cost(nf: int) -> tasks.TaskCost:
+    return tasks.TaskCost(_SCAN_COST_FAMILY, float(nf))
+
+
+class _PublishedFilesByPath:
+    # read-only stand-in for dict[str, FileOnDisk], looking files up right in published sorted SharedFileTable;
+    #   scanning children don't need to unpickle (and keep) their own copies of the whole thing
+    table: tasks.SharedFileTableView
+
+    def __init__(self, table: tasks.SharedFileTableView) -> None:
+        self.table = table
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def get(self, fpath: str) -> FileOnDisk | None:
+        i = self.table.find(fpath)
+        if i < 0:
+            return None
+        return FileOnDisk(self.table.hash(i), self.table.mtime(i), fpath, self.table.size(i))
 
 
 ### Tasks
@@ -178,21 +209,28 @@ def _scan_folder_task_func(
     (pubfilesbypath,) = fromownload
     sdout = _FolderScanDirOut(tocache.folder)
     stats = _FolderScanStats()
-    filesbypath = tasks.from_publication(pubfilesbypath)
+    filesbypath = _PublishedFilesByPath(tasks.from_file_table_publication(pubfilesbypath))
     started = time.perf_counter()
     lfilesbypath = len(filesbypath)
     FolderCache.scan_dir(started, sdout, stats, tocache, tocache.folder, filesbypath, pubfilesbypath, name)
-    debug('FolderCache._scan_folder_task_func(): requested_files/requested_dirs/scanned_files={}/{}/{}'.format(
-        len(sdout.requested_files), len(sdout.requested_dirs), len(sdout.scanned_files)))
+    debug('FolderCache._scan_folder_task_func(): requested_files/requested_dirs/scanned_files={}/{}/{}',
+          len(sdout.requested_files), len(sdout.requested_dirs), len(sdout.scanned_files))
     assert len(filesbypath) == lfilesbypath
+    # there can be hundreds of thousands of scanned files, and main process needs only their paths,
+    #   so they go as SharedFileTable rather than as pickled FileOnDisks
+    files = sdout.scanned_files
+    sdout.scanned_table = tasks.make_shared_file_table_param(
+        tasks.SharedFileTable([f.file_path for f in files], [f.file_hash for f in files],
+                              [f.file_size for f in files], [f.file_modified for f in files]))
+    sdout.scanned_files = []
     return tocache, stats, sdout
 
 
-def _calc_hash_task_func(param: tuple[str, float, int]) -> tuple[FileOnDisk]:
+def _calc_hash_task_func(param: tuple[str, float, int]) -> FileOnDisk:  # per file within hashing TaskGroup
     (fpath, tstamp, fsize) = param
     s, h = calculate_file_hash(fpath)
     assert s == fsize
-    return (FileOnDisk(h, tstamp, fpath, fsize),)
+    return FileOnDisk(h, tstamp, fpath, fsize)
 
 
 def _save_files_task_func(
@@ -351,7 +389,7 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
                 if aidx == bidx:
                     continue
                 if FolderCache._two_folders_overlap(l[aidx].folder, l[aidx].exdirs, l[bidx].folder, l[bidx].exdirs):
-                    debug('FolderCache: {} overlaps {}'.format(l[aidx].folder, l[bidx].folder))
+                    debug('FolderCache: {} overlaps {}', l[aidx].folder, l[bidx].folder)
                     return True
         return False
 
@@ -367,6 +405,9 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
         return 'sanguine.foldercache.' + self.name + '.ownload'
 
     def _start_tasks(self, parallel: tasks.Parallel) -> None:
+        _add_cost_families(parallel)
+        _describe_metrics(parallel.metrics())
+
         # building tree of known scans
         allscantasks: list[tuple[FolderToCache, int]] = []  # [(tocache,nf)]
 
@@ -402,7 +443,7 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
                                                                     tt[0].exdirs)
 
         # ready to start tasks
-        scannedfiles = {}
+        scannedfiles = set()
         stats = _FolderScanStats()
 
         loadtaskname = 'sanguine.foldercache.' + self.name + '.load'
@@ -421,7 +462,7 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
             taskname = self._scanned_task_name(tocache.folder)
             task = tasks.Task(taskname, _scan_folder_task_func,
                               (tocache, self.name),
-                              [loadowntaskname], _scan_task_time_estimate(nf))
+                              [loadowntaskname], _scan_task_cost(nf))  # Python loop, so not a thread
             owntaskname = self._scanned_own_task_name(tocache.folder)
             owntask = tasks.OwnTask(owntaskname,
                                     lambda _, out: self._scan_folder_own_task_func(out, parallel, scannedfiles, stats),
@@ -486,7 +527,7 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
     @staticmethod
     def scan_dir(started: float, sdout: _FolderScanDirOut, stats: _FolderScanStats,
                  const_tocache: FolderToCache, dirpath: str,
-                 const_filesbypath: dict[str, FileOnDisk], pubfilesbypath: tasks.SharedPubParam,
+                 const_filesbypath: _PublishedFilesByPath, pubfilesbypath: tasks.SharedPubParam,
                  name: str) -> None:  # recursive over dir
         assert is_normalized_dir_path(dirpath)
         # recursive implementation: able to skip subtrees, but more calls (lots of os.listdir() instead of single os.walk())
@@ -509,7 +550,7 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
                 matched = False
                 if found is not None:
                     # debug('FolderCache: found {}'.format(fpath))
-                    sdout.scanned_files[fpath] = found
+                    sdout.scanned_files.append(found)
                     if found.file_hash is None:  # file in cache marked as deleted, re-adding
                         pass
                     else:
@@ -518,11 +559,11 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
                             matched = True
                             if found.file_size != st.st_size:
                                 warn(
-                                    'FolderCache: file size changed while timestamp did not for file {}, re-hashing it'.format(
-                                        fpath))
+                                    'FolderCache: file size changed while timestamp did not for file {}, re-hashing it',
+                                    fpath)
                                 matched = False
                 else:
-                    debug('FolderCache: not found {}'.format(fpath))
+                    debug('FolderCache: not found {}', fpath)
                 if not matched:
                     sdout.requested_files.append((fpath, tstamp, st.st_size))
             elif stat.S_ISDIR(fmode):
@@ -539,7 +580,7 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
                     FolderCache.scan_dir(started, sdout, stats, newtocache, newdir, const_filesbypath, pubfilesbypath,
                                          name)
             else:
-                critical('FolderCache: {} is neither dir or file, aborting'.format(fpath))
+                critical('FolderCache: {} is neither dir or file, aborting', fpath)
                 abort_if_not(False)
         assert dirpath not in sdout.scan_stats
         sdout.scan_stats[dirpath] = nf
@@ -559,13 +600,13 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
     def _reconcile_own_task_name(self) -> str:
         return 'sanguine.foldercache.' + self.name + '.reconcile'
 
-    def _hashing_task_name(self, fpath: str) -> str:
-        assert is_normalized_file_path(fpath)
-        return 'sanguine.foldercache.' + self.name + '.hash.' + fpath
+    def _hashing_task_name(self, dirpath: str) -> str:  # TaskGroup per scanned folder
+        assert is_normalized_dir_path(dirpath)
+        return 'sanguine.foldercache.' + self.name + '.hash.' + dirpath
 
-    def _hashing_own_task_name(self, fpath: str) -> str:
-        assert is_normalized_file_path(fpath)
-        return 'sanguine.foldercache.' + self.name + '.ownhash.' + fpath
+    def _hashing_own_task_name(self, dirpath: str) -> str:
+        assert is_normalized_dir_path(dirpath)
+        return 'sanguine.foldercache.' + self.name + '.ownhash.' + dirpath
 
     def _hashing_own_wildcard_task_name(self) -> str:
         return 'sanguine.foldercache.' + self.name + '.ownhash.' + '*'
@@ -593,17 +634,21 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
             tuple[tasks.SharedPubParam]:
         assert (self._state & 0x1) == 0
         self._state |= 0x1
-        debug('FolderCache.{}: started processing loading files'.format(self.name))
+        debug('FolderCache.{}: started processing loading files', self.name)
         (filesbypath, filteredfiles) = out
         assert self._files_by_path is None
         assert self._filtered_files == []
         self._files_by_path = filesbypath
         self._filtered_files = filteredfiles
 
-        debug('FolderCache.{}: almost processed loading files, preparing SharedPublication'.format(self.name))
-        self.pub_files_by_path = tasks.SharedPublication(parallel, self._files_by_path)
+        debug('FolderCache.{}: almost processed loading files, preparing SharedPublication', self.name)
+        files = self._files_by_path.values()
+        self.pub_files_by_path = tasks.SharedFileTablePublication(parallel, [f.file_path for f in files],
+                                                                  [f.file_hash for f in files],
+                                                                  [f.file_size for f in files],
+                                                                  [f.file_modified for f in files])
         pubparam = tasks.make_shared_publication_param(self.pub_files_by_path)
-        debug('FolderCache.{}: done processing loading files'.format(self.name))
+        debug('FolderCache.{}: done processing loading files', self.name)
         return (pubparam,)
 
     def _owncalchashtask_datadeps(self) -> tasks.TaskDataDependencies:
@@ -612,11 +657,16 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
             ['sanguine.foldercache.' + self.name + '.reconciled()'],
             [])
 
-    def _own_calc_hash_task_func(self, out: tuple[FileOnDisk], scannedfiles: dict[str, FileOnDisk]) -> None:
+    def _own_calc_hash_task_func(self, outs: list[FileOnDisk], scannedfiles: set[str],
+                                 metrics: tasks.Metrics) -> None:
         assert (self._state & 0x3) == 0x1
-        (f,) = out
-        scannedfiles[f.file_path] = f
-        self._files_by_path[f.file_path] = f
+        nbytes = 0
+        for f in outs:
+            scannedfiles.add(f.file_path)
+            self._files_by_path[f.file_path] = f
+            nbytes += f.file_size
+        metrics.inc('sanguine_foldercache_hashed_files_total', len(outs), (self.name,))
+        metrics.inc('sanguine_foldercache_hashed_bytes_total', nbytes, (self.name,))
 
     def _ownreconciletask_datadeps(self) -> tasks.TaskDataDependencies:
         return tasks.TaskDataDependencies(
@@ -626,27 +676,27 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
              'sanguine.foldercache.' + self.name + '.ready()'])
 
     def _own_reconcile_task_func(self, parallel: tasks.Parallel,
-                                 scannedfiles: dict[str, FileOnDisk]) -> None:
+                                 scannedfiles: set[str]) -> None:
         assert (self._state & 0x3) == 0x1
         self._state |= 0x2
 
-        info('FolderCache({}):{} files scanned'.format(self.name, len(scannedfiles)))
+        info('FolderCache({}):{} files scanned', self.name, len(scannedfiles))
         ndel = 0
         newfbypath = {}
         for file in self._files_by_path.values():
             fpath = file.file_path
             assert is_normalized_file_path(fpath)
-            if scannedfiles.get(fpath) is None:
+            if fpath not in scannedfiles:
                 # inhere = self._files_by_path.get(fpath)
                 # if inhere is not None and inhere.file_hash is None:  # special record is already present
                 #    continue
-                info('FolderCache: {} was deleted'.format(fpath))
+                info('FolderCache: {} was deleted', fpath)
                 # self._files_by_path[fpath] = FileOnDisk(None, None, fpath, None)
                 # not adding to newfbypath
                 ndel += 1
             else:
                 newfbypath[fpath] = file
-        info('FolderCache reconcile: {} files were deleted'.format(ndel))
+        info('FolderCache reconcile: {} files were deleted', ndel)
         assert len(newfbypath) + ndel == len(self._files_by_path)
         self._files_by_path = newfbypath
 
@@ -668,34 +718,39 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
             [])
 
     def _scan_folder_own_task_func(self, out: tuple[FolderToCache, _FolderScanStats, _FolderScanDirOut],
-                                   parallel: tasks.Parallel, scannedfiles: dict[str, FileOnDisk],
+                                   parallel: tasks.Parallel, scannedfiles: set[str],
                                    stats: _FolderScanStats) -> None:
         assert (self._state & 0x3) == 0x1
         (tocache, gotstats, sdout) = out
         stats.add(gotstats)
-        assert len(scannedfiles.keys() & sdout.scanned_files.keys()) == 0
-        scannedfiles |= sdout.scanned_files
+        metrics = parallel.metrics()
+        metrics.inc('sanguine_foldercache_scanned_files_total', gotstats.nscanned, (self.name,))
+        with parallel.received_shared_file_table(sdout.scanned_table) as table:
+            scannedpaths = table.paths()
+        assert scannedfiles.isdisjoint(scannedpaths)
+        scannedfiles.update(scannedpaths)
         if sdout.root in self._new_all_scan_stats:
             assert len(self._new_all_scan_stats[sdout.root].keys() & sdout.scan_stats.keys()) == 0
             self._new_all_scan_stats[sdout.root] |= sdout.scan_stats
         else:
             self._new_all_scan_stats[sdout.root] = sdout.scan_stats
 
-        for f in sdout.requested_files:
-            (fpath, tstamp, fsize) = f
-            debug(fpath)  # RM
-            htaskname = self._hashing_task_name(fpath)
-            htask = tasks.Task(htaskname, _calc_hash_task_func,
-                               (fpath, tstamp, fsize),
-                               [], _hashing_file_time_estimate(fsize))
-            howntaskname = self._hashing_own_task_name(fpath)
-            howntask = tasks.OwnTask(howntaskname,
-                                     lambda _, o: self._own_calc_hash_task_func(o, scannedfiles),
-                                     None, [htaskname], 0.001,
-                                     datadeps=self._owncalchashtask_datadeps())  # expected to take negligible time
-            parallel.add_tasks([htask, howntask])
+        # there can be lots of files, so they're hashed as one TaskGroup per scanned folder,
+        #   with a few chunk tasks and a few bulk own tasks instead of two tasks per file
+        if len(sdout.requested_files) > 0:
+            hgroup = tasks.TaskGroup(self._hashing_task_name(tocache.folder), _calc_hash_task_func,
+                                     sdout.requested_files, [],
+                                     [float(fsize) for (_, _, fsize) in sdout.requested_files],
+                                     executor=tasks.TaskExecutor.Thread,  # hashlib releases GIL
+                                     reducer_name=self._hashing_own_task_name(tocache.folder),
+                                     reducer=lambda outs: self._own_calc_hash_task_func(outs, scannedfiles, metrics),
+                                     reducer_datadeps=self._owncalchashtask_datadeps(),
+                                     idempotent=True,  # (fpath, tstamp, fsize) is enough to identify the hash
+                                     cost_family=_HASHING_COST_FAMILY)
+            parallel.add_task_group(hgroup)
 
         # new tasks
+        owntaskf = lambda _, o: self._scan_folder_own_task_func(o, parallel, scannedfiles, stats)
         for dpath in sdout.requested_dirs:
             assert is_normalized_dir_path(dpath)
             taskname = self._scanned_task_name(dpath)
@@ -704,9 +759,7 @@ class FolderCache:  # folder cache; can handle multiple folders, each folder wit
                               [self._load_own_task_name()],
                               1.0)  # this is an ad-hoc split, we don't want tasks to cache w, and we have no idea
             owntaskname = self._scanned_own_task_name(dpath)
-            owntask = tasks.OwnTask(owntaskname,
-                                    lambda _, o: self._scan_folder_own_task_func(o, parallel, scannedfiles, stats),
-                                    None, [taskname], 0.01)  # should not take too long
+            owntask = tasks.OwnTask(owntaskname, owntaskf, None, [taskname], 0.01)  # should not take too long
             parallel.add_tasks([task, owntask])
 
 
@@ -718,6 +771,8 @@ if __name__ == '__main__':
                                    'downloads',
                                    FolderListToCache(
                                        [FolderToCache(normalize_dir_path('..\\..\\..\\mo2\\downloads'), [])]))
-        with tasks.Parallel(None) as tparallel:
+        tjournal = normalize_dir_path('..\\..\\sanguine.cache\\') + 'foldercache.journal'
+        tweights = normalize_dir_path('..\\..\\sanguine.cache\\') + 'foldercache.weights.json'
+        with tasks.Parallel(tweights, journal=tjournal) as tparallel:
             tfoldercache.start_tasks(tparallel)
             tparallel.run([])  # all necessary tasks were already added in acache.start_tasks()
@@ -1,3 +1,5 @@
+from array import array
+
 import sanguine.gitdata.git_data_file as gitdatafile
 import sanguine.tasks as tasks
 from sanguine.cache.pickled_cache import pickled_cache
@@ -13,14 +15,29 @@ from sanguine.helpers.tmp_path import TmpPath
 
 _KNOWN_ARCHIVES_FNAME = 'known-archives.json5'
 _KNOWN_TENTATIVE_ARCHIVE_NAMES_FNAME = 'known-tentative-archive-names.json5'
+_PACKED_FILE_HASH_LEN: int = 9  # see truncate_file_hash()
 
 
 def _known_plugin_fname(name: str) -> str:
     return 'known-{}-data.json5'.format(name)
 
 
-def _processing_archive_time_estimate(fsize: int):
-    return float(fsize) / 1048576. / 10.  # 10 MByte/s
+def _archive_hashing_cost_family_for_ext(ext: str) -> str:  # per archive plugin; units: bytes
+    return 'sanguine.rootgit.hash' + ext.lower()
+
+
+def _archive_hashing_cost_family(arpath: str) -> str:
+    return _archive_hashing_cost_family_for_ext(os.path.splitext(arpath)[1])
+
+
+def _archive_hashing_resources(arpath: str, arsize: int) -> tasks.TaskResources:
+    plugin = archive_plugin_for(arpath)
+    return tasks.TaskResources(ram=plugin.extraction_ram(arsize), tmp_disk=plugin.extracted_size(arsize), io=1)
+
+
+def _add_cost_families(parallel: tasks.Parallel) -> None:  # priors, Parallel will learn real costs
+    for ext in all_archive_plugins_extensions():
+        parallel.add_task_cost_family(_archive_hashing_cost_family_for_ext(ext), 0., 1. / 1048576. / 10.)  # 10 MByte/s
 
 
 def _read_git_archives(params: tuple[str]) -> list[Archive]:
@@ -77,6 +94,48 @@ def _hash_archive(archives: list[Archive], by: str, tmppath: str,  # recursive!
                 _hash_archive(archives, by, newtmppath, nested_plugin, fpath, h, s)
 
 
+# archive hashing returns: files of all the archives are packed into a few contiguous buffers instead of
+#   pickling FileInArchive one by one; large ones go to the receiver out-of-band (via shared memory)
+#   buffers may arrive as PickleBuffer (not pickled at all), bytes/bytearray (copied), or memoryview
+
+def _pack_archives(archives: list[Archive]) -> tuple[list[tuple[bytes, int, str, int]], pickle.PickleBuffer,
+                                                     pickle.PickleBuffer, pickle.PickleBuffer]:
+    ars = []
+    hashes = bytearray()
+    sizes = array('q')
+    paths = []
+    for ar in archives:
+        ars.append((ar.archive_hash, ar.archive_size, ar.by, len(ar.files)))
+        for fi in ar.files:
+            assert len(fi.file_hash) == _PACKED_FILE_HASH_LEN
+            hashes += fi.file_hash
+            sizes.append(fi.file_size)
+            paths.append(fi.intra_path)
+    return (ars, pickle.PickleBuffer(hashes), pickle.PickleBuffer(sizes),
+            pickle.PickleBuffer('\0'.join(paths).encode('utf-8')))
+
+
+def _unpack_archives(packed: tuple[list[tuple[bytes, int, str, int]], any, any, any]) -> list[Archive]:
+    (ars, hashes, sizes, paths) = packed
+    with memoryview(hashes) as mv:
+        hashes = mv.tobytes()
+    allsizes = array('q')
+    with memoryview(sizes) as mv:
+        allsizes.frombytes(mv)
+    with memoryview(paths) as mv:
+        allpaths = str(mv, 'utf-8').split('\0') if len(allsizes) > 0 else []
+    assert len(hashes) == _PACKED_FILE_HASH_LEN * len(allsizes) == _PACKED_FILE_HASH_LEN * len(allpaths)
+    archives = []
+    i = 0
+    for arhash, arsize, by, nfiles in ars:
+        files = [FileInArchive(hashes[j * _PACKED_FILE_HASH_LEN:(j + 1) * _PACKED_FILE_HASH_LEN], allsizes[j],
+                               allpaths[j]) for j in range(i, i + nfiles)]
+        archives.append(Archive(arhash, arsize, by, files))
+        i += nfiles
+    assert i == len(allsizes)
+    return archives
+
+
 def _read_git_tentative_names(params: tuple[str]) -> dict[bytes, list[str]]:
     (tafile,) = params
     assert is_normalized_file_path(tafile)
@@ -152,7 +211,7 @@ def _load_archives_task_func(param: tuple[str, str, dict[str, any]]) -> tuple[di
     return archives_by_hash, archived_files_by_hash, archived_files_by_name, cacheoverrides
 
 
-def _archive_hashing_task_func(param: tuple[str, str, bytes, int, str]) -> tuple[list[Archive]]:
+def _archive_hashing_task_func(param: tuple[str, str, bytes, int, str]) -> tuple[tuple]:  # see _pack_archives()
     (by, arpath, arhash, arsize, tmppath) = param
     assert not os.path.isdir(tmppath)
     os.makedirs(tmppath)
@@ -160,9 +219,9 @@ def _archive_hashing_task_func(param: tuple[str, str, bytes, int, str]) -> tuple
     assert plugin is not None
     archives = []
     _hash_archive(archives, by, tmppath, plugin, arpath, arhash, arsize)
-    debug('RootGitData: about to remove temporary tree {}'.format(tmppath))
+    debug('RootGitData: about to remove temporary tree {}', tmppath)
     TmpPath.rm_tmp_tree(tmppath)
-    return (archives,)
+    return (_pack_archives(archives),)
 
 
 def _debug_assert_eq_list(saved_loaded: list, sorted_data: list) -> None:
@@ -287,10 +346,10 @@ class RootGitData:
             ['sanguine.rootgit.done_hashing()'],
             [])
 
-    def _archive_hashing_own_task_func(self, out: tuple[list[Archive]]):
+    def _archive_hashing_own_task_func(self, out: tuple[tuple]):
         assert self._ar_is_ready == 1
-        (archives,) = out
-        for ar in archives:
+        (packed,) = out
+        for ar in _unpack_archives(packed):
             _append_archive(self._archives_by_hash, self._archived_files_by_hash, self._archived_files_by_name, ar)
         self._dirty_ar = True
 
@@ -333,6 +392,7 @@ class RootGitData:
         plugin.got_loaded_data(plugindata)
 
     def start_tasks(self, parallel: tasks.Parallel) -> None:
+        _add_cost_families(parallel)
         loadtaskname = 'sanguine.rootgit.loadar'
         loadtask = tasks.Task(loadtaskname, _load_archives_task_func,
                               (self._root_git_dir, self._cache_dir, self._cache_data), [])
@@ -390,7 +450,12 @@ class RootGitData:
         self._nhashes_requested += 1
         tmp_dir = TmpPath.tmp_in_tmp(self._tmp_dir, 'ah.', self._nhashes_requested)
         hashingtask = tasks.Task(hashingtaskname, _archive_hashing_task_func,
-                                 (self._new_hashes_by, arpath, arhash, arsize, tmp_dir), [])
+                                 (self._new_hashes_by, arpath, arhash, arsize, tmp_dir), [],
+                                 tasks.TaskCost(_archive_hashing_cost_family(arpath), float(arsize)),
+                                 # not a thread: BSAs are parsed in pure Python, and native crashes of
+                                 #   unpacking code should stay isolated in a child process
+                                 retries=1,  # one flaky unpacker run shouldn't kill hours of hashing
+                                 resources=_archive_hashing_resources(arpath, arsize))
         parallel.add_task(hashingtask)
         hashingowntaskname = 'sanguine.rootgit.ownhash.' + arpath
         hashingowntask = tasks.OwnTask(hashingowntaskname,
@@ -1,3 +1,5 @@
+import shutil
+
 import sanguine.tasks as tasks
 from sanguine.cache.available_files import FileRetriever, AvailableFiles
 from sanguine.cache.folder_cache import FileOnDisk, FolderCache
@@ -20,7 +22,7 @@ class WholeCache:
             with open(self.cache_data_fname, 'r') as f:
                 self.cache_data = json.load(f)
         except Exception as e:
-            warn('WholeCache: cannot load cachedata from {}: {}'.format(self.cache_data_fname, e))
+            warn('WholeCache: cannot load cachedata from {}: {}', self.cache_data_fname, e)
             self.cache_data = {}
         self.available = AvailableFiles(by, projectcfg.cache_dir, projectcfg.tmp_dir, projectcfg.github_root,
                                         projectcfg.download_dirs, projectcfg.github_folders, self.cache_data)
@@ -86,12 +88,18 @@ if __name__ == '__main__':
         cfg = ProjectConfig(cfgfname)
 
         wcache = WholeCache('KTAGirl', cfg)
-        with tasks.Parallel(None, taskstatsofinterest=wcache.stats_of_interest(), dbg_serialize=False) as tparallel:
-            t0 = time.perf_counter()
-            wcache.start_tasks(tparallel)
-            dt = time.perf_counter() - t0
-            info('Whole Cache: starting tasks took {:.2f}s'.format(dt))
-            tparallel.run([])
+        tbudget = tasks.TaskResources(tmp_disk=shutil.disk_usage(cfg.tmp_dir).free // 2, io=2)
+        with tasks.Metrics() as tmetrics:
+            tmetrics.dump_to(ttmppath + 'sanguine.metrics.prom', 10.)
+            with tasks.Parallel(cfg.cache_dir + 'wholecache.weights.json',
+                                taskstatsofinterest=wcache.stats_of_interest(), dbg_serialize=False,
+                                journal=cfg.cache_dir + 'wholecache.journal', resource_budget=tbudget,
+                                metrics=tmetrics) as tparallel:
+                t0 = time.perf_counter()
+                wcache.start_tasks(tparallel)
+                dt = time.perf_counter() - t0
+                info('Whole Cache: starting tasks took {:.2f}s', dt)
+                tparallel.run([])
         wcache.done()
 
         info('whole_cache.py test finished ok')
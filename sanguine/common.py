@@ -2,7 +2,7 @@ import base64
 import hashlib
 import json
 import pickle
-from bisect import bisect_right
+from bisect import bisect_left, bisect_right, insort
 from stat import S_ISREG, S_ISLNK
 
 from sanguine.install.install_common import *
@@ -198,6 +198,67 @@ class FastSearchOverPartialStrings:
                 return prev[0], prev[2]
 
 
+class SortedStringsWithPrefixSearch:
+    # sorted list of strings with O(log N) search for all strings starting with prefix
+    #   add() and remove() are O(log N + _LOAD) rather than O(N) of a plain sorted list,
+    #   as strings are kept in a list of sorted sublists
+    _LOAD: int = 1000
+    _lists: list[list[str]]
+    _maxes: list[str]  # _maxes[i] == _lists[i][-1]
+
+    def __init__(self) -> None:
+        self._lists = []
+        self._maxes = []
+
+    def add(self, s: str) -> None:
+        if len(self._maxes) == 0:
+            self._lists.append([s])
+            self._maxes.append(s)
+            return
+        i = bisect_left(self._maxes, s)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(s)
+            self._maxes[i] = s
+        else:
+            insort(self._lists[i], s)
+        lst = self._lists[i]
+        if len(lst) > 2 * SortedStringsWithPrefixSearch._LOAD:
+            half = lst[SortedStringsWithPrefixSearch._LOAD:]
+            del lst[SortedStringsWithPrefixSearch._LOAD:]
+            self._lists.insert(i + 1, half)
+            self._maxes[i] = lst[-1]
+            self._maxes.insert(i + 1, half[-1])
+
+    def remove(self, s: str) -> None:
+        i = bisect_left(self._maxes, s)
+        assert i < len(self._maxes)
+        lst = self._lists[i]
+        j = bisect_left(lst, s)
+        assert lst[j] == s
+        del lst[j]
+        if len(lst) == 0:
+            del self._lists[i]
+            del self._maxes[i]
+        elif j == len(lst):
+            self._maxes[i] = lst[-1]
+
+    def all_with_prefix(self, prefix: str) -> list[str]:
+        out = []
+        i = bisect_left(self._maxes, prefix)
+        while i < len(self._lists):
+            lst = self._lists[i]
+            for j in range(bisect_left(lst, prefix), len(lst)):
+                if not lst[j].startswith(prefix):
+                    return out
+                out.append(lst[j])
+            i += 1
+        return out
+
+    def __len__(self) -> int:
+        return sum([len(lst) for lst in self._lists])
+
+
 ### JSON-related
 
 def to_json_hash(h: bytes) -> str:
@@ -43,6 +43,14 @@ class ArchivePluginBase(ABC):
     def extract_all(self, archive: str, targetpath: str) -> None:
         pass
 
+    # rough estimates for extract_all(), used for admission control
+
+    def extraction_ram(self, arsize: int) -> int:  # within our own process, unpacker subprocesses are not counted
+        return 0
+
+    def extracted_size(self, arsize: int) -> int:
+        return arsize * 2
+
 
 _archive_plugins: dict[str, ArchivePluginBase] = {}  # file_extension -> ArchivePluginBase
 _archive_exts: list[str] = []
@@ -16,7 +16,8 @@ Type = typing.Type
 
 # noinspection PyUnresolvedReferences, PyProtectedMember
 from sanguine.install.install_logging import (debug, info, perf_warn, warn, alert, critical,
-                                              info_or_perf_warn, log_with_level, add_file_logging)
+                                              info_or_perf_warn, log_with_level, add_file_logging, add_ndjson_logging,
+                                              LazyLogArg)
 # noinspection PyUnresolvedReferences, PyProtectedMember
 from sanguine.install._install_checks import check_sanguine_prerequisites
 
@@ -0,0 +1,56 @@
+# renders NDJSON log (as written by add_ndjson_logging()) to HTML or console, optionally filtered
+# usage: py -m sanguine.install.install_log_render <log.ndjson> <out.html|-> [minlevel] [substring]
+#   '-' means console; minlevel is a level name (DEBUG, INFO, PERFWARN, WARNING, ALERT, CRITICAL)
+import json
+import logging
+import sys
+from collections.abc import Generator
+
+from sanguine.install.install_common import abort_if_not
+from sanguine.install.install_logging import (_HtmlFileHandler, _SanguineFormatter, _SanguineHtmlFileFormatter,
+                                              logging_started, make_log_record_at)
+
+
+def read_ndjson_log(fpath: str) -> tuple[dict[str, any], Generator[logging.LogRecord]]:
+    rf = open(fpath, 'rt', encoding='utf-8')
+    header = json.loads(rf.readline())
+    assert header.get('sanguine_log') == 1
+
+    def records() -> Generator[logging.LogRecord]:
+        with rf:
+            for line in rf:
+                jrec = json.loads(line)
+                rec = make_log_record_at(jrec['lvl'], jrec['msg'], jrec['path'], jrec['line'], '')
+                rec.sanguine_when = logging_started() + jrec['t']  # formatters print it relative to logging_started()
+                rec.sanguine_prefix = jrec['p']
+                yield rec
+
+    return header, records()
+
+
+def render_ndjson_log(fpath: str, outfpath: str | None, minlevel: int, substring: str | None) -> int:
+    # outfpath None means console; returns number of records rendered
+    header, records = read_ndjson_log(fpath)
+    if outfpath is None:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(_SanguineFormatter())
+    else:
+        handler = _HtmlFileHandler(outfpath, header['started'])
+        handler.setFormatter(_SanguineHtmlFileFormatter())
+    n = 0
+    for rec in records:
+        if rec.levelno >= minlevel and (substring is None or substring in rec.msg):
+            handler.emit(rec)
+            n += 1
+    handler.close()
+    return n
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print('Usage:\n\tpy -m sanguine.install.install_log_render <log.ndjson> <out.html|-> [minlevel] [substring]\n')
+    else:
+        level = logging.getLevelName(sys.argv[3]) if len(sys.argv) > 3 else logging.DEBUG
+        abort_if_not(isinstance(level, int), lambda: 'unknown log level {}'.format(sys.argv[3]))
+        render_ndjson_log(sys.argv[1], None if sys.argv[2] == '-' else sys.argv[2], level,
+                          sys.argv[4] if len(sys.argv) > 4 else None)
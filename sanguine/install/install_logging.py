@@ -1,7 +1,12 @@
+import json
 import logging
 # import logging.handlers
+import sys
 import time
 from collections.abc import Callable
+from json.encoder import encode_basestring
+from threading import Event, Lock, Thread
+from types import FrameType
 
 
 def _sanguine_patch_record(record: logging.LogRecord) -> None:
@@ -46,9 +51,12 @@ class _SanguineFormatter(logging.Formatter):
         logging.CRITICAL: '\x1b[91;1m' + _FORMAT + '\x1b[0m'
     }
 
+    _formatters: dict[int, logging.Formatter] = {levelno: logging.Formatter(fmt) for levelno, fmt in FORMATS.items()}
+
     def format(self, record) -> str:
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
+        formatter = self._formatters.get(record.levelno)
+        if formatter is None:
+            formatter = logging.Formatter(self.FORMATS.get(record.levelno))
         _sanguine_patch_record(record)
         return formatter.format(record)
 
@@ -63,12 +71,18 @@ class _SanguineHtmlFileFormatter(logging.Formatter):
         logging.CRITICAL: '<div class="critical">' + _FORMAT + '</div>',
     }
 
+    _formatters: dict[int, logging.Formatter] = {levelno: logging.Formatter(fmt) for levelno, fmt in FORMATS.items()}
+
     def format(self, record) -> str:
-        record.msg = record.msg.replace('\n', '<br>')
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
+        msg = record.msg
+        record.msg = msg.replace('\n', '<br>')
+        formatter = self._formatters.get(record.levelno)
+        if formatter is None:
+            formatter = logging.Formatter(self.FORMATS.get(record.levelno))
         _sanguine_patch_record(record)
-        return formatter.format(record)
+        out = formatter.format(record)
+        record.msg = msg  # other handlers (NDJSON in particular) need it intact
+        return out
 
 
 logging.addLevelName(_PERFWARN_LEVEL_NUM, "PERFWARN")
@@ -93,12 +107,13 @@ _console_handler.setFormatter(_SanguineFormatter())
 _logger.addHandler(_console_handler)
 
 _logger_file_handler: logging.StreamHandler | None = None
+_logger_ndjson_handler: logging.Handler | None = None
 
 _started: float = time.perf_counter()
 
 
 class _HtmlFileHandler(logging.FileHandler):
-    def __init__(self, fpath) -> None:
+    def __init__(self, fpath, started: str | None = None) -> None:
         super().__init__(fpath, 'w', encoding='utf-8')
         bodystyle = 'body{ background-color:black; white-space:nowrap; font-size:1.2em; font-family:monospace; }\n'
         debugstyle = '.debug{color:#666666;}\n'
@@ -110,7 +125,80 @@ class _HtmlFileHandler(logging.FileHandler):
         self.stream.write(
             '<html><head><style>\n' + bodystyle + debugstyle + infostyle + perfwarnstyle + warnstyle + alertstyle + criticalstyle + '</style></head>\n' +
             '<body>\n')
-        self.stream.write('<div class="info">[STARTING LOGGING]: {}</div>\n'.format(time.asctime()))
+        self.stream.write('<div class="info">[STARTING LOGGING]: {}</div>\n'.format(
+            started if started is not None else time.asctime()))
+
+
+# NDJSON log: nothing is formatted at runtime, emit() just appends a tuple, and background writer dumps them
+#   as one JSON line per record, see install_log_render.py for rendering it to HTML or console afterwards
+#   first line is a header: {"sanguine_log": 1, "started": ...}
+#   then each line is {"t": seconds since logging started, "lvl": levelno, "p": prefix, "msg": ..., "path": ...,
+#                      "line": lineno}
+
+_NDJSON_LOG_FLUSH_PERIOD: float = 0.2
+
+
+class _NdjsonFileHandler(logging.Handler):
+    _wf: any
+    _records: list[tuple[float, int, str, str, str, int]]
+    _reclock: Lock
+    _writelock: Lock  # flush() may be called while writer is writing
+    _encoded_paths: dict[str, str]
+    _stop: Event
+    _writer: Thread
+
+    def __init__(self, fpath: str) -> None:
+        super().__init__()
+        self._wf = open(fpath, 'wt', encoding='utf-8')
+        self._wf.write(json.dumps({'sanguine_log': 1, 'started': time.asctime()}) + '\n')
+        self._records = []
+        self._reclock = Lock()
+        self._writelock = Lock()
+        self._encoded_paths = {}
+        self._stop = Event()
+        self._writer = Thread(target=self._writer_func, daemon=True)
+        self._writer.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        t = record.sanguine_when if hasattr(record, 'sanguine_when') else time.perf_counter()
+        rec = (t - _started, record.levelno, getattr(record, 'sanguine_prefix', ''), record.getMessage(),
+               record.pathname, record.lineno)
+        with self._reclock:
+            self._records.append(rec)
+
+    def _write_pending(self) -> None:
+        with self._writelock:
+            with self._reclock:
+                records = self._records
+                self._records = []
+            if len(records) == 0:
+                return
+            lines = []
+            for (t, levelno, prefix, msg, pathname, lineno) in records:  # same as json.dumps(), but way cheaper
+                path = self._encoded_paths.get(pathname)
+                if path is None:
+                    path = self._encoded_paths[pathname] = encode_basestring(pathname)
+                lines.append('{{"t": {:.4f}, "lvl": {}, "p": {}, "msg": {}, "path": {}, "line": {}}}\n'.format(
+                    t, levelno, encode_basestring(prefix), encode_basestring(msg), path, lineno))
+            self._wf.write(''.join(lines))
+
+    def _writer_func(self) -> None:
+        while not self._stop.wait(_NDJSON_LOG_FLUSH_PERIOD):
+            self._write_pending()
+
+    def flush(self) -> None:
+        if self._writer.is_alive():
+            self._write_pending()
+            with self._writelock:
+                self._wf.flush()
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._stop.set()
+            self._writer.join()
+            self._write_pending()
+            self._wf.close()
+        super().close()
 
 
 def add_file_logging(fpath: str) -> None:
@@ -122,6 +210,15 @@ def add_file_logging(fpath: str) -> None:
     _logger.addHandler(_logger_file_handler)
 
 
+def add_ndjson_logging(fpath: str) -> None:
+    # cheaper alternative (or addition) to add_file_logging(), for runs with lots of logging
+    global _logger, _logger_ndjson_handler
+    assert _logger_ndjson_handler is None
+    _logger_ndjson_handler = _NdjsonFileHandler(fpath)
+    _logger_ndjson_handler.setLevel(logging.DEBUG if __debug__ else logging.INFO)
+    _logger.addHandler(_logger_ndjson_handler)
+
+
 def add_logging_handler(handler: logging.StreamHandler) -> None:
     global _logger
     _logger.addHandler(handler)
@@ -137,16 +234,32 @@ def set_logging_hook(newhook: Callable[[logging.LogRecord], None] | None) -> Cal
     return oldhook
 
 
+# sink is a cheaper alternative to hook, used by child processes: no LogRecord is made, level is checked first,
+#   and sink gets caller frame to make its own (cacheable) idea of where the message came from
+#   msg and args are passed unformatted, it is up to sink when (and where) to format them
+_logging_sink: Callable[[int, str, tuple, FrameType], None] | None = None
+_logging_sink_level: int = logging.DEBUG
+
+
+def set_logging_sink(newsink: Callable[[int, str, tuple, FrameType], None] | None,
+                     level: int) -> Callable[[int, str, tuple, FrameType], None] | None:
+    global _logging_sink, _logging_sink_level
+    oldsink = _logging_sink
+    _logging_sink = newsink
+    _logging_sink_level = level
+    return oldsink
+
+
 def log_record(record: logging.LogRecord) -> None:
-    global _console_handler, _logger_file_handler
+    global _console_handler
     _console_handler.emit(record)
-    if _logger_file_handler is None:
-        return
-    _logger_file_handler.emit(record)
+    log_record_skip_console(record)
 
 
 def log_record_skip_console(record: logging.LogRecord) -> None:
-    global _logger_file_handler
+    global _logger_file_handler, _logger_ndjson_handler
+    if _logger_ndjson_handler is not None:
+        _logger_ndjson_handler.emit(record)
     if _logger_file_handler is None:
         return
     _logger_file_handler.emit(record)
@@ -170,81 +283,157 @@ def make_log_record(level, msg: str) -> logging.LogRecord:  # different stacklev
     return rec
 
 
+def make_log_record_at(level: int, msg: str, pathname: str, lineno: int, func: str) -> logging.LogRecord:
+    global _logger
+    return _logger.makeRecord(_logger.name, level, pathname, lineno, msg, (), None, func, None, None)
+
+
 def logging_started() -> float:
     global _started
     return _started
 
 
-def log_with_level(level: int, msg: str) -> None:
+# all the logging functions below take str.format() args lazily: debug('found {}', fpath) doesn't format anything
+#   unless debug level is enabled
+
+class LazyLogArg:
+    # for args which are expensive to compute, e.g. debug('request size: {}', LazyLogArg(lambda: sum(...)))
+    __slots__ = ('f',)
+    f: Callable[[], any]
+
+    def __init__(self, f: Callable[[], any]) -> None:
+        self.f = f
+
+    def __format__(self, spec: str) -> str:
+        return format(self.f(), spec)
+
+    def __str__(self) -> str:
+        return str(self.f())
+
+
+def _format_msg(msg: str, args: tuple) -> str:
+    return msg.format(*args) if args else msg
+
+
+def log_with_level(level: int, msg: str, *args) -> None:
     if not __debug__ and level <= logging.DEBUG:
         return
+    global _logging_sink
+    if _logging_sink is not None:
+        if level >= _logging_sink_level:
+            _logging_sink(level, msg, args, sys._getframe(1))
+        return
+    global _logger
+    if not _logger.isEnabledFor(level):
+        return
     global _logging_hook
     if _logging_hook is not None:
-        _logging_hook(_make_log_record(level, msg))
+        _logging_hook(_make_log_record(level, _format_msg(msg, args)))
         return
-    global _logger
-    _logger.log(level, msg, stacklevel=2)
+    _logger.log(level, _format_msg(msg, args), stacklevel=2)
 
 
-def debug(msg: str) -> None:
+def debug(msg: str, *args) -> None:
     if not __debug__:
         return
+    global _logging_sink
+    if _logging_sink is not None:
+        if logging.DEBUG >= _logging_sink_level:
+            _logging_sink(logging.DEBUG, msg, args, sys._getframe(1))
+        return
+    global _logger
+    if not _logger.isEnabledFor(logging.DEBUG):
+        return
     global _logging_hook
     if _logging_hook is not None:
-        _logging_hook(_make_log_record(logging.DEBUG, msg))
+        _logging_hook(_make_log_record(logging.DEBUG, _format_msg(msg, args)))
         return
-    global _logger
-    _logger.debug(msg, stacklevel=2)
+    _logger.debug(_format_msg(msg, args), stacklevel=2)
 
 
-def info(msg: str) -> None:
+def info(msg: str, *args) -> None:
+    global _logging_sink
+    if _logging_sink is not None:
+        if logging.INFO >= _logging_sink_level:
+            _logging_sink(logging.INFO, msg, args, sys._getframe(1))
+        return
     global _logger
+    if not _logger.isEnabledFor(logging.INFO):
+        return
     global _logging_hook
     if _logging_hook is not None:
-        _logging_hook(_make_log_record(logging.INFO, msg))
+        _logging_hook(_make_log_record(logging.INFO, _format_msg(msg, args)))
         return
-    _logger.info(msg, stacklevel=2)
+    _logger.info(_format_msg(msg, args), stacklevel=2)
 
 
-def perf_warn(msg: str) -> None:
+def perf_warn(msg: str, *args) -> None:
+    global _logging_sink
+    if _logging_sink is not None:
+        if _PERFWARN_LEVEL_NUM >= _logging_sink_level:
+            _logging_sink(_PERFWARN_LEVEL_NUM, msg, args, sys._getframe(1))
+        return
     global _logger
+    if not _logger.isEnabledFor(_PERFWARN_LEVEL_NUM):
+        return
     global _logging_hook
     if _logging_hook is not None:
-        _logging_hook(_make_log_record(_PERFWARN_LEVEL_NUM, msg))
+        _logging_hook(_make_log_record(_PERFWARN_LEVEL_NUM, _format_msg(msg, args)))
         return
     # noinspection PyUnresolvedReferences
-    _logger.perf_warn(msg, stacklevel=2)
+    _logger.perf_warn(_format_msg(msg, args), stacklevel=2)
 
 
-def warn(msg: str) -> None:
+def warn(msg: str, *args) -> None:
+    global _logging_sink
+    if _logging_sink is not None:
+        if logging.WARN >= _logging_sink_level:
+            _logging_sink(logging.WARN, msg, args, sys._getframe(1))
+        return
+    global _logger
+    if not _logger.isEnabledFor(logging.WARN):
+        return
     global _logging_hook
     if _logging_hook is not None:
-        _logging_hook(_make_log_record(logging.WARN, msg))
+        _logging_hook(_make_log_record(logging.WARN, _format_msg(msg, args)))
         return
-    global _logger
-    _logger.warning(msg, stacklevel=2)
+    _logger.warning(_format_msg(msg, args), stacklevel=2)
 
 
-def alert(msg: str) -> None:
+def alert(msg: str, *args) -> None:
+    global _logging_sink
+    if _logging_sink is not None:
+        if logging.ERROR >= _logging_sink_level:
+            _logging_sink(logging.ERROR, msg, args, sys._getframe(1))
+        return
+    global _logger
+    if not _logger.isEnabledFor(logging.ERROR):
+        return
     global _logging_hook
     if _logging_hook is not None:
-        _logging_hook(_make_log_record(logging.ERROR, msg))
+        _logging_hook(_make_log_record(logging.ERROR, _format_msg(msg, args)))
         return
-    global _logger
-    _logger.error(msg, stacklevel=2)
+    _logger.error(_format_msg(msg, args), stacklevel=2)
 
 
-def critical(msg: str) -> None:
+def critical(msg: str, *args) -> None:
+    global _logging_sink
+    if _logging_sink is not None:
+        if logging.CRITICAL >= _logging_sink_level:
+            _logging_sink(logging.CRITICAL, msg, args, sys._getframe(1))
+        return
+    global _logger
+    if not _logger.isEnabledFor(logging.CRITICAL):
+        return
     global _logging_hook
     if _logging_hook is not None:
-        _logging_hook(_make_log_record(logging.CRITICAL, msg))
+        _logging_hook(_make_log_record(logging.CRITICAL, _format_msg(msg, args)))
         return
-    global _logger
-    _logger.critical(msg, stacklevel=2)
+    _logger.critical(_format_msg(msg, args), stacklevel=2)
 
 
-def info_or_perf_warn(pwarn: bool, msg: str) -> None:
+def info_or_perf_warn(pwarn: bool, msg: str, *args) -> None:
     if pwarn:
-        perf_warn(msg)
+        perf_warn(msg, *args)
     else:
-        info(msg)
+        info(msg, *args)
@@ -24,6 +24,9 @@ class BsaArchivePlugin(ArchivePluginBase):
         info('Extraction done')
         return out
 
+    def extraction_ram(self, arsize: int) -> int:
+        return arsize  # BSAArchive.parse_file() reads the whole file
+
     def extract_all(self, archive: str, targetpath: str) -> None:
         info('Extracting all from {}...'.format(archive))
         bsa = BSAArchive.parse_file(archive)
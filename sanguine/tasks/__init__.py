@@ -2,7 +2,12 @@
 
 from sanguine.tasks._tasks_common import *
 from sanguine.tasks._tasks_logging import _ChildProcessLogHandler
+from sanguine.tasks._tasks_metrics import Metrics
 from sanguine.tasks._tasks_parallel import Parallel
+from sanguine.tasks._tasks_pool import ProcessPool
 from sanguine.tasks._tasks_shared import (SharedReturn, SharedPublication, SharedPubParam,
                                           _pool_of_shared_returns, SharedReturnParam, from_publication,
-                                          make_shared_publication_param, make_shared_return_param)
+                                          make_shared_publication_param, make_shared_return_param,
+                                          SharedFileTable, SharedFileTableParam, SharedFileTableView,
+                                          make_shared_file_table_param, SharedFileTablePublication,
+                                          from_file_table_publication, SharedReturnView)
@@ -0,0 +1,14 @@
+# entry point for remote worker agent, see _tasks_remote.py
+#   (separate from _tasks_remote, as the latter is already imported by sanguine.tasks, and running it as __main__
+#    would create a second copy of its message classes)
+import sys
+
+from sanguine.tasks._tasks_common import *
+from sanguine.tasks._tasks_remote import REMOTE_AUTHKEY_ENV, parse_remote_address, run_agent
+
+if __name__ == '__main__':
+    abort_if_not(len(sys.argv) > 1, 'Usage: py -m sanguine.tasks._tasks_agent <host:port> [nproc] [locality...]')
+    abort_if_not(REMOTE_AUTHKEY_ENV in os.environ, lambda: '{} environment variable must be set'.format(
+        REMOTE_AUTHKEY_ENV))
+    run_agent(parse_remote_address(sys.argv[1]), os.environ[REMOTE_AUTHKEY_ENV].encode(),
+              int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count(), sys.argv[3:])
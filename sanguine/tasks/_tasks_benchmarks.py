@@ -0,0 +1,503 @@
+# synthetic benchmarks for sanguine.tasks
+# usage: py -m sanguine.tasks._tasks_benchmarks <benchmark> [params]
+
+import gc
+import hashlib
+import logging
+import tempfile
+import pickle
+import random
+import sys
+import time
+import tracemalloc
+from multiprocessing import SimpleQueue, shared_memory
+from threading import Thread
+
+import sanguine.tasks as tasks
+from sanguine.common import *
+from sanguine.install.install_logging import (make_log_record, _HtmlFileHandler, _SanguineHtmlFileFormatter,
+                                              _NdjsonFileHandler)
+from sanguine.tasks._tasks_logging import _ChildLogBatcher, _LogBatch
+from sanguine.tasks._tasks_shared import _ReceivedBlock, _pool_of_shared_returns, _load_payload
+
+
+def _bench_sleep_task_func(param: tuple[float], *deps) -> float:
+    (dt,) = param
+    time.sleep(dt)
+    return dt
+
+
+class _SyntheticDag:
+    name: str
+    durations: dict[str, float]
+    estimates: dict[str, float]
+    dependencies: dict[str, list[str]]
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.durations = {}
+        self.estimates = {}
+        self.dependencies = {}
+
+    def add(self, rnd: random.Random, taskname: str, dt: float, deps: list[str], noise: float) -> None:
+        self.durations[taskname] = dt
+        self.estimates[taskname] = dt * rnd.lognormvariate(0., noise) if noise > 0. else dt
+        self.dependencies[taskname] = deps
+
+    def critical_path(self) -> float:
+        crit: dict[str, float] = {}
+        for tn, dt in self.durations.items():  # insertion order is topological by construction
+            crit[tn] = dt + max([crit[d] for d in self.dependencies[tn]], default=0.)
+        return max(crit.values())
+
+    def total(self) -> float:
+        return sum(self.durations.values())
+
+    def make_tasks(self) -> list[tasks.Task]:
+        out = []
+        for tn, dt in self.durations.items():
+            out.append(tasks.Task(tn, _bench_sleep_task_func, (dt,), self.dependencies[tn], self.estimates[tn]))
+        out.append(tasks.OwnTask('bench.done', lambda _: None, None, ['bench.task.*']))
+        return out
+
+
+def _heavy_tailed_duration(rnd: random.Random, median: float) -> float:
+    return min(median * rnd.paretovariate(1.5), median * 500.)
+
+
+def _make_fork_join_dag(rnd: random.Random, n: int, median: float, noise: float) -> _SyntheticDag:
+    dag = _SyntheticDag('fork-join')
+    for i in range(n):
+        dag.add(rnd, 'bench.task.{}'.format(i), _heavy_tailed_duration(rnd, median), [], noise)
+    return dag
+
+
+def _make_layered_dag(rnd: random.Random, n: int, median: float, noise: float) -> _SyntheticDag:
+    dag = _SyntheticDag('layered')
+    nlayers = 8
+    prev: list[str] = []
+    for layer in range(nlayers):
+        cur = []
+        for i in range(n // nlayers):
+            tn = 'bench.task.{}.{}'.format(layer, i)
+            deps = rnd.sample(prev, min(len(prev), rnd.randint(1, 3))) if prev else []
+            dag.add(rnd, tn, _heavy_tailed_duration(rnd, median), deps, noise)
+            cur.append(tn)
+        prev = cur
+    return dag
+
+
+def _run_dag(dag: _SyntheticDag, nproc: int, work_stealing: bool) -> float:
+    with tasks.Parallel(None, nproc=nproc, work_stealing=work_stealing) as parallel:
+        t0 = time.perf_counter()
+        parallel.run(dag.make_tasks())
+        return time.perf_counter() - t0
+
+
+def bench_scheduler(nproc: int, ntasks: int) -> None:
+    results = []
+    for noise in (0., 1.):
+        for mkdag in (_make_fork_join_dag, _make_layered_dag):
+            dag = mkdag(random.Random(42), ntasks, 0.005, noise)
+            classic = _run_dag(dag, nproc, False)
+            ws = _run_dag(dag, nproc, True)
+            results.append((dag.name, noise, max(dag.critical_path(), dag.total() / nproc), classic, ws))
+
+    info('bench scheduler: {} processes, {} tasks per DAG', nproc, ntasks)
+    for name, noise, bound, classic, ws in results:
+        info('-> {} (estimate noise={:.1f}): lower bound {:.2f}s, classic {:.2f}s, work-stealing {:.2f}s ({:+.1f}%)',
+             name, noise, bound, classic, ws, (ws - classic) / classic * 100.)
+
+
+def bench_add_tasks(ntasks: int) -> None:
+    # FolderCache-like graph: per-file hashing task + own task, and wildcard own tasks waiting for all of them
+    #   only graph building is measured, nothing is run (so no processes are started)
+    parallel = tasks.Parallel(None, nproc=1)
+    t0 = time.perf_counter()
+    parallel.add_task(tasks.OwnTask('bench.ownhash.*.done', lambda _: None, None, ['bench.ownhash.*']))
+    for i in range(1000):  # early wildcards, each new task is checked against them
+        parallel.add_task(tasks.OwnTask('bench.early.{}'.format(i), lambda _: None, None,
+                                        ['bench.ownhash.bench.{}.*'.format(i)]))
+    for i in range(ntasks):
+        fname = 'bench.{}.{}'.format(i % 1000, i)
+        parallel.add_tasks([tasks.Task('bench.hash.' + fname, _bench_sleep_task_func, (0.,), []),
+                            tasks.OwnTask('bench.ownhash.' + fname, lambda _, o: None, None, ['bench.hash.' + fname])])
+    t1 = time.perf_counter()
+    for i in range(1000):  # late wildcards, each resolved against existing tasks
+        parallel.add_task(tasks.OwnTask('bench.late.{}'.format(i), lambda _: None, None,
+                                        ['bench.ownhash.bench.{}.*'.format(i)]))
+    t2 = time.perf_counter()
+    info('bench add_tasks: {} tasks added (with 1000 early wildcards) in {:.2f}s ({:.1f}us/task), '
+         '1000 late wildcards resolved in {:.2f}s', 2 * ntasks, t1 - t0, (t1 - t0) / (2 * ntasks) * 1e6, t2 - t1)
+
+
+def bench_memory(nfiles: int) -> None:
+    # main-process memory per file for FolderCache-like graph (hashing task + own task per file)
+    #   'graph' is what Parallel itself allocates, 'total' also includes Task objects and their names
+    parallel = tasks.Parallel(None, nproc=1)
+    parallel.add_task(tasks.OwnTask('bench.ownhash.*.done', lambda _: None, None, ['bench.ownhash.*']))
+    fpaths = ['c:\\mo2\\mods\\some mod\\textures\\{}\\file{}.dds'.format(i % 1000, i) for i in range(nfiles)]
+    owntaskf = lambda _, o: None
+    gc.collect()
+    tracemalloc.start()
+    snap0 = tracemalloc.take_snapshot()
+    for fpath in fpaths:
+        parallel.add_tasks([tasks.Task('bench.hash.' + fpath, _bench_sleep_task_func, (0.,), []),
+                            tasks.OwnTask('bench.ownhash.' + fpath, owntaskf, None, ['bench.hash.' + fpath])])
+    gc.collect()
+    snap1 = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = 0
+    graph = 0
+    for stat in snap1.compare_to(snap0, 'filename'):
+        total += stat.size_diff
+        fname = stat.traceback[0].filename
+        if fname.endswith('_tasks_parallel.py') or fname.endswith('common.py'):
+            graph += stat.size_diff
+    info('bench memory: {} files: total {:.0f} bytes/file, including graph {:.0f} bytes/file',
+         nfiles, total / nfiles, graph / nfiles)
+
+
+class _BenchFile:  # same shape as FolderCache's FileOnDisk
+    def __init__(self, file_hash: bytes, file_modified: float, file_path: str, file_size: int):
+        self.file_hash = file_hash
+        self.file_modified = file_modified
+        self.file_path = file_path
+        self.file_size = file_size
+
+
+def bench_file_table(nfiles: int) -> None:
+    # returning nfiles file records: pickle (as via PQueue) vs SharedFileTable, both sides within one process
+    files = [_BenchFile(hashlib.sha256(str(i).encode()).digest(), 1.7e9 + i,
+                        'c:\\mo2\\mods\\some mod {}\\textures\\file{}.dds'.format(i // 100, i), 1000 + i)
+             for i in range(nfiles)]
+    t0 = time.perf_counter()
+    data = pickle.dumps(files)
+    t1 = time.perf_counter()
+    pickle.loads(data)
+    t2 = time.perf_counter()
+    info('bench file_table: {} files: pickle: sender {:.2f}s, main process {:.2f}s, {} bytes',
+         nfiles, t1 - t0, t2 - t1, len(data))
+
+    t0 = time.perf_counter()
+    table = tasks.SharedFileTable([f.file_path for f in files], [f.file_hash for f in files],
+                                  [f.file_size for f in files], [f.file_modified for f in files])
+    t1 = time.perf_counter()
+    block = _ReceivedBlock(tasks.make_shared_file_table_param(table))
+    with tasks.SharedFileTableView(block.buf, block.close) as view:
+        t2 = time.perf_counter()
+        total = sum(view.sizes)  # typical columnar consumer, no objects at all
+        t3 = time.perf_counter()
+        paths = view.paths()
+        t4 = time.perf_counter()
+        assert len(paths) == nfiles and total == sum(f.file_size for f in files)
+    _pool_of_shared_returns.done_with([(table.slab, table.offset)])
+    info('bench file_table: {} files: SharedFileTable: sender {:.2f}s, main process: attaching {:.3f}s, '
+         'summing sizes {:.3f}s, all paths {:.2f}s', nfiles, t1 - t0, t2 - t1, t3 - t2, t4 - t3)
+
+
+def bench_file_table_publication(nfiles: int, nlookups: int) -> None:
+    # what each scanning child pays for published file records: unpickled dict vs sorted SharedFileTablePublication
+    files = [_BenchFile(hashlib.sha256(str(i).encode()).digest(), 1.7e9 + i,
+                        'c:\\mo2\\mods\\some mod {}\\textures\\file{}.dds'.format(i // 100, i), 1000 + i)
+             for i in range(nfiles)]
+    lookups = [files[random.randrange(nfiles)].file_path for _ in range(nlookups)]
+    pool = tasks.ProcessPool(1)  # never started, just holds publications
+    pub = tasks.SharedPublication(pool, {f.file_path: f for f in files})
+    tablepub = tasks.SharedFileTablePublication(pool, [f.file_path for f in files], [f.file_hash for f in files],
+                                                [f.file_size for f in files], [f.file_modified for f in files])
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    filesbypath = tasks.from_publication(tasks.make_shared_publication_param(pub), should_cache=False)
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    t1 = time.perf_counter()
+    for p in lookups:
+        assert filesbypath.get(p) is not None
+    t2 = time.perf_counter()
+    del filesbypath
+    info('bench file_table_publication: {} files: dict: per child {:.2f}s, {:.1f}M, {} lookups {:.3f}s',
+         nfiles, t1 - t0, mem / 1048576, nlookups, t2 - t1)
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    view = tasks.from_file_table_publication(tasks.make_shared_publication_param(tablepub))
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    t1 = time.perf_counter()
+    for p in lookups:
+        assert view.find(p) >= 0
+    t2 = time.perf_counter()
+    info('bench file_table_publication: {} files: sorted table: per child {:.4f}s, {:.3f}M, {} lookups {:.3f}s',
+         nfiles, t1 - t0, mem / 1048576, nlookups, t2 - t1)
+    for name in list(pool.publications):
+        pool.unpublish(name)
+
+
+def bench_shared_returns(nreturns: int, itemsize: int) -> None:
+    # per-return cost: dedicated shm segment per return (as it used to be) vs arena block, both sides in one process
+    item = bytes(itemsize)
+    t0 = time.perf_counter()
+    for _ in range(nreturns):
+        data = pickle.dumps(item)
+        shm = shared_memory.SharedMemory(create=True, size=len(data))
+        shm.buf[:] = data
+        rshm = shared_memory.SharedMemory(shm.name)
+        pickle.loads(rshm.buf)
+        rshm.close()
+        shm.close()
+        shm.unlink()
+    t1 = time.perf_counter()
+    info('bench shared_returns: {} returns of {} bytes: shm per return: {:.1f}us/return',
+         nreturns, itemsize, (t1 - t0) / nreturns * 1e6)
+
+    nslabs0 = _pool_of_shared_returns.n_slabs_created
+    released = []
+    t0 = time.perf_counter()
+    for i in range(nreturns):
+        param = tasks.make_shared_return_param(tasks.SharedReturn(item))
+        block = _ReceivedBlock(param)
+        _load_payload(block.buf, True)
+        block.close()
+        released.append((param[0], param[1]))
+        if len(released) >= 100:  # roughly what comes back with one request
+            _pool_of_shared_returns.done_with(released)
+            released = []
+    _pool_of_shared_returns.done_with(released)
+    t1 = time.perf_counter()
+    info('bench shared_returns: {} returns of {} bytes: arena: {:.1f}us/return, {} slab(s) created',
+         nreturns, itemsize, (t1 - t0) / nreturns * 1e6, _pool_of_shared_returns.n_slabs_created - nslabs0)
+
+
+def bench_oob(nmbytes: int, nreturns: int) -> None:
+    # SharedReturn of a large buffer: plain bytes (in-band) vs PickleBuffer (out-of-band), copied or viewed by receiver
+    payload = random.randbytes(nmbytes * 1048576)
+    for name, item, zerocopy in (('in-band', payload, False), ('out-of-band', pickle.PickleBuffer(payload), False),
+                                 ('out-of-band, zero-copy', pickle.PickleBuffer(payload), True)):
+        t0 = time.perf_counter()
+        tsend = 0.
+        for _ in range(nreturns):
+            param = tasks.make_shared_return_param(tasks.SharedReturn(item))
+            t1 = time.perf_counter()
+            tsend += t1 - t0
+            block = _ReceivedBlock(param)
+            if zerocopy:
+                view = tasks.SharedReturnView(block.buf, None)
+                assert len(view.value) == len(payload)
+                view.close()
+            else:
+                assert len(_load_payload(block.buf, True)) == len(payload)
+            block.close()
+            _pool_of_shared_returns.done_with([(param[0], param[1])])
+            t0 = time.perf_counter()
+            trecv = t0 - t1
+        info('bench oob: {}M, {}: sender {:.1f}ms, receiver {:.1f}ms',
+             nmbytes, name, tsend / nreturns * 1000., trecv * 1000.)
+
+
+def _bench_drain_logq(logq: SimpleQueue, got: list[int]) -> None:
+    while True:
+        msg = logq.get()
+        if msg is None:
+            break  # while True
+        got[0] += len(msg.records) if isinstance(msg, _LogBatch) else 1
+
+
+def bench_child_logging(nmsgs: int) -> None:
+    # cost of debug() in a child process hot loop: one LogRecord per message (as it used to be) vs batches,
+    #   vs debug level filtered out in the child
+    results = []
+    for name in ('per-record', 'batched', 'filtered'):
+        logq = SimpleQueue()
+        got = [0]
+        drain = Thread(target=_bench_drain_logq, args=(logq, got))
+        drain.start()
+        batcher = _ChildLogBatcher(logq)
+        t0 = time.perf_counter()
+        if name == 'per-record':
+            for i in range(nmsgs):
+                logq.put((0, time.perf_counter(), make_log_record(logging.DEBUG, 'bench: file #{}'.format(i))))
+        else:
+            batcher.install(logging.DEBUG if name == 'batched' else logging.INFO)
+            for i in range(nmsgs):
+                debug('bench: file #{}', i)
+            batcher.uninstall()
+        t1 = time.perf_counter()
+        logq.put(None)
+        drain.join()
+        results.append((name, (t1 - t0) / nmsgs * 1e6, got[0]))
+    info('bench child_logging: {} debug() calls', nmsgs)
+    for name, us, ngot in results:
+        info('-> {}: {:.2f}us/call, {} record(s) received', name, us, ngot)
+
+
+def _bench_scan_loop(fpaths: list[str], lazy: bool) -> float:
+    # logging of FolderCache.scan_dir() per file, without the scanning itself
+    t0 = time.perf_counter()
+    if lazy:
+        for fpath in fpaths:
+            debug('FolderCache: not found {}', fpath)
+    else:
+        for fpath in fpaths:
+            debug('FolderCache: not found {}'.format(fpath))
+    return (time.perf_counter() - t0) / len(fpaths) * 1e6
+
+
+def bench_lazy_logging(nfiles: int) -> None:
+    # debug() per scanned file with debug level disabled, in main process (logger level) and in child (sink level)
+    fpaths = ['c:\\games\\skyrim\\data\\meshes\\{}\\mesh{}.nif'.format(i % 97, i) for i in range(nfiles)]
+    results = []
+    root = logging.getLogger()
+    oldlevel = root.level
+    root.setLevel(logging.INFO)
+    for lazy in (False, True):
+        results.append(('main process', lazy, _bench_scan_loop(fpaths, lazy)))
+    root.setLevel(oldlevel)
+    batcher = _ChildLogBatcher(SimpleQueue())
+    batcher.install(logging.INFO)
+    for lazy in (False, True):
+        results.append(('child', lazy, _bench_scan_loop(fpaths, lazy)))
+    batcher.uninstall()
+    info('bench lazy_logging: {} files, debug level disabled', nfiles)
+    for where, lazy, us in results:
+        info('-> {}, {}: {:.3f}us/file', where, 'lazy args' if lazy else 'eager format()', us)
+
+
+def bench_log_sinks(nrecs: int) -> None:
+    # logging thread cost per record: HTML file (formatted right away) vs NDJSON (formatted by background writer)
+    recs = [make_log_record(logging.DEBUG, 'bench: file #{}'.format(i)) for i in range(nrecs)]
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in ('html', 'ndjson'):
+            if name == 'html':
+                handler = _HtmlFileHandler(os.path.join(tmpdir, 'bench.log.html'))
+                handler.setFormatter(_SanguineHtmlFileFormatter())
+            else:
+                handler = _NdjsonFileHandler(os.path.join(tmpdir, 'bench.log.ndjson'))
+            t0 = time.perf_counter()
+            for rec in recs:
+                handler.emit(rec)
+            t1 = time.perf_counter()
+            handler.close()
+            results.append((name, (t1 - t0) / nrecs * 1e6, (time.perf_counter() - t0) / nrecs * 1e6))
+    info('bench log_sinks: {} records', nrecs)
+    for name, emitus, totalus in results:
+        info('-> {}: emit() {:.2f}us/record, {:.2f}us/record including writer', name, emitus, totalus)
+
+
+_BENCH_OWN_PER_CALL: float = 0.002  # fixed cost of own task call (e.g. updating some index), amortized by batching
+_BENCH_OWN_PER_ITEM: float = 0.0002
+
+
+def _bench_own_task_func(_, out: float) -> None:
+    time.sleep(_BENCH_OWN_PER_CALL + _BENCH_OWN_PER_ITEM)
+
+
+def _bench_own_task_batch_func(items: list[tuple]) -> list[None]:
+    time.sleep(_BENCH_OWN_PER_CALL + _BENCH_OWN_PER_ITEM * len(items))
+    return [None] * len(items)
+
+
+def _run_own_tasks(nproc: int, ntasks: int, childdt: float, coalesce: bool | None) -> float:
+    owntasks = [tasks.OwnTask('bench.own.{}'.format(i), _bench_own_task_func, None, ['bench.task.{}'.format(i)],
+                              batchf=_bench_own_task_batch_func) for i in range(ntasks)]
+    with tasks.Parallel(None, nproc=nproc, coalesce_own_tasks=coalesce) as parallel:
+        t0 = time.perf_counter()
+        parallel.run([tasks.Task('bench.task.{}'.format(i), _bench_sleep_task_func, (childdt,), [], childdt)
+                      for i in range(ntasks)] + owntasks)
+        return time.perf_counter() - t0
+
+
+def bench_own_tasks(nproc: int, ntasks: int) -> None:
+    # short child tasks each followed by an own task, so that the main process is the bottleneck
+    childdt = _BENCH_OWN_PER_CALL * nproc / 2
+    results = []
+    for coalesce in (False, None):
+        elapsed = _run_own_tasks(nproc, ntasks, childdt, coalesce)
+        results.append((coalesce, elapsed, childdt * ntasks / (nproc * elapsed)))
+    info('bench own_tasks: {} processes, {} tasks, {:.1f}ms each', nproc, ntasks, childdt * 1000.)
+    for coalesce, elapsed, util in results:
+        info('-> coalesce_own_tasks={}: {:.2f}s, children utilization {:.0f}%', coalesce, elapsed, util * 100.)
+
+
+def _bench_lane_task_func(_) -> float:
+    return time.time()  # not perf_counter(), as it is compared across processes
+
+
+def _run_lanes(nproc: int, ntasks: int, bulkdt: float, lanes: dict[str, int]) -> list[float]:
+    # every ntasks/20 bulk tasks, an own task submits an 'interactive' task (estimated as heavier than bulk ones,
+    #   like a quick re-scan); returns their start latencies
+    latencies = []
+    lane = 'ui' if lanes else None
+    with tasks.Parallel(None, nproc=nproc, lanes=lanes) as parallel:
+        def submit(i: int) -> None:
+            submitted = time.time()
+            parallel.add_tasks([tasks.Task('bench.ui.{}'.format(i), _bench_lane_task_func, None, [], 0.05, lane=lane),
+                                tasks.OwnTask('bench.ownui.{}'.format(i), lambda _, started: latencies.append(
+                                    started - submitted), None, ['bench.ui.{}'.format(i)])])
+
+        tl = [tasks.Task('bench.task.{}'.format(i), _bench_sleep_task_func, (bulkdt,), [], bulkdt)
+              for i in range(ntasks)]
+        step = max(ntasks // 20, 1)
+        tl += [tasks.OwnTask('bench.submit.{}'.format(i), lambda _, _1, i=i: submit(i), None,
+                             ['bench.task.{}'.format(i)]) for i in range(0, ntasks, step)]
+        parallel.run(tl)
+    return latencies
+
+
+def bench_lanes(nproc: int, ntasks: int) -> None:
+    bulkdt = 0.02
+    results = []
+    for lanes in ({}, {'ui': 1}):
+        latencies = sorted(_run_lanes(nproc, ntasks, bulkdt, lanes))
+        results.append((lanes, latencies[len(latencies) // 2], latencies[-1]))
+    info('bench lanes: {} processes, {} bulk tasks, {:.0f}ms each', nproc, ntasks, bulkdt * 1000.)
+    for lanes, median, worst in results:
+        info('-> lanes={}: interactive task start latency median {:.3f}s, max {:.3f}s', lanes, median, worst)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'scheduler':
+        bench_scheduler(int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() - 1,
+                        int(sys.argv[3]) if len(sys.argv) > 3 else 2000)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'add_tasks':
+        bench_add_tasks(int(sys.argv[2]) if len(sys.argv) > 2 else 500000)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'memory':
+        bench_memory(int(sys.argv[2]) if len(sys.argv) > 2 else 200000)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'file_table':
+        bench_file_table(int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'file_table_publication':
+        bench_file_table_publication(int(sys.argv[2]) if len(sys.argv) > 2 else 1000000,
+                                     int(sys.argv[3]) if len(sys.argv) > 3 else 100000)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'shared_returns':
+        bench_shared_returns(int(sys.argv[2]) if len(sys.argv) > 2 else 20000,
+                             int(sys.argv[3]) if len(sys.argv) > 3 else 1000)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'oob':
+        bench_oob(int(sys.argv[2]) if len(sys.argv) > 2 else 64, int(sys.argv[3]) if len(sys.argv) > 3 else 10)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'child_logging':
+        bench_child_logging(int(sys.argv[2]) if len(sys.argv) > 2 else 200000)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'lazy_logging':
+        bench_lazy_logging(int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'log_sinks':
+        bench_log_sinks(int(sys.argv[2]) if len(sys.argv) > 2 else 200000)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'own_tasks':
+        bench_own_tasks(int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() - 1,
+                        int(sys.argv[3]) if len(sys.argv) > 3 else 2000)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'lanes':
+        bench_lanes(int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() - 1,
+                    int(sys.argv[3]) if len(sys.argv) > 3 else 5000)
+    else:
+        print('Usage:\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks scheduler [nproc] [ntasks]\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks add_tasks [ntasks]\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks memory [nfiles]\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks file_table [nfiles]\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks file_table_publication [nfiles] [nlookups]\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks shared_returns [nreturns] [itemsize]\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks oob [nmbytes] [nreturns]\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks child_logging [nmsgs]\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks lazy_logging [nfiles]\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks log_sinks [nrecs]\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks own_tasks [nproc] [ntasks]\n\t'
+              + 'py -m sanguine.tasks._tasks_benchmarks lanes [nproc] [ntasks]\n')
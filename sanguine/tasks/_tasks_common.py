@@ -30,6 +30,7 @@ class LambdaReplacement:
 
 
 class TaskDataDependencies:
+    __slots__ = ('required_tags', 'required_not_tags', 'provided_tags')
     required_tags: list[str]
     required_not_tags: list[str]
     provided_tags: list[str]
@@ -40,36 +41,164 @@ class TaskDataDependencies:
         self.provided_tags = provtags
 
 
+class TaskExecutor(enum.IntEnum):  # hint where non-own Task should run
+    Process = 0  # child process; param and result are pickled
+    Thread = 1  # thread pool within main process; for tasks spending most of their time in syscalls,
+    #             GIL-releasing hashing, or external processes. No pickling of param or result
+    Inline = 2  # directly within main thread; for very short tasks
+
+
+class TaskCost:  # alternative to Task.w: cost in family-specific units, converted into seconds by Parallel
+    #   family is e.g. 'sanguine.foldercache.hash', with units being bytes and items being files
+    #   Parallel learns per-item and per-unit costs for each family from completed tasks, and persists them
+    __slots__ = ('family', 'units', 'items')
+    family: str
+    units: float
+    items: int
+
+    def __init__(self, family: str, units: float, items: int = 1) -> None:
+        self.family = family
+        self.units = units
+        self.items = items
+
+
+class TaskResources:  # what a task needs while running; within Parallel(resource_budget=...), 0 means 'unlimited'
+    __slots__ = ('ram', 'tmp_disk', 'io')
+    ram: int  # bytes
+    tmp_disk: int  # bytes
+    io: int  # 'heavy I/O' tokens
+
+    def __init__(self, ram: int = 0, tmp_disk: int = 0, io: int = 0) -> None:
+        self.ram = ram
+        self.tmp_disk = tmp_disk
+        self.io = io
+
+    def as_tuple(self) -> tuple[int, int, int]:
+        return self.ram, self.tmp_disk, self.io
+
+
 class Task:
+    # there can be 1M+ of these, hence __slots__
+    __slots__ = ('name', 'f', 'param', 'dependencies', 'w', 'data_dependencies', 'executor', 'idempotent', 'timeout',
+                 'retries', 'resources', 'lane', 'locality')
     name: str
     f: Callable[[any, ...], any] | None  # variable # of params depending on len(dependencies)
     param: any
     dependencies: list[str]
-    w: float | None
+    w: float | TaskCost | None
     data_dependencies: TaskDataDependencies
-
-    def __init__(self, name: str, f: Callable, param: any, dependencies: list[str], w: float | None = None,
-                 datadeps: TaskDataDependencies = None) -> None:
+    executor: TaskExecutor
+    idempotent: bool  # output depends only on param and dependency outputs, so it can be journaled
+    timeout: float | None  # child process running the task longer than that is killed; None means Parallel default
+    retries: int | None  # on exception or child process crash; None means Parallel default
+    resources: TaskResources | None  # task won't start until Parallel's resource budget allows
+    lane: str | None  # priority lane, as in Parallel(lanes=...); None means bulk
+    locality: str | None  # task may run on remote agents having this locality; None means 'local processes only'
+
+    def __init__(self, name: str, f: Callable, param: any, dependencies: list[str], w: float | TaskCost | None = None,
+                 datadeps: TaskDataDependencies = None, executor: TaskExecutor = TaskExecutor.Process,
+                 idempotent: bool = False, timeout: float | None = None, retries: int | None = None,
+                 resources: TaskResources | None = None, lane: str | None = None,
+                 locality: str | None = None) -> None:
         self.name = name
         self.f = f
         self.param = param
         self.dependencies = dependencies
-        self.w: float = w
+        self.w = w
         self.data_dependencies = datadeps
+        self.executor = executor
+        self.idempotent = idempotent
+        self.timeout = timeout
+        self.retries = retries
+        self.resources = resources
+        self.lane = lane
+        self.locality = locality
 
 
 class OwnTask(Task):
-    pass
+    # batchf, if specified, allows Parallel to coalesce ready own tasks having the very same batchf (and the same
+    #   data dependency tags) into one batchf([(param, *depouts), ...]) -> [out, ...] call
+    __slots__ = ('batchf',)
+    batchf: Callable[[list[tuple]], list[any]] | None
+
+    def __init__(self, name: str, f: Callable, param: any, dependencies: list[str], w: float | TaskCost | None = None,
+                 datadeps: TaskDataDependencies = None,
+                 batchf: Callable[[list[tuple]], list[any]] | None = None) -> None:
+        super().__init__(name, f, param, dependencies, w, datadeps)
+        self.batchf = batchf
 
 
 class TaskPlaceholder(Task):
+    __slots__ = ()
+
     def __init__(self, name: str) -> None:
         super().__init__(name, lambda: None, None, [])
 
 
+class TaskGroup:
+    # one logical task over a list of params, to be added via Parallel.add_task_group()
+    #   Parallel splits it into size-balanced chunks, each chunk becoming one Task named name.<i>;
+    #   f(param, *deps) is called for each param within the chunk, and the list of its outputs is passed
+    #   in bulk to reducer(outs), which runs as an OwnTask named reducer_name.<i>
+    name: str
+    f: Callable[[any, ...], any]
+    params: list[any]
+    dependencies: list[str]
+    weights: list[float] | None  # per param, in cost_family units if specified, in seconds otherwise;
+    #                              None means 'small ones'
+    executor: TaskExecutor
+    reducer_name: str | None
+    reducer: Callable[[list[any]], None] | None
+    reducer_datadeps: TaskDataDependencies | None
+    idempotent: bool  # applies to chunk tasks
+    cost_family: str | None  # chunk tasks get TaskCost(cost_family, sum(weights), len(chunk))
+
+    def __init__(self, name: str, f: Callable, params: list[any], dependencies: list[str],
+                 weights: list[float] | None = None, executor: TaskExecutor = TaskExecutor.Process,
+                 reducer_name: str | None = None, reducer: Callable[[list[any]], None] | None = None,
+                 reducer_datadeps: TaskDataDependencies = None, idempotent: bool = False,
+                 cost_family: str | None = None) -> None:
+        assert cost_family is None or weights is not None
+        assert weights is None or len(weights) == len(params)
+        assert (reducer_name is None) == (reducer is None)
+        self.name = name
+        self.f = f
+        self.params = params
+        self.dependencies = dependencies
+        self.weights = weights
+        self.executor = executor
+        self.reducer_name = reducer_name
+        self.reducer = reducer
+        self.reducer_datadeps = reducer_datadeps
+        self.idempotent = idempotent
+        self.cost_family = cost_family
+
+
+def _task_group_chunk_func(param: tuple[Callable, list[any]], *deps) -> list[any]:
+    (f, params) = param
+    return [f(p, *deps) for p in params]
+
+
 type TaskStatsOfInterest = list[str]
 
 
 class ProcessStarted:
     def __init__(self, proc_num: int) -> None:
         self.proc_num = proc_num
+
+
+class ProcessDied:  # reported by ProcessPool watchdog, process is to be respawned
+    def __init__(self, proc_num: int, exitcode: int | None, timed_out: bool, cancelled: bool = False) -> None:
+        self.proc_num = proc_num
+        self.exitcode = exitcode
+        self.timed_out = timed_out
+        self.cancelled = cancelled  # killed via ProcessPool.cancel(), nobody is to blame
+
+
+class TaskFailed:  # exception in a task within child process (or thread pool); the process itself goes on
+    def __init__(self, proc_num: int, taskname: str, outtasks: list[tuple[str, tuple[float, float, float], any]],
+                 notstarted: list[str]) -> None:
+        self.proc_num = proc_num
+        self.taskname = taskname
+        self.outtasks = outtasks  # tasks completed within the same batch before the failed one
+        self.notstarted = notstarted  # tasks within the same batch after the failed one
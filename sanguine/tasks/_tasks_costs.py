@@ -0,0 +1,134 @@
+from sanguine.tasks._tasks_common import *
+
+_COST_DECAY: float = 0.97  # per observation, so the model follows changes (disk cache warming up, etc.)
+_COST_MIN_OBSERVATIONS: float = 4.  # (decayed) number of observations before trusting two-parameter fit
+_COST_DEFAULT_PER_ITEM: float = 1.0  # family without priors, same as default for non-own Task
+
+
+class _TaskCostFamily:
+    # time = per_item * items + per_unit * units, fitted by exponentially decayed least squares;
+    #   until there is enough data for both parameters, priors are just scaled to fit
+    __slots__ = ('prior_per_item', 'prior_per_unit', 'per_item', 'per_unit', 'n', 'sii', 'siu', 'suu', 'sit', 'sut',
+                 'run_n', 'run_predicted', 'run_actual', 'run_abs_err')
+    prior_per_item: float
+    prior_per_unit: float
+    per_item: float
+    per_unit: float
+    n: float  # decayed sums
+    sii: float
+    siu: float
+    suu: float
+    sit: float
+    sut: float
+    run_n: int  # within this Parallel, for the report
+    run_predicted: float
+    run_actual: float
+    run_abs_err: float
+
+    def __init__(self, prior_per_item: float, prior_per_unit: float) -> None:
+        self.prior_per_item = prior_per_item
+        self.prior_per_unit = prior_per_unit
+        self.n = self.sii = self.siu = self.suu = self.sit = self.sut = 0.
+        self.run_n = 0
+        self.run_predicted = self.run_actual = self.run_abs_err = 0.
+        self.refit()
+
+    def estimate(self, units: float, items: int) -> float:
+        return self.per_item * items + self.per_unit * units
+
+    def observe(self, units: float, items: int, dt: float, predicted: float) -> None:
+        self.n = self.n * _COST_DECAY + 1.
+        self.sii = self.sii * _COST_DECAY + items * items
+        self.siu = self.siu * _COST_DECAY + items * units
+        self.suu = self.suu * _COST_DECAY + units * units
+        self.sit = self.sit * _COST_DECAY + items * dt
+        self.sut = self.sut * _COST_DECAY + units * dt
+        self.refit()
+
+        self.run_n += 1
+        self.run_predicted += predicted
+        self.run_actual += dt
+        self.run_abs_err += abs(predicted - dt)
+
+    def refit(self) -> None:
+        det = self.sii * self.suu - self.siu * self.siu
+        if self.n >= _COST_MIN_OBSERVATIONS and det > 1e-9 * self.sii * self.suu:
+            a = (self.sit * self.suu - self.sut * self.siu) / det
+            b = (self.sii * self.sut - self.siu * self.sit) / det
+            if a < 0.:
+                a = 0.
+                b = self.sut / self.suu
+            elif b < 0.:
+                b = 0.
+                a = self.sit / self.sii
+            self.per_item = a
+            self.per_unit = b
+            return
+
+        a0 = self.prior_per_item
+        b0 = self.prior_per_unit
+        if a0 == 0. and b0 == 0.:
+            a0 = _COST_DEFAULT_PER_ITEM
+        # least squares scale k for time = k * prior(items, units)
+        spp = a0 * a0 * self.sii + 2. * a0 * b0 * self.siu + b0 * b0 * self.suu
+        spt = a0 * self.sit + b0 * self.sut
+        k = spt / spp if spp > 0. else 1.
+        self.per_item = k * a0
+        self.per_unit = k * b0
+
+    def to_json(self) -> list[float]:
+        return [self.n, self.sii, self.siu, self.suu, self.sit, self.sut]
+
+    def from_json(self, sums: list[float]) -> None:
+        (self.n, self.sii, self.siu, self.suu, self.sit, self.sut) = sums
+        self.refit()
+
+
+class _TaskCostModel:
+    # per-family costs for TaskCost, learned online and persisted together with per-name weights
+    families: dict[str, _TaskCostFamily]
+
+    def __init__(self, jsonfamilies: dict[str, list[float]]) -> None:
+        self.families = {}
+        for family, sums in jsonfamilies.items():
+            try:
+                self._family(family).from_json(sums)
+            except Exception as e:
+                warn('Parallel: cannot load cost model for {}: {}, ignoring', family, e)
+                self.families[family] = _TaskCostFamily(0., 0.)
+
+    def _family(self, family: str) -> _TaskCostFamily:
+        fam = self.families.get(family)
+        if fam is None:
+            fam = _TaskCostFamily(0., 0.)
+            self.families[family] = fam
+        return fam
+
+    def set_priors(self, family: str, per_item: float, per_unit: float) -> None:
+        fam = self._family(family)
+        fam.prior_per_item = per_item
+        fam.prior_per_unit = per_unit
+        fam.refit()
+
+    def estimate(self, cost: TaskCost) -> float:
+        return self._family(cost.family).estimate(cost.units, cost.items)
+
+    def observe(self, cost: TaskCost, dt: float, predicted: float) -> None:
+        fam = self._family(cost.family)
+        if abs(predicted - dt) > predicted * 0.3:  # ~30% tolerance
+            debug('Parallel: cost family {}: expected={:.2f}, real={:.2f} for units={} items={}',
+                  cost.family, predicted, dt, cost.units, cost.items)
+        fam.observe(cost.units, cost.items, dt, predicted)
+
+    def to_json(self) -> dict[str, list[float]]:
+        return {family: fam.to_json() for family, fam in sorted(self.families.items()) if fam.n > 0.}
+
+    def log_report(self) -> None:
+        for family, fam in sorted(self.families.items()):
+            if fam.run_n == 0:
+                continue  # for family
+            info('-> {}: {} task(s), predicted/actual={:.2f}/{:.2f}s, mean abs error {:.1f}%, '
+                 'now {:.3g}s/item+{:.3g}s/unit', family, fam.run_n, fam.run_predicted, fam.run_actual,
+                 fam.run_abs_err / fam.run_actual * 100.
+                 if fam.run_actual > 0. else 0.,
+                 fam.per_item, fam.per_unit)
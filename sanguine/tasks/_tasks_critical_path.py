@@ -0,0 +1,110 @@
+# critical path and idle gaps of a Parallel run, from its trace (as written by Parallel(trace=...))
+# usage: py -m sanguine.tasks._tasks_critical_path <trace.json> [ngaps]
+import json
+import sys
+
+from sanguine.tasks._tasks_common import *
+
+
+class TracedTask:
+    name: str
+    worker: str
+    ready: float  # all times are in seconds since trace start
+    ready_by: str | None
+    dispatched: float
+    started: float
+    ended: float
+    received: float
+
+    def __init__(self, event: dict[str, any]) -> None:
+        args = event['args']
+        self.name = event['name']
+        self.worker = args['worker']
+        self.ready = args['ready'] / 1e6
+        self.ready_by = args['ready_by']
+        self.dispatched = args['dispatched'] / 1e6
+        self.started = event['ts'] / 1e6
+        self.ended = (event['ts'] + event['dur']) / 1e6
+        self.received = args['received'] / 1e6
+
+
+def load_trace(fname: str) -> dict[str, TracedTask]:
+    with open(fname, 'rt', encoding='utf-8') as rf:
+        trace = json.load(rf)
+    return {ev['name']: TracedTask(ev) for ev in trace['traceEvents'] if ev.get('cat') == 'task'}
+
+
+def critical_path(tasks: dict[str, TracedTask]) -> list[TracedTask]:
+    # going back from the last task to complete, each time to the dependency which made the task ready
+    if len(tasks) == 0:
+        return []
+    t = max(tasks.values(), key=lambda tt: tt.received)
+    path = [t]
+    while t.ready_by is not None and t.ready_by in tasks:
+        t = tasks[t.ready_by]
+        path.append(t)
+    path.reverse()
+    return path
+
+
+def idle_gaps(tasks: dict[str, TracedTask]) -> dict[str, list[tuple[float, float]]]:
+    # per worker, intervals within [first ready, last received] when it was running nothing
+    if len(tasks) == 0:
+        return {}
+    t0 = min(tt.ready for tt in tasks.values())
+    t1 = max(tt.received for tt in tasks.values())
+    byworker: dict[str, list[TracedTask]] = {}
+    for tt in tasks.values():
+        if tt.worker != 'journal':  # nothing has been really run
+            byworker.setdefault(tt.worker, []).append(tt)
+    gaps = {}
+    for worker, wtasks in byworker.items():
+        wgaps = []
+        busyuntil = t0
+        for tt in sorted(wtasks, key=lambda x: x.started):  # thread pool tasks may overlap
+            if tt.started > busyuntil:
+                wgaps.append((busyuntil, tt.started))
+            busyuntil = max(busyuntil, tt.ended)
+        if t1 > busyuntil:
+            wgaps.append((busyuntil, t1))
+        gaps[worker] = wgaps
+    return gaps
+
+
+def log_report(tasks: dict[str, TracedTask], ngaps: int) -> None:
+    path = critical_path(tasks)
+    if len(path) == 0:
+        info('Trace is empty')
+        return
+    makespan = path[-1].received - min(tt.ready for tt in tasks.values())
+    info('Critical path: {} task(s), {:.3f}s of {:.3f}s makespan:', len(path), path[-1].received - path[0].ready,
+         makespan)
+    totals = [0., 0., 0., 0., 0.]
+    prev = None
+    for tt in path:
+        parts = (tt.ready - prev.received if prev is not None else 0., tt.dispatched - tt.ready,
+                 tt.started - tt.dispatched, tt.ended - tt.started, tt.received - tt.ended)
+        for i, dt in enumerate(parts):
+            totals[i] += dt
+        info('-> {} @{}: ready+{:.3f}s, queued {:.3f}s, to worker {:.3f}s, run {:.3f}s, back {:.3f}s',
+             tt.name, tt.worker, *parts)
+        prev = tt
+    info('Critical path totals: ready {:.3f}s, queued {:.3f}s, to worker {:.3f}s, run {:.3f}s, back {:.3f}s', *totals)
+
+    gaps = idle_gaps(tasks)
+    info('Idle time per worker:')
+    for worker, wgaps in sorted(gaps.items()):
+        idle = sum(g1 - g0 for g0, g1 in wgaps)
+        info('-> {}: idle {:.3f}s ({:.1f}%) in {} gap(s)', worker, idle, idle / makespan * 100.
+             if makespan > 0. else 0., len(wgaps))
+    allgaps = sorted(((g1 - g0, g0, worker) for worker, wgaps in gaps.items() for g0, g1 in wgaps), reverse=True)
+    info('Largest idle gaps:')
+    for dt, g0, worker in allgaps[:ngaps]:
+        info('-> {}: {:.3f}s starting at {:.3f}s', worker, dt, g0)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage:\n\tpy -m sanguine.tasks._tasks_critical_path <trace.json> [ngaps]\n')
+    else:
+        log_report(load_trace(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 10)
@@ -0,0 +1,112 @@
+import hashlib
+
+from sanguine.tasks._tasks_common import *
+
+
+def _task_fingerprint(task: Task, depouts: list[any]) -> bytes | None:
+    # None if param or dependency outputs cannot be pickled (lambdas etc.), such tasks are just not journaled
+    try:
+        data = pickle.dumps((task.param, depouts), protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        debug('Parallel: cannot fingerprint task {}: {}, not journaling it', task.name, e)
+        return None
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _group_param_fingerprint(param: any) -> bytes | None:
+    try:
+        data = pickle.dumps(param, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _group_journal_key(group: TaskGroup) -> str:
+    # per-param outputs of idempotent TaskGroup depend only on f and param; neither group name nor chunking
+    #   (which depends on the other params, number of workers, and cost estimates) is stable across restarts
+    return '{}:{}'.format(group.f.__module__, group.f.__qualname__)
+
+
+class _TaskJournal:
+    # append-only file of (taskname, fingerprint, out) records of completed idempotent tasks
+    #   if Parallel is killed, next Parallel with the same journal completes such tasks from the journal
+    #   instead of running them again (provided that param and dependency outputs are the same)
+    # params of idempotent TaskGroups without dependencies are journaled one by one instead, as
+    #   ((groupkey, fingerprint), None, out) records, so that restart skips each param already done
+    # NB: shared memory is gone after restart, so idempotent tasks should not return SharedReturnParam
+    fname: str
+    records: dict[str, tuple[bytes, any]]  # taskname->(fingerprint,out)
+    param_records: dict[tuple[str, bytes], any]  # (groupkey,fingerprint)->out
+    nhits: int
+    nparamhits: int
+    _wf: any
+
+    def __init__(self, fname: str) -> None:
+        self.fname = fname
+        self.records = {}
+        self.param_records = {}
+        self.nhits = 0
+        self.nparamhits = 0
+        goodsize = 0
+        if os.path.isfile(fname):
+            with open(fname, 'rb') as rf:
+                while True:
+                    try:
+                        (taskname, fingerprint, out) = pickle.load(rf)
+                    except EOFError:
+                        break  # while True
+                    except Exception as e:  # last record was only partially written when we were killed
+                        warn('Parallel: journal {} is truncated at {}: {}', fname, goodsize, e)
+                        break  # while True
+                    if isinstance(taskname, tuple):
+                        self.param_records[taskname] = out
+                    else:
+                        self.records[taskname] = (fingerprint, out)
+                    goodsize = rf.tell()
+            info('Parallel: journal {}: {} task record(s) and {} group param record(s) loaded', fname,
+                 len(self.records), len(self.param_records))
+        self._wf = open(fname, 'r+b' if goodsize > 0 else 'wb')
+        self._wf.truncate(goodsize)
+        self._wf.seek(goodsize)
+
+    def lookup(self, taskname: str, fingerprint: bytes) -> tuple[bool, any]:
+        rec = self.records.pop(taskname, None)  # task names are unique, so it won't be looked up again
+        if rec is None or rec[0] != fingerprint:
+            return False, None
+        self.nhits += 1
+        return True, rec[1]
+
+    def lookup_param(self, groupkey: str, fingerprint: bytes) -> tuple[bool, any]:
+        key = (groupkey, fingerprint)
+        if key not in self.param_records:
+            return False, None
+        self.nparamhits += 1
+        return True, self.param_records.pop(key)
+
+    def append(self, taskname: str, fingerprint: bytes, out: any) -> None:
+        try:
+            data = pickle.dumps((taskname, fingerprint, out), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            warn('Parallel: cannot journal output of task {}: {}', taskname, e)
+            return
+        self._wf.write(data)  # single write per record, so that only the last one can be partial
+        self._wf.flush()
+
+    def append_params(self, groupkey: str, fingerprints: list[bytes], outs: list[any]) -> None:
+        assert len(fingerprints) == len(outs)
+        data = []
+        for fingerprint, out in zip(fingerprints, outs):
+            if fingerprint is None:  # param cannot be pickled
+                continue  # for fingerprint
+            try:
+                data.append(pickle.dumps(((groupkey, fingerprint), None, out), protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception as e:
+                warn('Parallel: cannot journal output of {}: {}', groupkey, e)
+        self._wf.write(b''.join(data))  # records are self-delimiting, so a partial write loses only the tail
+        self._wf.flush()
+
+    def close(self, completed: bool) -> None:
+        # after successful completion, whoever needs the results has already stored them, so journal is not needed
+        self._wf.close()
+        if completed:
+            os.remove(self.fname)
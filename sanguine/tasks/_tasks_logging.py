@@ -1,9 +1,11 @@
 import logging
 import time
 from multiprocessing import SimpleQueue
-from threading import Thread
+from threading import Lock, Thread
+from types import FrameType
 
-from sanguine.install.install_logging import (log_record, log_record_skip_console, make_log_record)
+from sanguine.install.install_logging import (log_record, log_record_skip_console, make_log_record,
+                                              make_log_record_at, set_logging_sink)
 from sanguine.tasks._tasks_common import current_proc_num
 
 
@@ -11,17 +13,127 @@ def create_logging_thread(logq: SimpleQueue, outlogq: SimpleQueue) -> Thread:
     return Thread(target=_logging_thread_func, args=(logq, outlogq))
 
 
-class _ChildProcessLogHandler(logging.StreamHandler):
+### child side: instead of pickling LogRecord per message, child buffers compact records and sends them in batches
+#   record is (levelno, perf_counter(), siteid, msg or args), where site is (pathname, lineno, funcname, format)
+#   of the caller; each site is sent only once per process, within the first batch which refers to it
+#   if args are all plain, formatting is left to logging thread, otherwise message is formatted right away
+
+_CHILD_LOG_FLUSH_PERIOD: float = 0.05
+_CHILD_LOG_MAX_BATCH: int = 1000
+_PLAIN_LOG_ARG_TYPES: frozenset[type] = frozenset((str, int, float, bool, type(None)))
+
+_LogSite = tuple[str, int, str, str]
+_LogBatchRecord = tuple[int, float, int, str | tuple]
+
+
+class _LogBatch:  # child -> logging thread
+    procnum: int
+    newsites: list[_LogSite]  # get ids starting from nsites
+    nsites: int
+    records: list[_LogBatchRecord]
+    sent: float
+    clockoffset: float  # to be added to record times; non-zero only for remote workers
+
+    def __init__(self, procnum: int, nsites: int, newsites: list[_LogSite], records: list[_LogBatchRecord]) -> None:
+        self.procnum = procnum
+        self.nsites = nsites
+        self.newsites = newsites
+        self.records = records
+        self.sent = time.perf_counter()
+        self.clockoffset = 0.
+
+
+class _ChildLogBatcher:
     logq: SimpleQueue
+    _sites: dict[tuple[str, int], int]
+    _sitefmts: list[str]
+    _newsites: list[_LogSite]
+    _records: list[_LogBatchRecord]
+    _lock: Lock
+    _flusher: Thread | None
+    _stopping: bool
 
     def __init__(self, logq: SimpleQueue) -> None:
-        super().__init__()
         self.logq = logq
+        self._sites = {}
+        self._sitefmts = []
+        self._newsites = []
+        self._records = []
+        self._lock = Lock()  # tasks may log from their own threads, in addition to our flusher
+        self._flusher = None
+        self._stopping = False
+
+    def install(self, level: int) -> None:
+        set_logging_sink(self.sink, level)
+        self._flusher = Thread(target=self._flusher_func, daemon=True)
+        self._flusher.start()
+
+    def uninstall(self) -> None:
+        set_logging_sink(None, logging.DEBUG)
+        self._stopping = True
+        self.flush()
+
+    def _site_id(self, pathname: str, lineno: int, func: str, fmt: str) -> int:
+        key = (pathname, lineno)
+        siteid = self._sites.get(key)
+        if siteid is None:
+            siteid = len(self._sites)
+            self._sites[key] = siteid
+            self._sitefmts.append(fmt)
+            self._newsites.append((pathname, lineno, func, fmt))
+        return siteid
+
+    def sink(self, level: int, msg: str, args: tuple, frame: FrameType) -> None:
+        code = frame.f_code
+        with self._lock:
+            siteid = self._site_id(code.co_filename, frame.f_lineno, code.co_name, msg)
+            if args:
+                if self._sitefmts[siteid] == msg and all(type(arg) in _PLAIN_LOG_ARG_TYPES for arg in args):
+                    msg = args
+                else:
+                    msg = msg.format(*args)
+            self._records.append((level, time.perf_counter(), siteid, msg))
+            if len(self._records) >= _CHILD_LOG_MAX_BATCH:
+                self._flush_locked()
+
+    def add_record(self, record: logging.LogRecord) -> None:
+        with self._lock:
+            self._records.append((record.levelno, time.perf_counter(),
+                                  self._site_id(record.pathname, record.lineno, record.funcName, ''),
+                                  record.getMessage()))
+            if len(self._records) >= _CHILD_LOG_MAX_BATCH:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        # called periodically, and also before child sends anything to outq, so that its log comes first
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if len(self._records) == 0:
+            return
+        batch = _LogBatch(current_proc_num(), len(self._sites) - len(self._newsites), self._newsites, self._records)
+        self._newsites = []
+        self._records = []
+        self.logq.put(batch)
+
+    def _flusher_func(self) -> None:
+        while not self._stopping:
+            time.sleep(_CHILD_LOG_FLUSH_PERIOD)
+            self.flush()
+
+
+class _ChildProcessLogHandler(logging.StreamHandler):
+    # whatever goes to logging directly rather than via our debug()/info()/..., e.g. from 3rd-party modules
+    batcher: _ChildLogBatcher
+
+    def __init__(self, batcher: _ChildLogBatcher) -> None:
+        super().__init__()
+        self.batcher = batcher
 
     def emit(self, record: logging.LogRecord) -> None:
         assert current_proc_num() >= 0
-        self.logq.put((current_proc_num(), time.perf_counter(), record))
-        # print(record.getMessage())
+        self.batcher.add_record(record)
 
 
 _log_elapsed: float | None = None
@@ -59,6 +171,8 @@ class _LoggingThreadState:
     _log_outq: SimpleQueue
     _last_n_without_wait: int
     _last_n_with_spurious_wait: int
+    _sites: dict[int, list[_LogSite]]  # per procnum; respawned process starts from scratch, overwriting them
+    _pending: list[tuple]  # rest of the last batch, reversed
 
     def __init__(self, outlogq: SimpleQueue) -> None:
         self._state = 0
@@ -67,10 +181,32 @@ class _LoggingThreadState:
         self._log_outq = outlogq
         self._last_n_without_wait = 0
         self._last_n_with_spurious_wait = 0
+        self._sites = {}
+        self._pending = []
+
+    def _expand_batch(self, batch: _LogBatch) -> None:
+        sites = self._sites.setdefault(batch.procnum, [])
+        del sites[batch.nsites:]
+        sites += batch.newsites
+        prefix = 'Process #{}: '.format(batch.procnum + 1)
+        pending = []
+        for (levelno, t, siteid, msg) in batch.records:
+            (pathname, lineno, func, fmt) = sites[siteid]
+            if isinstance(msg, tuple):
+                msg = fmt.format(*msg)
+            rec = make_log_record_at(levelno, msg, pathname, lineno, func)
+            rec.sanguine_when = t + batch.clockoffset
+            rec.sanguine_prefix = prefix
+            pending.append((batch.procnum, rec.sanguine_when, rec))
+        pending.reverse()
+        self._pending = pending
 
     def read_log_rec(self, logq: SimpleQueue) -> tuple | None | bool:
         assert self._state == 0 or self._state == 1
 
+        if self._pending:  # overload is judged by batches taken from logq, not by records expanded from them
+            return self._pending.pop()
+
         wt0 = time.perf_counter()
         record = logq.get()
         dwt = time.perf_counter() - wt0
@@ -100,6 +236,9 @@ class _LoggingThreadState:
             return False
         if isinstance(record, StopSkipping):
             return True
+        if isinstance(record, _LogBatch):
+            self._expand_batch(record)
+            return self._pending.pop()
         assert isinstance(record, tuple)
 
         (procnum, t, rec) = record
@@ -0,0 +1,248 @@
+# live metrics of long-running jobs: counters, gauges and histograms, rendered in Prometheus text format
+#   and served over local HTTP (Metrics.serve()) and/or dumped periodically to a file (Metrics.dump_to())
+# Parallel records its own metrics (see _describe_parallel_metrics()) into Metrics passed to it, or into a private one;
+#   its users (e.g. FolderCache) add theirs via Parallel.metrics()
+# Metrics can be shared by several consecutive Parallel sessions, same as ProcessPool, so that one endpoint covers
+#   the whole multi-hour run
+# everything is recorded within main process; children's work is accounted for when their results are received
+# gauges which are cheaper to sample than to keep up to date are set by collectors, called right before rendering
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+
+from sanguine.tasks._tasks_common import *
+
+_DEFAULT_HISTOGRAM_BUCKETS: tuple[float, ...] = (0.001, 0.01, 0.1, 1., 10., 100., 1000.)
+_METRIC_KINDS: tuple[str, ...] = ('counter', 'gauge', 'histogram')
+
+MetricLabels = tuple[str, ...]  # label values, in the order of labelnames given to describe()
+
+
+class _MetricFamily:
+    __slots__ = ('kind', 'help', 'labelnames', 'buckets', 'values')
+    kind: str
+    help: str
+    labelnames: tuple[str, ...]
+    buckets: tuple[float, ...] | None
+    values: dict[MetricLabels, float | list[float]]  # histogram: per-bucket counts (not cumulative), +Inf, sum
+
+    def __init__(self, kind: str, helpstr: str, labelnames: tuple[str, ...], buckets: tuple[float, ...] | None) -> None:
+        self.kind = kind
+        self.help = helpstr
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.values = {}
+
+
+def _prometheus_escape(s: str) -> str:
+    return s.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _prometheus_labels(labelnames: tuple[str, ...], labels: MetricLabels, extra: str | None = None) -> str:
+    parts = ['{}="{}"'.format(n, _prometheus_escape(v)) for n, v in zip(labelnames, labels)]
+    if extra is not None:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _prometheus_float(v: float) -> str:
+    if v == float('inf'):
+        return '+Inf'
+    return repr(float(v))
+
+
+class _MetricsHttpHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        # noinspection PyUnresolvedReferences
+        body = self.server.sanguine_metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt: str, *args) -> None:
+        pass  # scraped every few seconds, not worth logging
+
+
+class Metrics:
+    _families: dict[str, _MetricFamily]
+    _collectors: list[Callable[["Metrics"], None]]
+    _lock: Lock
+    _started: float
+    _server: ThreadingHTTPServer | None
+    _server_thread: Thread | None
+    _dump_fpath: str | None
+    _dump_period: float
+    _dumper: Thread | None
+    _stop_dumping: Event
+
+    def __init__(self) -> None:
+        self._families = {}
+        self._collectors = []
+        self._lock = Lock()  # rendering goes from HTTP and dumper threads
+        self._started = time.perf_counter()
+        self._server = None
+        self._server_thread = None
+        self._dump_fpath = None
+        self._dump_period = 0.
+        self._dumper = None
+        self._stop_dumping = Event()
+        self.describe('sanguine_metrics_uptime_seconds', 'gauge',
+                      'Seconds since Metrics were created, to calculate rates from file dumps')
+
+    def describe(self, name: str, kind: str, helpstr: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] | None = None) -> None:
+        # repeated describe() of the same metric is ok (e.g. from each Parallel sharing Metrics), as long as it matches
+        assert kind in _METRIC_KINDS
+        assert buckets is None or kind == 'histogram'
+        if kind == 'histogram' and buckets is None:
+            buckets = _DEFAULT_HISTOGRAM_BUCKETS
+        with self._lock:
+            family = self._families.get(name)
+            if family is not None:
+                abort_if_not(family.kind == kind and family.labelnames == labelnames,
+                             lambda: 'Metrics: {} is already described differently'.format(name))
+                return
+            self._families[name] = _MetricFamily(kind, helpstr, labelnames, buckets)
+
+    def inc(self, name: str, value: float = 1., labels: MetricLabels = ()) -> None:
+        family = self._families[name]
+        assert family.kind == 'counter' and len(labels) == len(family.labelnames) and value >= 0.
+        with self._lock:
+            family.values[labels] = family.values.get(labels, 0.) + value
+
+    def set(self, name: str, value: float, labels: MetricLabels = ()) -> None:
+        family = self._families[name]
+        assert family.kind == 'gauge' and len(labels) == len(family.labelnames)
+        with self._lock:
+            family.values[labels] = value
+
+    def observe(self, name: str, value: float, labels: MetricLabels = ()) -> None:
+        family = self._families[name]
+        assert family.kind == 'histogram' and len(labels) == len(family.labelnames)
+        with self._lock:
+            counts = family.values.get(labels)
+            if counts is None:
+                counts = family.values[labels] = [0.] * (len(family.buckets) + 2)
+            counts[bisect_left(family.buckets, value)] += 1.
+            counts[-1] += value
+
+    def get(self, name: str, labels: MetricLabels = ()) -> float:
+        # current value of counter or gauge, for histogram - number of observations
+        family = self._families[name]
+        with self._lock:
+            v = family.values.get(labels, 0.)
+        return sum(v[:-1]) if isinstance(v, list) else v
+
+    def add_collector(self, collector: Callable[["Metrics"], None]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[["Metrics"], None]) -> None:
+        with self._lock:
+            self._collectors.remove(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                collector(self)
+            except Exception as e:  # collectors run concurrently with main thread, being strict won't help anybody
+                warn('Metrics: collector {} failed: {}', collector, repr(e))
+        self.set('sanguine_metrics_uptime_seconds', time.perf_counter() - self._started)
+
+        out = []
+        with self._lock:
+            for name, family in sorted(self._families.items()):
+                out.append('# HELP {} {}\n# TYPE {} {}\n'.format(name, family.help, name, family.kind))
+                for labels, v in sorted(family.values.items()):
+                    if family.kind != 'histogram':
+                        out.append('{}{} {}\n'.format(name, _prometheus_labels(family.labelnames, labels),
+                                                      _prometheus_float(v)))
+                        continue  # for labels
+                    cumulative = 0.
+                    for le, n in zip(family.buckets + (float('inf'),), v):
+                        cumulative += n
+                        out.append('{}_bucket{} {}\n'.format(
+                            name, _prometheus_labels(family.labelnames, labels, 'le="{}"'.format(_prometheus_float(le))),
+                            _prometheus_float(cumulative)))
+                    out.append('{}_sum{} {}\n'.format(name, _prometheus_labels(family.labelnames, labels),
+                                                      _prometheus_float(v[-1])))
+                    out.append('{}_count{} {}\n'.format(name, _prometheus_labels(family.labelnames, labels),
+                                                        _prometheus_float(cumulative)))
+        return ''.join(out)
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> int:
+        # Prometheus endpoint at http://host:port/metrics; port 0 means 'any free one', actual port is returned
+        assert self._server is None
+        self._server = ThreadingHTTPServer((host, port), _MetricsHttpHandler)
+        self._server.daemon_threads = True
+        self._server.sanguine_metrics = self
+        self._server_thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._server_thread.start()
+        port = self._server.server_address[1]
+        info('Metrics: serving at http://{}:{}/metrics', host, port)
+        return port
+
+    def dump_to(self, fpath: str, period: float) -> None:
+        # file is replaced atomically every period seconds, and once more on close()
+        assert self._dumper is None
+        self._dump_fpath = fpath
+        self._dump_period = period
+        self._dumper = Thread(target=self._dumper_func, daemon=True)
+        self._dumper.start()
+
+    def _dump(self) -> None:
+        tmpfpath = self._dump_fpath + '.tmp'
+        with open(tmpfpath, 'wt', encoding='utf-8') as wf:
+            wf.write('# dumped at {}\n'.format(time.asctime()))
+            wf.write(self.render())
+        os.replace(tmpfpath, self._dump_fpath)
+
+    def _dumper_func(self) -> None:
+        while not self._stop_dumping.wait(self._dump_period):
+            self._dump()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server_thread.join()
+            self._server = None
+            self._server_thread = None
+        if self._dumper is not None:
+            self._stop_dumping.set()
+            self._dumper.join()
+            self._dumper = None
+            self._dump()
+
+    def __enter__(self) -> "Metrics":
+        return self
+
+    def __exit__(self, exceptiontype: Type[BaseException] | None, exceptionval: BaseException | None,
+                 exceptiontraceback: TracebackType | None) -> None:
+        self.close()
+
+
+def _describe_parallel_metrics(metrics: Metrics) -> None:
+    metrics.describe('sanguine_parallel_tasks_completed_total', 'counter', 'Tasks completed, per worker',
+                     ('worker',))
+    metrics.describe('sanguine_parallel_task_seconds_total', 'counter', 'Time spent running tasks, per worker',
+                     ('worker',))
+    metrics.describe('sanguine_parallel_task_units_total', 'counter',
+                     'Units of completed tasks with TaskCost (e.g. bytes hashed), per worker and cost family',
+                     ('worker', 'family'))
+    metrics.describe('sanguine_parallel_task_duration_seconds', 'histogram', 'Task durations', ('executor',))
+    metrics.describe('sanguine_parallel_tasks', 'gauge', 'Tasks of current Parallel, per state', ('state',))
+    metrics.describe('sanguine_parallel_queue_depth', 'gauge',
+                     'Requests sent to worker and not completed yet (batches for processes)', ('worker',))
+    metrics.describe('sanguine_parallel_main_load', 'gauge', 'Recent load of main thread, 0 to 1')
+    metrics.describe('sanguine_parallel_main_stage_seconds', 'gauge',
+                     'Main thread time per main loop stage, within current run', ('stage',))
+    metrics.describe('sanguine_parallel_shm_bytes', 'gauge', 'Shared memory in use, as seen by main process',
+                     ('kind',))
@@ -1,104 +1,31 @@
+import asyncio
 import heapq
+import inspect
 import logging
+import queue
 import time
+from collections import deque
+from collections.abc import AsyncGenerator, Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from enum import IntEnum
-from multiprocessing import Queue as PQueue, SimpleQueue, Process, shared_memory
-from threading import Thread  # only for logging!
+from multiprocessing import Queue as PQueue, shared_memory
+from threading import Thread
 
-from sanguine.install.install_logging import add_logging_handler, set_logging_hook
+from sanguine.install.install_logging import set_logging_hook
 from sanguine.tasks._tasks_common import *
-from sanguine.tasks._tasks_logging import (_ChildProcessLogHandler, create_logging_thread,
-                                           log_waited, log_elapsed, EndOfRegularLog, StopSkipping)
-from sanguine.tasks._tasks_shared import _pool_of_shared_returns, SharedReturnParam
-
-
-def _run_task(task: Task, depparams: list[any]) -> (Exception | None, any):
-    ndep = len(depparams)
-    assert ndep <= 3
-    try:
-        match ndep:
-            case 0:
-                out = task.f(task.param)
-            case 1:
-                out = task.f(task.param, depparams[0])
-            case 2:
-                out = task.f(task.param, depparams[0], depparams[1])
-            case 3:
-                out = task.f(task.param, depparams[0], depparams[1], depparams[2])
-            case _:
-                assert False
-        return None, out
-    except Exception as e:
-        critical('Parallel: exception in task {}: {}'.format(task.name, e))
-        warn(traceback.format_exc())
-        return e, None
-
-
-def _process_nonown_tasks(tasks: list[list], dwait: float | None) -> tuple[Exception | None, any]:
-    assert isinstance(tasks, list)
-    outtasks: list[tuple[str, tuple[float, float], any]] = []
-    for tplus in tasks:
-        task = tplus[0]
-        ndep = len(task.dependencies)
-        assert len(tplus) == 1 + ndep
-        t0 = time.perf_counter()
-        tp0 = time.process_time()
-        if dwait is not None:
-            debug('after waiting for {:.2f}s, starting task {}'.format(dwait, task.name))
-            dwait = None
-        else:
-            debug('starting task {}'.format(task.name))
-        (ex, out) = _run_task(task, tplus[1:])
-        if ex is not None:
-            return ex, None  # for tplus
-        elapsed = time.perf_counter() - t0
-        cpu = time.process_time() - tp0
-        info('done task {}, cpu/elapsed={:.2f}/{:.2f}s'.format(task.name, cpu, elapsed))
-        outtasks.append((task.name, (cpu, elapsed), out))
-        # end of for tplus
-    return None, outtasks
-
-
-def _proc_func(proc_num: int, inq: PQueue, outq: PQueue, logq) -> None:
-    try:
-        assert current_proc_num() == -1
-        set_current_proc_num(proc_num)
-
-        add_logging_handler(_ChildProcessLogHandler(logq))
-
-        debug('Process started')
-        outq.put(ProcessStarted(proc_num))
-        ex = None
-        while True:
-            waitt0 = time.perf_counter()
-            msg = inq.get()
-            if msg is None:
-                break  # while True
-
-            dwait = time.perf_counter() - waitt0
-
-            (tasks, processedshm) = msg
-            if processedshm is not None:
-                assert tasks is None
-                info('after waiting for {:.2f}s, releasing shm={}'.format(dwait, processedshm))
-                _pool_of_shared_returns.done_with(processedshm)
-                continue  # while True
-
-            ex, outtasks = _process_nonown_tasks(tasks, dwait)
-            if ex is not None:
-                break  # while True
-            outq.put((proc_num, outtasks))
-            # end of while True
-
-        if ex is not None:
-            outq.put(ex)
-    except Exception as e:
-        # print('Exception!:'+traceback.format_exc())
-        critical('_proc_func() internal exception: {}'.format(repr(e)))
-        warn(traceback.format_exc())
-        outq.put(e)
-    _pool_of_shared_returns.cleanup()
-    debug('exiting process')
+from sanguine.tasks._tasks_common import _task_group_chunk_func
+from sanguine.tasks._tasks_costs import _TaskCostModel
+from sanguine.tasks._tasks_journal import (_TaskJournal, _task_fingerprint, _group_param_fingerprint,
+                                           _group_journal_key)
+from sanguine.tasks._tasks_logging import log_waited, log_elapsed, StopSkipping
+from sanguine.tasks._tasks_metrics import Metrics, _describe_parallel_metrics
+from sanguine.tasks._tasks_pool import ProcessPool, _run_task, _process_nonown_tasks, _task_failed
+from sanguine.tasks._tasks_shared import (_pool_of_shared_returns, SharedReturnParam, _drop_from_cache_of_published,
+                                          SharedFileTableParam, SharedFileTableView, _unlink_shm, _ReceivedBlock,
+                                          _SharedBlockHandle, _load_payload, _read_oob, SharedReturnView,
+                                          _attached_slabs)
+from sanguine.tasks._tasks_trace import _TaskTracer
 
 
 class _TaskGraphNodeState(IntEnum):
@@ -108,53 +35,86 @@ class _TaskGraphNodeState(IntEnum):
     Done = 3
 
 
+_NO_CHILDREN: tuple = ()  # shared by all the nodes without children
+
+
 class _TaskGraphNode:
+    # there can be 1M+ of these, so __slots__ and shared tuples
+    #   most of the tasks have exactly one parent and at most one child, such single ones are stored as is,
+    #   without wrapping them into a tuple or list; use parent_list() and child_list() to iterate
+    # NB: state is deliberately kept here rather than in a typed array indexed by integer node id:
+    #     slot referring to one of 4 enum singletons costs 8 bytes, while an id (beyond small int cache)
+    #     would cost a separate 28-byte int object per node
+    # waiting_for_n_deps and out are never needed at the same time (Pending vs Done), so they share a slot
+    __slots__ = ('task', 'children', 'parents', 'own_weight', 'max_leaf_weight', 'state', 'guaranteed_tags', 'out')
     task: Task
-    children: list["_TaskGraphNode"]
-    parents: list["_TaskGraphNode|str"]
+    children: "_TaskGraphNode|list[_TaskGraphNode]|tuple"
+    parents: "_TaskGraphNode|tuple[_TaskGraphNode|str, ...]"
     own_weight: float
     max_leaf_weight: float
-    explicit_weight: bool
     state: _TaskGraphNodeState
-    waiting_for_n_deps: int
-    guaranteed_tags: list[str]
+    guaranteed_tags: tuple[str, ...]  # interned
+    out: any  # valid only when Done; while Pending, it is waiting_for_n_deps
 
-    def __init__(self, task: Task, parents: list["_TaskGraphNode"], weight: float, explicit_weight: bool,
-                 guaranteedtags: list[str]) -> None:
+    def __init__(self, task: Task, parents: tuple["_TaskGraphNode|str", ...], weight: float,
+                 guaranteedtags: tuple[str, ...]) -> None:
         self.task = task
-        self.children = []
-        self.parents = parents
+        self.children = _NO_CHILDREN
+        self.parents = parents[0] if len(parents) == 1 and isinstance(parents[0], _TaskGraphNode) else parents
         self.own_weight = weight  # expected time in seconds
         self.max_leaf_weight = 0.
-        self.explicit_weight = explicit_weight
         self.state = _TaskGraphNodeState.Pending
-        self.waiting_for_n_deps = 0
         self.guaranteed_tags = guaranteedtags
+        self.out = 0  # waiting_for_n_deps
+
+    @property
+    def waiting_for_n_deps(self) -> int:
+        assert self.state == _TaskGraphNodeState.Pending
+        return self.out
+
+    @waiting_for_n_deps.setter
+    def waiting_for_n_deps(self, n: int) -> None:
+        assert self.state == _TaskGraphNodeState.Pending
+        self.out = n
 
     def mark_as_done_and_handle_children(self) -> list["_TaskGraphNode"]:
         assert self.state == _TaskGraphNodeState.Ready or self.state == _TaskGraphNodeState.Running
         self.state = _TaskGraphNodeState.Done
         out = []
-        for ch in self.children:
+        for ch in self.child_list():
             assert ch.state == _TaskGraphNodeState.Pending
             assert ch.waiting_for_n_deps > 0
             ch.waiting_for_n_deps -= 1
             if ch.waiting_for_n_deps == 0:
                 out.append(ch)
             else:
-                debug('Parallel: task {} has {} remaining dependencies to become ready'.format(
-                    ch.task.name, ch.waiting_for_n_deps))
+                debug('Parallel: task {} has {} remaining dependencies to become ready',
+                      ch.task.name, ch.waiting_for_n_deps)
 
         return out
 
+    def parent_list(self) -> tuple["_TaskGraphNode|str", ...]:
+        return (self.parents,) if isinstance(self.parents, _TaskGraphNode) else self.parents
+
+    def child_list(self) -> "list[_TaskGraphNode]|tuple":
+        return (self.children,) if isinstance(self.children, _TaskGraphNode) else self.children
+
+    def append_child(self, ch: "_TaskGraphNode") -> None:
+        if self.children is _NO_CHILDREN:
+            self.children = ch
+        elif isinstance(self.children, _TaskGraphNode):
+            self.children = [self.children, ch]
+        else:
+            self.children.append(ch)
+
     def append_leaf(self, leaf: "_TaskGraphNode") -> None:
-        self.children.append(leaf)
+        self.append_child(leaf)
         self._adjust_leaf_weight(leaf.own_weight)
 
     def _adjust_leaf_weight(self, w: float) -> None:
         if self.max_leaf_weight < w:
             self.max_leaf_weight = w
-            for p in self.parents:
+            for p in self.parent_list():
                 if isinstance(p, str) or int(p.state) >= int(_TaskGraphNodeState.Ready):
                     continue
                 p._adjust_leaf_weight(self.own_weight + self.max_leaf_weight)
@@ -170,18 +130,113 @@ class _TaskGraphNode:
         return self.total_weight() == b.total_weight()
 
 
+# own task currently running as a coroutine (for run_async()); coroutines interleave, so it cannot be a simple member
+_current_own_coroutine_node: ContextVar[_TaskGraphNode | None] = ContextVar('_current_own_coroutine_node',
+                                                                             default=None)
+
+
+# work-stealing scheduler heuristics
+_WS_MAX_BATCH: float = 0.1  # same as in the classic scheduler: <0.1s is not worth jerking around
+_WS_SLACK_FRACTION: float = 0.25  # batch may delay the task by up to this fraction of its slack
+_WS_DEQUE_TARGET: float = 0.3  # how much work we pre-assign to each process
+_WS_PREFETCH_THRESHOLD: float = 0.05  # sending 2nd request to the process only if its 1st one is shorter than this
+
+# TaskExecutor.Thread and TaskExecutor.Inline
+_THREAD_WORKER: int = -2  # pseudo-procnum for thread pool (-1 is already used for the main process itself)
+_INLINE_WORKER: int = -3  # pseudo-procnum for tasks running inline within main thread
+_EVENT_LOOP_WORKER: int = -4  # pseudo-procnum for coroutine own tasks (run_async() only)
+_JOURNAL_WORKER: int = -5  # pseudo-procnum for idempotent tasks completed from the journal
+_THREAD_MAX_BATCH: float = 0.01  # no pickling, so batching only saves on queue round-trips
+_DEFAULT_NTHREADS: int = 4
+
+# coalescing own tasks
+_MAIN_LOAD_WINDOW: float = 1.  # recent main process load is measured over roughly this many seconds
+_MAIN_SATURATED_LOAD: float = 0.5  # same threshold as for 'main process load' perf warning
+
+_SPECULATE_MIN_ELAPSED: float = 1.  # shorter-running tasks are not worth duplicating
+_SPECULATE_MIN_WAIT: float = 0.05  # main loop doesn't wake up to look for stragglers more often than this
+_LOG_STATS_DETAILS_PERIOD: float = 1.  # listing pending/ready tasks scans all the nodes, so not on each iteration
+
+_PICKLE_PERF_WARN_BYTES: int = 1048576  # average response per task; above it, data should rather go via shared memory
+
+_COST_MODEL_JSON_KEY: str = '#cost_families'  # within weights JSON; task names never start with '#'
+
+# TaskGroup
+_TASK_GROUP_CHUNKS_PER_WORKER: int = 4  # to have something to balance at the end of the group
+_TASK_GROUP_MIN_CHUNK_WEIGHT: float = 0.05  # below this, per-chunk scheduling overhead starts to matter
+_TASK_GROUP_DEFAULT_PARAM_WEIGHT: float = 0.001
+
+
+def _split_task_group(weights: list[float], nchunks: int) -> list[list[int]]:
+    # LPT: heaviest params first, each one to the currently lightest chunk
+    chunks: list[list[int]] = [[] for _ in range(nchunks)]
+    heap = [(0., i) for i in range(nchunks)]
+    for pi in sorted(range(len(weights)), key=lambda j: -weights[j]):
+        (w, ci) = heapq.heappop(heap)
+        chunks[ci].append(pi)
+        heapq.heappush(heap, (w + weights[pi], ci))
+    return [chunk for chunk in chunks if chunk]
+
+
+def _worker_str(procnum: int) -> str:
+    if procnum == _THREAD_WORKER:
+        return 'thread pool'
+    if procnum == _INLINE_WORKER:
+        return 'main thread'
+    if procnum == _EVENT_LOOP_WORKER:
+        return 'event loop'
+    if procnum == _JOURNAL_WORKER:
+        return 'journal'
+    return 'process #{}'.format(procnum + 1)
+
+
+def _tasks_str(nodes: list[_TaskGraphNode]) -> str:
+    return '[' + ''.join(',+' + node.task.name for node in nodes) + ']'
+
+
+class _WakeUp:  # put to inbox to wake up main loop of run_async()
+    pass
+
+
+class _StopForwarding:  # sent by main thread to itself via outq, to stop _forward_outq thread
+    pass
+
+
+def _forward_outq(outq: PQueue, inbox: queue.Queue) -> None:
+    # once thread pool is running, main loop waits on inbox, so results from child processes have to be moved there
+    while True:
+        got = outq.get()
+        if isinstance(got, _StopForwarding):
+            break
+        inbox.put(got)
+
+
+def _thread_func(inbox: queue.Queue, taskpluses: list[list]) -> None:
+    try:
+        ex, outtasks = _process_nonown_tasks(taskpluses, None, time.thread_time)
+        inbox.put(_task_failed(_THREAD_WORKER, taskpluses, outtasks) if ex is not None else (_THREAD_WORKER, outtasks))
+    except Exception as e:
+        critical('_thread_func() internal exception: {}', repr(e))
+        warn(traceback.format_exc())
+        inbox.put(e)
+
+
 class _MainLoopTimer:
     stats: dict[str, float]  # stage name->time
     started: float
     cur_stage: str
     cur_stage_start: float
     ended: float | None
+    recent_busy: float  # both halved each _MAIN_LOAD_WINDOW or so
+    recent_waiting: float
 
     def __init__(self, stage: str):
         self.stats = {}
         self.cur_stage = stage
         self.started = self.cur_stage_start = time.perf_counter()
         self.ended = None
+        self.recent_busy = 0.
+        self.recent_waiting = 0.
 
     def stage(self, new_stage: str) -> float:
         t = time.perf_counter()
@@ -190,10 +245,21 @@ class _MainLoopTimer:
             self.stats[self.cur_stage] = dt
         else:
             self.stats[self.cur_stage] += dt
+        if self.cur_stage == 'waiting':
+            self.recent_waiting += dt
+        else:
+            self.recent_busy += dt
+        if self.recent_busy + self.recent_waiting > _MAIN_LOAD_WINDOW:
+            self.recent_busy *= 0.5
+            self.recent_waiting *= 0.5
         self.cur_stage = new_stage
         self.cur_stage_start = t
         return dt
 
+    def recent_load(self) -> float:
+        total = self.recent_busy + self.recent_waiting
+        return self.recent_busy / total if total > 0. else 0.
+
     def end(self) -> None:
         t = time.perf_counter()
         if self.cur_stage not in self.stats:
@@ -205,47 +271,92 @@ class _MainLoopTimer:
     def log_timer_stats(self) -> None:
         assert self.ended is not None
         elapsed = self.ended - self.started
-        info('Parallel/main process: elapsed {:.2f}s, including:'.format(elapsed))
+        info('Parallel/main process: elapsed {:.2f}s, including:', elapsed)
         total = 0.
         for name, t in sorted(self.stats.items(), key=lambda x: -x[1]):
-            info('-> {}: {:.2f}s'.format(name, t))
+            info('-> {}: {:.2f}s', name, t)
             total += t
         if elapsed - total > 0.01:
-            info('-> _unaccounted: {:.2f}s'.format(elapsed - total))
+            info('-> _unaccounted: {:.2f}s', elapsed - total)
 
     def elapsed(self) -> float:
         assert self.ended is not None
         return self.ended - self.started
 
 
+class _TaskPickleStats:
+    # serialization of child process tasks, per task type of interest
+    __slots__ = ('n', 'request_bytes', 'request_time', 'response_bytes', 'response_child_time', 'response_time')
+    n: int
+    request_bytes: int
+    request_time: float  # pickling in main process
+    response_bytes: int
+    response_child_time: float  # pickling in child process
+    response_time: float  # unpickling in main process
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.request_bytes = self.response_bytes = 0
+        self.request_time = self.response_child_time = self.response_time = 0.
+
+
 class Parallel:
-    _outq: PQueue
-    _logq: SimpleQueue
-    _out_logq: SimpleQueue
-    _processes: list[Process]
+    _pool: ProcessPool
+    _owns_pool: bool
     _process_requests: list[list[float]]
-    _inqueues: list[PQueue]
-    _procrunningconfirmed: list[bool]  # otherwise join() on a not running yet process may hang
-    _logthread: Thread
 
     _nprocesses: int
     _json_fname: str
     _json_weights: dict[str, float]
     _updated_json_weights: dict[str, float]
+    _cost_model: _TaskCostModel  # for tasks with TaskCost as w
+    _predicted_makespan: float  # within current run, as of its start
 
     _shutting_down: bool
     _has_joined: bool
 
     publications: dict[str, shared_memory.SharedMemory]  # semi-public: used by SharedPublication
-    _all_task_nodes: dict[str, _TaskGraphNode]  # name->node
-    _pending_task_nodes: dict[str, _TaskGraphNode]  # name->node
-    _ready_task_nodes: dict[str, _TaskGraphNode]  # name->node
+    # publications made by own tasks live while their subtree is not Done, see add_publication()
+    #   each one is held by a single not-Done task of the subtree at a time, rather than by every task in it
+    _publication_holds: dict[str, tuple[list[_TaskGraphNode], set[int]]]  # publication->(walk stack, id()s walked)
+    _publication_anchors: dict[str, list[str]]  # task name->publications it holds
+    _publication_adders: dict[str, list[_TaskGraphNode]]  # own task name->tasks it has added, only while held
+    _all_task_nodes: dict[str, _TaskGraphNode]  # name->node; the only name-keyed dict, others are just counters
+    _n_pending: int
+    _n_ready: int  # non-own
+    _n_ready_own: int
+    _n_done: int
     _ready_task_nodes_heap: list[_TaskGraphNode]
-    _ready_own_task_nodes: dict[str, _TaskGraphNode]  # name->node
     _ready_own_task_nodes_heap: list[_TaskGraphNode]
     _running_task_nodes: dict[str, tuple[int, float, _TaskGraphNode]]  # name->(procnum,started,node)
-    _done_task_nodes: dict[str, tuple[_TaskGraphNode, any]]  # name->(node,out)
-    _pending_patterns: list[tuple[str, _TaskGraphNode]]  # pattern, node
+    _process_request_nodes: list[list[list[_TaskGraphNode]]]  # per process, same batches as in _process_requests
+    _task_timeout: float | None
+    _task_retries: int
+    _task_attempts: dict[str, int]  # name->number of failures so far; such tasks are sent alone
+    _task_failed_on: dict[str, int]  # name->procnum of the last failure
+    _speculate: float | None
+    _process_head_started: list[float]  # per process, when its first batch has started (as seen by main process)
+    _speculative: dict[str, tuple[int, int]]  # name->(original procnum, duplicate procnum), while both are running
+    _released_blocks: dict[int, list[_SharedBlockHandle]]  # procnum->received shared blocks to be released, in bulk
+    _n_speculative: int  # within current run
+    _n_speculative_wins: int  # within current run
+    _resource_budget: tuple[int, int, int] | None  # as in TaskResources.as_tuple()
+    _resources_in_use: list[int]
+    _resource_blocked_nodes: list[_TaskGraphNode]  # ready, but not admitted because of resource budget
+    _n_resource_blocks: int  # within current run
+
+    _lane_indexes: dict[str, int]  # lane name->index, lower index means higher priority; bulk is len(lanes)
+    _lane_heaps: list[list[_TaskGraphNode]]  # ready tasks per lane
+    _process_max_lane: list[int]  # per process, the lowest priority lane it accepts
+    _n_bulk_processes: int  # processes not reserved for lanes, they go first
+
+    _process_localities: list[frozenset[str] | None]  # per process, None for local ones
+    _remote_localities: set[str]  # served by at least one live remote worker
+    _locality_heaps: dict[str, list[_TaskGraphNode]]  # ready tasks which may run remotely
+    _interned_tags: dict[tuple[str, ...], tuple[str, ...]]
+    _not_done_task_names: SortedStringsWithPrefixSearch  # to resolve new patterns against existing tasks
+    _pending_patterns: dict[str, list[_TaskGraphNode]]  # pattern->nodes; to resolve new tasks against patterns
+    _pending_pattern_lens: set[int]  # all distinct len(pattern) within _pending_patterns
     _dbg_serialize: bool
     _old_logging_hook: Callable[[logging.LogRecord], None] | None | bool
     _task_stats_srch: FastSearchOverPartialStrings
@@ -253,23 +364,91 @@ class Parallel:
     _own_task_stats_data: dict[str, tuple[int, float, float]]
     _task_stats_unaccounted: tuple[int, float, float]
     _own_task_stats_unaccounted: tuple[int, float, float]
+    _pickle_stats_data: dict[str | None, _TaskPickleStats]  # None for unaccounted
     _data_dependencies: dict[str, int]
     _current_task_node: _TaskGraphNode | None
     _last_log_stats_str: str | None
+    _last_log_stats_details: float
+
+    _work_stealing: bool
+    _process_deques: list[deque[_TaskGraphNode]]  # work-stealing only: assigned to process, but not sent yet
+    _process_deque_weights: list[float]
+    _ws_ready_work: float  # work-stealing only: estimated total weight of ready and queued tasks
+    _ws_seq: int
+    _ws_nsteals: int
+
+    _nthreads: int
+    _thread_pool: ThreadPoolExecutor | None  # started lazily, on first TaskExecutor.Thread task
+    _forwarding_thread: Thread | None
+    _inbox: "queue.Queue|PQueue"  # whatever main loop is waiting on
+    _thread_requests: int  # number of batches submitted to thread pool and not processed yet
+    _ready_thread_task_nodes_heap: list[_TaskGraphNode]
+    _ready_inline_task_nodes_heap: list[_TaskGraphNode]
+
+    _child_processes_load: float  # within current run
+    _thread_pool_load: float  # within current run
+
+    _async_running: bool  # within run_async()
+    _async_run_over: bool  # run_async() is over, and the next one has not started yet
+    _async_waiting: bool  # run_async() is waiting on inbox
+    _async_wakeup_sent: bool
+    _async_exception: Exception | None  # exception in coroutine own task, to be raised by run_async()
+    _async_waiters: dict[str, list[asyncio.Future]]  # taskname->futures returned by submit()
+    _completions: list[asyncio.Queue]  # one per completions() listener, until run_async() is over
+
+    _coalesce_own_tasks: bool | None
+    _n_coalesced_own_tasks: int  # within current run
+    _n_own_task_batches: int  # within current run
+
+    _journal: _TaskJournal | None
+    _journal_fingerprints: dict[str, bytes]  # taskname->fingerprint, for started idempotent tasks
+    _journal_hit_nodes: list[_TaskGraphNode]  # ready, to be completed from the journal
+    _journal_group_chunks: dict[str, tuple[str, list[bytes]]]  # chunk taskname->(groupkey,per-param fingerprints)
+
+    _tracer: _TaskTracer | None
+    _metrics: Metrics
+    _mltimer: _MainLoopTimer | None  # of current (or last) run, for metrics collector
 
     def __init__(self, jsonfname: str | None, nproc: int = 0, dbg_serialize: bool = False,
-                 taskstatsofinterest: TaskStatsOfInterest = None) -> None:
+                 taskstatsofinterest: TaskStatsOfInterest = None, work_stealing: bool = False,
+                 pool: ProcessPool | None = None, nthreads: int = 0, journal: str | None = None,
+                 coalesce_own_tasks: bool | None = None, task_timeout: float | None = None,
+                 task_retries: int = 0, resource_budget: TaskResources | None = None,
+                 lanes: dict[str, int] | None = None, trace: str | None = None,
+                 speculate: float | None = None, metrics: Metrics | None = None) -> None:
         # dbg_serialize allows debugging non-own Tasks
+        # work_stealing enables critical-path-aware scheduler with per-process deques
+        # pool allows to reuse the same (already running) processes for several Parallel sessions
+        # nthreads is a size of thread pool for TaskExecutor.Thread tasks
+        # journal is a file name to journal outputs of idempotent tasks, to avoid re-running them after a crash
+        # coalesce_own_tasks: whether ready own tasks with the same OwnTask.batchf are run as one batch;
+        #   None means 'only while main process is saturated'
+        # task_timeout and task_retries are defaults for Task.timeout and Task.retries (timeouts apply only to
+        #   child process tasks, as threads cannot be killed; exceptions in inline tasks are always fatal)
+        # resource_budget limits total Task.resources of running tasks (inline ones are not counted)
+        # lanes are lane name->number of processes reserved for this lane (and higher priority ones), in order
+        #   of decreasing priority; ready Tasks with lane go before bulk ones (lanes apply to process tasks only)
+        # trace is a file name to write execution trace to (Chrome trace-event JSON), see _tasks_trace.py
+        # speculate: once idempotent process task runs for longer than speculate times its estimate, while some
+        #   process is idle, its duplicate is started there; first result wins, and the other copy is killed
+        #   if that's all its process has been asked for, otherwise it runs to completion and its result is ignored
+        # metrics allows to share live metrics (and their HTTP endpoint or file dump) between Parallel sessions,
+        #   see _tasks_metrics.py; otherwise, Parallel has a private Metrics, available via metrics()
         assert current_proc_num() == -1
 
         assert nproc >= 0
-        if nproc:
-            self._nprocesses = nproc
+        if pool is None:
+            self._pool = ProcessPool(nproc)
+            self._owns_pool = True
         else:
-            self._nprocesses = os.cpu_count() - 1  # -1 for the master process
-        assert self._nprocesses >= 0
+            assert nproc == 0 or nproc == pool.nprocesses
+            self._pool = pool
+            self._owns_pool = False
+        abort_if_not(len(self._pool.remote_agents) == 0 or self._pool.is_usable(),
+                     'Parallel: pool with remote agents must be started before creating Parallel')
+        self._nprocesses = self._pool.nworkers()
         self._dbg_serialize = dbg_serialize
-        info('Parallel: using {} processes...'.format(self._nprocesses))
+        info('Parallel: using {} processes...', self._nprocesses)
         self._json_fname = jsonfname
         self._json_weights = {}
         self._updated_json_weights = {}
@@ -278,23 +457,67 @@ class Parallel:
                 with open(jsonfname, 'rt', encoding='utf-8') as rf:
                     self._json_weights = json.load(rf)
             except Exception as e:
-                warn('error loading JSON weights from {}: {}. Will continue w/o weights'.format(jsonfname, e))
+                warn('error loading JSON weights from {}: {}. Will continue w/o weights', jsonfname, e)
                 self._json_weights = {}  # just in case
+        self._cost_model = _TaskCostModel(self._json_weights.pop(_COST_MODEL_JSON_KEY, {}))
+        self._predicted_makespan = 0.
 
         self._shutting_down = False
         self._has_joined = False
 
         self.publications = {}
+        self._publication_holds = {}
+        self._publication_anchors = {}
+        self._publication_adders = {}
 
         self._all_task_nodes = {}
-        self._pending_task_nodes = {}
-        self._ready_task_nodes = {}
+        self._n_pending = 0
+        self._n_ready = 0
+        self._n_ready_own = 0
+        self._n_done = 0
         self._ready_task_nodes_heap = []
-        self._ready_own_task_nodes = {}
         self._ready_own_task_nodes_heap = []
         self._running_task_nodes = {}  # name->(procnum,started,node)
-        self._done_task_nodes = {}  # name->(node,out)
-        self._pending_patterns = []
+        self._process_request_nodes = [[] for _ in range(self._nprocesses)]
+        assert task_retries >= 0
+        self._task_timeout = task_timeout
+        self._task_retries = task_retries
+        self._task_attempts = {}
+        self._task_failed_on = {}
+        assert speculate is None or speculate >= 1.
+        self._speculate = speculate
+        self._process_head_started = [0.] * self._nprocesses
+        self._speculative = {}
+        self._released_blocks = {}
+        self._n_speculative = 0
+        self._n_speculative_wins = 0
+        self._resource_budget = resource_budget.as_tuple() if resource_budget is not None else None
+        self._resources_in_use = [0, 0, 0]
+        self._resource_blocked_nodes = []
+        self._n_resource_blocks = 0
+
+        if lanes is None:
+            lanes = {}
+        self._lane_indexes = {lane: i for i, lane in enumerate(lanes)}
+        self._lane_heaps = [[] for _ in lanes]
+        self._process_max_lane = [len(lanes)] * self._pool.nprocesses + [-1] * len(self._pool.remotes)
+        self._n_bulk_processes = self._pool.nprocesses
+        for i, nreserved in enumerate(lanes.values()):
+            for _ in range(nreserved):
+                self._n_bulk_processes -= 1
+                abort_if_not(self._n_bulk_processes > 0,
+                             lambda: 'Parallel: lanes {} reserve too many of {} processes'.format(lanes, self._nprocesses))
+                self._process_max_lane[self._n_bulk_processes] = i
+
+        self._process_localities = [None] * self._pool.nprocesses + [w.localities for w in self._pool.remotes]
+        self._remote_localities = set()
+        for w in self._pool.remotes:
+            self._remote_localities |= w.localities
+        self._locality_heaps = {}
+        self._interned_tags = {(): ()}
+        self._not_done_task_names = SortedStringsWithPrefixSearch()
+        self._pending_patterns = {}
+        self._pending_pattern_lens = set()
 
         if taskstatsofinterest is None:
             taskstatsofinterest = []
@@ -303,35 +526,67 @@ class Parallel:
         self._own_task_stats_data = {}
         self._task_stats_unaccounted = (0, 0., 0.)
         self._own_task_stats_unaccounted = (0, 0., 0.)
+        self._pickle_stats_data = {}
         self._old_logging_hook = False
         self._data_dependencies = {}
         self._current_task_node = None
         self._last_log_stats_str = None
+        self._last_log_stats_details = 0.
+
+        self._work_stealing = work_stealing and not dbg_serialize
+        self._process_deques = [deque() for _ in range(self._nprocesses)]
+        self._process_deque_weights = [0.] * self._nprocesses
+        self._ws_ready_work = 0.
+        self._ws_seq = 0
+        self._ws_nsteals = 0
+
+        assert nthreads >= 0
+        self._nthreads = nthreads if nthreads else _DEFAULT_NTHREADS  # I/O-bound, so not limited by # of cores
+        self._thread_pool = None
+        self._forwarding_thread = None
+        self._thread_requests = 0
+        self._ready_thread_task_nodes_heap = []
+        self._ready_inline_task_nodes_heap = []
+
+        self._child_processes_load = 0.
+        self._thread_pool_load = 0.
+
+        self._async_running = False
+        self._async_run_over = False
+        self._async_waiting = False
+        self._async_wakeup_sent = False
+        self._async_exception = None
+        self._async_waiters = {}
+        self._completions = []
+
+        self._coalesce_own_tasks = coalesce_own_tasks
+        self._n_coalesced_own_tasks = 0
+        self._n_own_task_batches = 0
+
+        self._journal = _TaskJournal(journal) if journal is not None else None
+        self._journal_fingerprints = {}
+        self._journal_hit_nodes = []
+        self._journal_group_chunks = {}
+
+        self._tracer = _TaskTracer(trace) if trace is not None else None
+
+        self._metrics = metrics if metrics is not None else Metrics()
+        _describe_parallel_metrics(self._metrics)
+        self._mltimer = None
 
     def __enter__(self) -> "Parallel":
-        self._old_logging_hook = set_logging_hook(lambda rec: self._logq.put((-1, time.perf_counter(), rec)))
-        self._processes = []
-        self._process_requests = []
+        if self._owns_pool:
+            self._pool.start()
+        self._pool.attach(self)
+        logq = self._pool.logq
+        self._old_logging_hook = set_logging_hook(lambda rec: logq.put((-1, time.perf_counter(), rec)))
+        self._process_requests = [[] for _ in range(self._nprocesses)]
+        self._process_request_nodes = [[] for _ in range(self._nprocesses)]
+        self._inbox = self._pool.outq
         # but not as keeping simplistic processesload[i] == 2 (it disbalances end of processing way too much)
-        self._inqueues = []
-        self._procrunningconfirmed = []  # otherwise join() on a not running yet process may hang
-        self._outq = PQueue()
-        self._logq = SimpleQueue()
-        self._out_logq = SimpleQueue()
-        self._logthread = create_logging_thread(self._logq, self._out_logq)
-        self._logthread.start()
-        for i in range(self._nprocesses):
-            inq = PQueue()
-            self._inqueues.append(inq)
-            p = Process(target=_proc_func, args=(i, inq, self._outq, self._logq))
-            self._processes.append(p)
-            p.start()
-            self._process_requests.append([])
-            self._procrunningconfirmed.append(False)
         self._shutting_down = False
         self._has_joined = False
-        assert len(self._process_requests) == len(self._processes)
-        assert len(self._inqueues) == len(self._processes)
+        self._metrics.add_collector(self._collect_metrics)
         return self
 
     def _dependencies_to_parents(self, dependencies: list[str]) -> tuple[list[_TaskGraphNode] | None, list[str] | None]:
@@ -355,6 +610,8 @@ class Parallel:
 
         assert task.name not in self._all_task_nodes
         assert isinstance(task, OwnTask) or isinstance(task, TaskPlaceholder) or not is_lambda(task.f)
+        abort_if_not(task.lane is None or task.lane in self._lane_indexes,
+                     lambda: 'Parallel: unknown lane {} for task {}'.format(task.lane, task.name))
 
         taskparents, patterns = self._dependencies_to_parents(task.dependencies)
         if taskparents is None:
@@ -368,8 +625,11 @@ class Parallel:
         # by this point, we're sure that we'll add this particular task
         # checking data tags
         guaranteedtags = {}
-        if self._current_task_node is not None:
-            for gt in self._current_task_node.guaranteed_tags:
+        curnode = self._current_task_node
+        if curnode is None:
+            curnode = _current_own_coroutine_node.get()
+        if curnode is not None:
+            for gt in curnode.guaranteed_tags:
                 guaranteedtags[gt] = 1
         for n in taskparents:
             for gt in n.guaranteed_tags:
@@ -377,91 +637,115 @@ class Parallel:
         if task.data_dependencies is not None:
             for d in task.data_dependencies.required_tags:
                 if d not in guaranteedtags:
-                    critical('Parallel: missing datadep={} for task {}'.format(d, task.name))
+                    critical('Parallel: missing datadep={} for task {}', d, task.name)
                     assert False
             for nd in task.data_dependencies.required_not_tags:
                 if nd in guaranteedtags:
-                    critical('Parallel: prohibited datadep={} for task {}'.format(nd, task.name))
+                    critical('Parallel: prohibited datadep={} for task {}', nd, task.name)
                     assert False
             for pd in task.data_dependencies.provided_tags:
                 guaranteedtags[pd] = 1
 
         # adding task
         w = task.w
-        explicitw = True
-        if w is None:
-            explicitw = False
+        if isinstance(w, TaskCost):
+            w = self._cost_model.estimate(w)
+        elif w is None:
             w = 0.1 if isinstance(task,
                                   OwnTask) else 1.0  # 1 sec for non-owning tasks, and assuming that own tasks are shorter by default (they should be)
             w = self.estimated_time(task.name, w)
-        node = _TaskGraphNode(task, taskparents, w, explicitw, list(guaranteedtags.keys()))
+        tags = tuple(guaranteedtags.keys())
+        tags = self._interned_tags.setdefault(tags, tags)
+        if len(taskparents) > 0:
+            # Task is kept until the end, so its dependencies better refer to the very same str objects as
+            #   parents' names, rather than to equal copies; caller's list is left alone, it may be shared
+            deps = list(task.dependencies)  # exact size, unlike appending
+            ip = 0
+            for i in range(len(deps)):
+                if not deps[i].endswith('*'):
+                    assert deps[i] == taskparents[ip].task.name
+                    deps[i] = taskparents[ip].task.name
+                    ip += 1
+            task.dependencies = deps
+        node = _TaskGraphNode(task, tuple(taskparents) + tuple(patterns), w, tags)
         assert task.name not in self._all_task_nodes
         self._all_task_nodes[task.name] = node
+        self._not_done_task_names.add(task.name)
 
         assert node.waiting_for_n_deps == 0
         if isinstance(task, TaskPlaceholder):
             node.waiting_for_n_deps = 1000000  # 1 would do, but 1000000 is much better visible in debug
-        for parent in node.parents:
+        for parent in taskparents:
             assert isinstance(parent, _TaskGraphNode)
             parent.append_leaf(node)
             if int(parent.state) < int(_TaskGraphNodeState.Done):
                 node.waiting_for_n_deps += 1
 
         # processing other task's dependencies on this task's patterns
+        patparents = []
         for p in patterns:
-            for n in self._all_task_nodes.values():
-                if n.state < _TaskGraphNodeState.Done and n.task.name.startswith(p):
-                    node.waiting_for_n_deps += 1
-                    n.children.append(node)
-                    debug(
-                        'Parallel: adding task {} with pattern {}, now it has {} dependencies due to existing task {}'.format(
-                            node.task.name, p, node.waiting_for_n_deps, n.task.name))
-            node.parents.append(p)
-            self._pending_patterns.append((p, node))
-
-        debug('Parallel: added task {}, which is waiting for {} dependencies'.format(node.task.name,
-                                                                                     node.waiting_for_n_deps))
+            for nname in self._not_done_task_names.all_with_prefix(p):
+                n = self._all_task_nodes[nname]
+                assert n.state < _TaskGraphNodeState.Done
+                node.waiting_for_n_deps += 1
+                n.append_child(node)
+                patparents.append(n)
+                debug(
+                    'Parallel: adding task {} with pattern {}, now it has {} dependencies due to existing task {}',
+                    node.task.name, p, node.waiting_for_n_deps, n.task.name)
+            self._pending_patterns.setdefault(p, []).append(node)
+            self._pending_pattern_lens.add(len(p))
+
+        debug('Parallel: added task {}, which is waiting for {} dependencies', node.task.name, node.waiting_for_n_deps)
 
         assert node.state == _TaskGraphNodeState.Pending
         if node.waiting_for_n_deps == 0:
             node.state = _TaskGraphNodeState.Ready
+            if self._tracer is not None:
+                self._tracer.ready(node.task.name, None)
             if isinstance(node.task, OwnTask):
-                self._ready_own_task_nodes[task.name] = node
+                self._n_ready_own += 1
                 heapq.heappush(self._ready_own_task_nodes_heap, node)
             else:
-                self._ready_task_nodes[task.name] = node
-                heapq.heappush(self._ready_task_nodes_heap, node)
+                self._push_ready_task_node(node)
         else:
-            self._pending_task_nodes[task.name] = node
+            self._n_pending += 1
 
         # processing other task's pattern dependencies on this task
-        for pp in self._pending_patterns:
-            (p, n) = pp
-            if task.name.startswith(p):
-                node.children.append(n)
+        for plen in self._pending_pattern_lens:
+            pnodes = self._pending_patterns.get(task.name[:plen])
+            if pnodes is None:
+                continue  # for plen
+            for n in pnodes:
+                node.append_child(n)
                 n.waiting_for_n_deps += 1
-                debug('Parallel: task {} now has {} dependencies due to added task {}'.format(n.task.name,
-                                                                                              n.waiting_for_n_deps,
-                                                                                              node.task.name))
+                debug('Parallel: task {} now has {} dependencies due to added task {}', n.task.name,
+                      n.waiting_for_n_deps,
+                      node.task.name)
+
+        if self._publication_holds:  # joining subtrees of whoever this task depends on, or was added by
+            if curnode is not None:
+                self._publication_adders.setdefault(curnode.task.name, []).append(node)
+            for stack, walked in self._publication_holds.values():
+                if any(id(p) in walked for p in taskparents + patparents):  # walk has passed by already
+                    stack.append(node)
 
         return True
 
     def add_tasks(self, tasks: list[Task]) -> None:
         while len(tasks) > 0:
-            megaok = False
-            for t in tasks:
-                ok = self._internal_add_task_if(t)
-                if ok:
-                    tasks.remove(t)
-                    megaok = True
-                    break  # for t
+            # one pass adds all the tasks which can be added; restarting from scratch after each added task
+            #   (and tasks.remove()) would make it O(N^2)
+            notadded = [t for t in tasks if not self._internal_add_task_if(t)]
+            megaok = len(notadded) < len(tasks)
+            tasks[:] = notadded
 
             if megaok:
                 continue  # while True
             else:
                 taskstr = '[\n'
                 for task in tasks:
-                    taskstr += '    ' + str(task.__dict__) + ',\n'
+                    taskstr += '    ' + str({slot: getattr(task, slot) for slot in Task.__slots__}) + ',\n'
                 taskstr += '\n]'
 
                 critical('Parallel: probable typo in task name or circular dependency: cannot resolve tasks:\n'
@@ -470,9 +754,14 @@ class Parallel:
 
     def _run_all_own_tasks(self, mltimer: _MainLoopTimer) -> bool:
         ran = False
-        assert len(self._ready_own_task_nodes) == len(self._ready_own_task_nodes_heap)
-        while len(self._ready_own_task_nodes) > 0:
-            self._run_own_task(mltimer)  # ATTENTION: own tasks may call add_task() or add_tasks() within
+        assert self._n_ready_own == len(self._ready_own_task_nodes_heap)
+        while len(self._ready_own_task_nodes_heap) > 0:
+            # ATTENTION: own tasks may call add_task() or add_tasks() within
+            if (self._ready_own_task_nodes_heap[0].task.batchf is not None and self._coalesce_own_tasks is not False
+                    and (self._coalesce_own_tasks or mltimer.recent_load() > _MAIN_SATURATED_LOAD)):
+                self._run_own_task_batch(mltimer)
+            else:
+                self._run_own_task(mltimer)
             ran = True
         return ran
 
@@ -480,233 +769,1004 @@ class Parallel:
     def _log_stats_data(items, unaccounted: tuple[int, float, float]) -> None:
         for item in sorted(items, key=lambda t: -t[1][2]):
             if item[1][0] != 0:
-                info('-> {}*: {}, took {:.2f}/{:.2f}s'.format(item[0], item[1][0], item[1][1], item[1][2]))
+                info('-> {}*: {}, took {:.2f}/{:.2f}s', item[0], item[1][0], item[1][1], item[1][2])
         if unaccounted[0]:
-            warn('-> _unaccounted: {}, took {:.2f}/{:.2f}s'.format(unaccounted[0], unaccounted[1], unaccounted[2]))
+            warn('-> _unaccounted: {}, took {:.2f}/{:.2f}s', unaccounted[0], unaccounted[1], unaccounted[2])
 
     def run(self, tasks: list[Task]) -> None:
         # building task graph
         self.add_tasks(tasks)
 
         # graph ok, running the initial tasks
-        assert len(self._pending_task_nodes)
+        assert self._n_pending
+        mltimer = self._start_run()
+
+        # main loop
+        while not self._run_step(mltimer):
+            # waiting for other processes to report
+            mltimer.stage('waiting')
+            got = self._get_from_inbox(self._speculation_timeout())
+            dwait = mltimer.stage('overhead')
+            if got is not None and self._process_got(mltimer, got, dwait):
+                break
+
+        self._end_run(mltimer)
+
+    async def run_async(self, tasks: list[Task]) -> None:
+        # same as run(), but instead of blocking main thread while waiting for children, yields to the event loop
+        #   - OwnTask.f may be a coroutine function (async def)
+        #   - await submit(task) returns output of the task; usable both from coroutine own tasks and from outside
+        #   - async for ... in completions() yields (taskname, out) for each task completed while it is running
+        loop = asyncio.get_running_loop()
+        assert not self._async_running
+        self._async_running = True
+        self._async_run_over = False
+        try:
+            self.add_tasks(tasks)
+            mltimer = self._start_run()
+
+            while not self._run_step(mltimer):
+                if self._async_exception is not None:
+                    raise self._async_exception
+                mltimer.stage('waiting')  # also includes running coroutines
+                self._async_waiting = True
+                got = await loop.run_in_executor(None, self._get_from_inbox, self._speculation_timeout())
+                self._async_waiting = False
+                self._async_wakeup_sent = False
+                dwait = mltimer.stage('overhead')
+                if got is not None and self._process_got(mltimer, got, dwait):
+                    break
+
+            self._end_run(mltimer)
+        finally:
+            self._async_running = False
+            self._async_run_over = True
+            for completions in self._completions:  # also on exception, so that listeners don't wait forever
+                completions.put_nowait(None)
+            self._completions = []
+
+    def _get_from_inbox(self, timeout: float | None) -> any:
+        # None on timeout
+        try:
+            return self._inbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _start_run(self) -> _MainLoopTimer:
         mltimer = _MainLoopTimer('overhead')
-        maintexttasks = 0.
+        self._mltimer = mltimer
+        self._child_processes_load = 0.
+        self._thread_pool_load = 0.
+        self._n_coalesced_own_tasks = 0
+        self._n_own_task_batches = 0
+        self._n_resource_blocks = 0
+        self._n_speculative = 0
+        self._n_speculative_wins = 0
+        self._predicted_makespan = self._predict_makespan()
 
         # we need to try running own tasks before main loop - otherwise we can get stuck in an endless loop of self._schedule_best_tasks()
         mltimer.stage('own-tasks.overhead')
         self._run_all_own_tasks(mltimer)
         mltimer.stage('overhead')
+        return mltimer
 
-        # main loop
+    def _run_step(self, mltimer: _MainLoopTimer) -> bool:
+        # does whatever is possible without waiting, returns True if everything is done
         while True:
             # place items in process queues, until each has 2 tasks, or until there are no tasks
             mltimer.stage('scheduler')
-            while True:
-                ok, dt = self._schedule_best_tasks(mltimer)
-                maintexttasks += dt
-                if not ok:
-                    break
+            self._child_processes_load += self._schedule_all_best_tasks(mltimer)
 
             mltimer.stage('own-tasks.overhead')
             ran = self._run_all_own_tasks(mltimer)
+            mltimer.stage('inline-tasks')
+            ran = self._run_all_inline_tasks(mltimer) or ran
+            if self._journal_hit_nodes:
+                mltimer.stage('journal')
+                self._complete_all_journaled_tasks()
+                ran = True
+            if not ran:
+                break  # while True
 
-            if ran:
-                mltimer.stage('scheduler')
-                while True:
-                    ok, dt = self._schedule_best_tasks(mltimer)
-                    maintexttasks += dt
-                    if not ok:
-                        break
+        if self._speculate is not None:
+            mltimer.stage('scheduler')
+            self._speculate_on_stragglers()
 
-            if __debug__:
-                mltimer.stage('logging-stats')
-                self._log_stats(dbglevel=logging.DEBUG)
+        if __debug__:
+            mltimer.stage('logging-stats')
+            self._log_stats(dbglevel=logging.DEBUG)
 
-            mltimer.stage('scheduler')
-            done = self.is_all_done()
-            if done:
-                break
+        mltimer.stage('scheduler')
+        return self.is_all_done()
 
-            # waiting for other processes to report
-            mltimer.stage('waiting')
-            got = self._outq.get()
-            dwait = mltimer.stage('overhead')
-            if __debug__:  # pickle.dumps is expensive by itself
-                debug('Parallel: response size: {}'.format(len(pickle.dumps(got))))
-            # warn(str(self.logq.qsize()))
-            if isinstance(got, Exception):
-                critical('Parallel: An exception within child process reported. Shutting down')
-
-                if not self._shutting_down:
-                    self.shutdown(True)
-                info('Parallel: shutdown ok')
-                if not self._has_joined:
-                    self.join_all(True)
-
-                critical(
-                    'Parallel: All children terminated, aborting due to an exception in a child process. For the exception itself, see log above.')
-                # noinspection PyProtectedMember, PyUnresolvedReferences
-                os._exit(1)  # if using sys.exit(), confusing logging will occur
+    def _process_got(self, mltimer: _MainLoopTimer, got: any, dwait: float) -> bool:
+        # processes one message from inbox, returns True if everything is done
+        # warn(str(self.logq.qsize()))
+        if isinstance(got, Exception):
+            critical('Parallel: An exception within child process reported. Shutting down')
+            self._abort_due_to_child()
 
-            if isinstance(got, ProcessStarted):
-                self._procrunningconfirmed[got.proc_num] = True
-                continue  # while True
+        if isinstance(got, TaskFailed):
+            self._task_failed(got)
+            return self.is_all_done()
 
-            strwait = '{:.2f}s'.format(dwait)
-            msgwarn = False
-            if dwait < 0.005:
-                strwait += '[MAIN THREAD SERIALIZATION]'
-                msgwarn = True
+        if isinstance(got, ProcessDied):
+            self._process_died(got)
+            return self.is_all_done()
 
-            (procnum, tasks) = got
+        if isinstance(got, ProcessStarted):
+            self._pool.process_started(got.proc_num)
+            return False
 
-            info_or_perf_warn(msgwarn,
-                              'Parallel: after waiting for {}, received results of {} task(s) from process #{}'.format(
-                                  strwait, len(tasks), procnum + 1))
+        if isinstance(got, _WakeUp):
+            return False  # whatever has changed, will be handled by the next _run_step()
 
-            assert len(self._process_requests[procnum]) > 0
-            self._process_requests[procnum] = self._process_requests[procnum][1:]
+        strwait = '{:.2f}s'.format(dwait)
+        msgwarn = False
+        if dwait < 0.005:
+            strwait += '[MAIN THREAD SERIALIZATION]'
+            msgwarn = True
 
-            maintexttasks += self._process_out_tasks(procnum, tasks)
+        (procnum, tasks) = got
 
-            mltimer.stage('logging-stats')
-            self._log_stats(dbglevel=logging.INFO)
+        info_or_perf_warn(msgwarn,
+                          'Parallel: after waiting for {}, received results of {} task(s) from {}',
+                          strwait, len(tasks), _worker_str(procnum))
 
-            mltimer.stage('scheduler')
-            done = self.is_all_done()
-            if done:
-                break
+        if procnum == _THREAD_WORKER:
+            assert self._thread_requests > 0
+            self._thread_requests -= 1
+            self._thread_pool_load += self._process_out_tasks(procnum, tasks)
+        else:
+            self._pop_process_request(procnum)
+            self._child_processes_load += self._process_out_tasks(procnum, tasks)
+
+        mltimer.stage('logging-stats')
+        self._log_stats(dbglevel=logging.INFO)
+
+        mltimer.stage('scheduler')
+        return self.is_all_done()
 
+    def _abort_due_to_child(self) -> None:
+        if not self._shutting_down:
+            self.shutdown(True)
+        info('Parallel: shutdown ok')
+        if not self._has_joined:
+            self.join_all(True)
+
+        critical(
+            'Parallel: All children terminated, aborting due to an exception in a child process. For the exception itself, see log above.')
+        # noinspection PyProtectedMember, PyUnresolvedReferences
+        os._exit(1)  # if using sys.exit(), confusing logging will occur
+
+    # crash isolation: child process crashes and timeouts are detected by ProcessPool watchdog, exceptions are
+    #                  reported by child (or thread pool) itself; failed tasks are retried up to Task.retries times,
+    #                  and go alone, so that innocent tasks which happened to share the batch with the culprit,
+    #                  aren't blamed again
+
+    def _pop_process_request(self, pidx: int) -> None:
+        assert len(self._process_requests[pidx]) > 0
+        self._process_requests[pidx] = self._process_requests[pidx][1:]
+        self._process_request_nodes[pidx] = self._process_request_nodes[pidx][1:]
+        self._update_process_deadline(pidx)  # next batch (if any) starts now
+
+    def _update_process_deadline(self, pidx: int) -> None:
+        self._process_head_started[pidx] = time.perf_counter()
+        if self._pool.is_remote(pidx):
+            return  # cannot kill remote processes anyway
+        batches = self._process_request_nodes[pidx]
+        deadline = None
+        if len(batches) > 0:
+            deadline = time.perf_counter()
+            for node in batches[0]:
+                timeout = node.task.timeout if node.task.timeout is not None else self._task_timeout
+                if timeout is None:
+                    deadline = None
+                    break  # for node
+                deadline += timeout
+        self._pool.deadlines[pidx] = deadline
+
+    def _retry_task_node(self, node: _TaskGraphNode, pidx: int, failed: bool, reason: str) -> None:
+        taskname = node.task.name
+        assert node.state == _TaskGraphNodeState.Running
+        spec = self._speculative.pop(taskname, None)
+        if spec is not None:  # the other copy is still running, it is enough
+            (_, started, _) = self._running_task_nodes[taskname]
+            self._running_task_nodes[taskname] = (spec[1] if pidx == spec[0] else spec[0], started, node)
+            return
+        del self._running_task_nodes[taskname]
+        self._release_resources(node)
+        if failed:
+            nfailed = self._task_attempts.get(taskname, 0) + 1
+            retries = node.task.retries if node.task.retries is not None else self._task_retries
+            if nfailed > retries:
+                critical('Parallel: task {} failed on {} ({}), {} time(s) in total, giving up',
+                         taskname, _worker_str(pidx), reason, nfailed)
+                self._abort_due_to_child()
+            warn('Parallel: task {} failed on {} ({}), retrying ({}/{})',
+                 taskname, _worker_str(pidx), reason, nfailed, retries)
+            self._task_attempts[taskname] = nfailed
+            self._task_failed_on[taskname] = pidx
+        node.state = _TaskGraphNodeState.Ready
+        self._push_ready_task_node(node)
+
+    def _task_failed(self, got: TaskFailed) -> None:
+        pidx = got.proc_num
+        if pidx == _THREAD_WORKER:
+            assert self._thread_requests > 0
+            self._thread_requests -= 1
+            self._thread_pool_load += self._process_out_tasks(pidx, got.outtasks)
+        else:
+            self._pop_process_request(pidx)
+            self._child_processes_load += self._process_out_tasks(pidx, got.outtasks)
+        if got.taskname in self._running_task_nodes:  # otherwise it is a speculative copy, completed elsewhere
+            self._retry_task_node(self._running_task_nodes[got.taskname][2], pidx, True, 'exception')
+        for taskname in got.notstarted:
+            self._retry_task_node(self._running_task_nodes[taskname][2], pidx, False, 'exception')
+
+    def _process_died(self, got: ProcessDied) -> None:
+        if self._shutting_down:
+            return
+        pidx = got.proc_num
+        reason = 'timeout' if got.timed_out else 'exit code {}'.format(got.exitcode)
+        if got.cancelled:
+            info('Parallel: process #{} was killed as its task was completed elsewhere', pidx + 1)
+        else:
+            critical('Parallel: process #{} died ({})', pidx + 1, reason)
+        batches = self._process_request_nodes[pidx]
+        self._released_blocks.pop(pidx, None)  # they're gone with the process
+        self._process_requests[pidx] = []
+        self._process_request_nodes[pidx] = []
+        if not self._pool.respawn(pidx):
+            self._remote_worker_gone(pidx)
+        for i, nodes in enumerate(batches):
+            for node in nodes:  # only the first batch was being run, the rest is innocent
+                if node.state == _TaskGraphNodeState.Done:
+                    continue  # for node, speculative copy which has lost
+                self._retry_task_node(node, pidx, i == 0 and not got.cancelled, reason)
+
+    def _remote_worker_gone(self, pidx: int) -> None:
+        critical('Parallel: remote process #{} is gone, going on without it', pidx + 1)
+        self._process_localities[pidx] = frozenset()
+        self._remote_localities = set()
+        for localities in self._process_localities:
+            if localities is not None:
+                self._remote_localities |= localities
+        for locality in [loc for loc in self._locality_heaps if loc not in self._remote_localities]:
+            for node in self._locality_heaps.pop(locality):  # to local processes
+                self._enqueue_ready_task_node(node)
+
+    def _end_run(self, mltimer: _MainLoopTimer) -> None:
         mltimer.end()
-        self._logq.put(StopSkipping())
+        self._flush_released_blocks()
+        self._pool.logq.put(StopSkipping())
 
         elapsed = mltimer.elapsed()
-        nonmainpct = maintexttasks / elapsed * 100.
+        nonmainpct = self._child_processes_load / elapsed * 100.
         info_or_perf_warn(nonmainpct < 100.,
-                          'Parallel: child processes load {:.2f}s ({:.1f}% of one core, {:.1f}% of {} cores)'.format(
-                              maintexttasks, nonmainpct, nonmainpct / self._nprocesses, self._nprocesses))
+                          'Parallel: child processes load {:.2f}s ({:.1f}% of one core, {:.1f}% of {} cores)',
+                          self._child_processes_load, nonmainpct, nonmainpct / self._nprocesses,
+                          self._nprocesses)
+        if self._thread_pool is not None:
+            threadpct = self._thread_pool_load / elapsed * 100.
+            info('Parallel: thread pool load {:.2f}s ({:.1f}% of one thread, {:.1f}% of {} threads)',
+                 self._thread_pool_load, threadpct, threadpct / self._nthreads, self._nthreads)
+        if self._work_stealing:
+            info('Parallel: work-stealing scheduler: {} steal(s)', self._ws_nsteals)
+        if self._n_own_task_batches:
+            info('Parallel: {} own tasks coalesced into {} batches', self._n_coalesced_own_tasks,
+                 self._n_own_task_batches)
+        if self._n_resource_blocks:
+            info('Parallel: admission control held back tasks {} time(s)', self._n_resource_blocks)
+        if self._n_speculative:
+            info('Parallel: {} speculative duplicate(s) started, {} of them won', self._n_speculative,
+                 self._n_speculative_wins)
         info('Parallel: breakdown per child task type of interest:')
         Parallel._log_stats_data(self._task_stats_data.items(), self._task_stats_unaccounted)
+        info('Parallel: serialization per child task type of interest (pickled bytes/time):')
+        self._log_pickle_stats()
         mltimer.log_timer_stats()
-        waiting = mltimer.stats['waiting']
+        waiting = mltimer.stats.get('waiting', 0.)
         mainpct = (elapsed - waiting) / elapsed * 100.
-        info_or_perf_warn(mainpct > 50., 'Parallel: main process load {:.1f}%'.format(mainpct))
+        info_or_perf_warn(mainpct > 50., 'Parallel: main process load {:.1f}%', mainpct)
 
         info('Parallel: breakdown per own task type of interest:')
         Parallel._log_stats_data(self._own_task_stats_data.items(), self._own_task_stats_unaccounted)
 
+        info('Parallel: predicted makespan {:.2f}s (only for tasks known at start), actual {:.2f}s',
+             self._predicted_makespan, elapsed)
+        info('Parallel: cost model per task family:')
+        self._cost_model.log_report()
+
+    def _predict_makespan(self) -> float:
+        # lower bound: the longest chain, or total work spread over all the workers, whichever is longer
+        crit = 0.
+        procwork = 0.
+        threadwork = 0.
+        mainwork = 0.
+        for node in self._all_task_nodes.values():
+            if node.state >= _TaskGraphNodeState.Running:
+                continue  # for node
+            crit = max(crit, node.total_weight())
+            if isinstance(node.task, OwnTask) or node.task.executor == TaskExecutor.Inline:
+                mainwork += node.own_weight
+            elif node.task.executor == TaskExecutor.Thread and not self._dbg_serialize:
+                threadwork += node.own_weight
+            else:
+                procwork += node.own_weight
+        return max(crit, mainwork, procwork / max(self._nprocesses, 1), threadwork / self._nthreads)
+
+    # asyncio front end
+
+    def submit(self, task: Task) -> asyncio.Future:
+        # adds task and returns awaitable for its output; requires running event loop
+        #   tasks submitted after run_async() is over, will run only within the next run_async()
+        fut = asyncio.get_running_loop().create_future()
+        self.add_task(task)
+        self._async_waiters.setdefault(task.name, []).append(fut)
+        return fut
+
+    def completions(self) -> AsyncGenerator[tuple[str, any], None]:
+        # yields (taskname, out) for each task completed from this call on, until run_async() is over
+        #   queue is created right here rather than on the first __anext__(), so nothing completed in between is lost
+        #   may be called before run_async() starts; once it is over (and until the next one), ends right away
+        completions = asyncio.Queue()
+        if self._async_run_over:
+            completions.put_nowait(None)
+        else:
+            self._completions.append(completions)
+        return Parallel._iter_completions(completions)
+
+    @staticmethod
+    async def _iter_completions(completions: asyncio.Queue) -> AsyncGenerator[tuple[str, any], None]:
+        while True:
+            item = await completions.get()
+            if item is None:
+                break  # while True
+            yield item
+
+    def _task_completed(self, taskname: str, out: any) -> None:
+        waiters = self._async_waiters.pop(taskname, None)
+        if waiters is not None:
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_result(out)
+        for completions in self._completions:
+            completions.put_nowait((taskname, out))
+
+    def _wake_up_async(self) -> None:
+        # main loop of run_async() may be waiting on inbox, while graph has been changed by a coroutine
+        if self._async_waiting and not self._async_wakeup_sent:
+            self._async_wakeup_sent = True
+            self._inbox.put(_WakeUp())
+
+    def _start_own_coroutine(self, ot: _TaskGraphNode, coro: Coroutine) -> None:
+        abort_if_not(self._async_running, lambda: 'Parallel: own task {} is a coroutine, use run_async()'.format(
+            ot.task.name))
+        assert ot.state == _TaskGraphNodeState.Ready
+        self._n_ready_own -= 1
+        ot.state = _TaskGraphNodeState.Running
+        t0 = time.perf_counter()
+        self._running_task_nodes[ot.task.name] = (_EVENT_LOOP_WORKER, t0, ot)
+        if self._tracer is not None:
+            self._tracer.dispatched(ot.task.name, _worker_str(_EVENT_LOOP_WORKER), t0)
+
+        async def wrapper() -> any:
+            _current_own_coroutine_node.set(ot)
+            return await coro
+
+        atask = asyncio.get_running_loop().create_task(wrapper())
+        atask.add_done_callback(lambda at: self._own_coroutine_done(ot, t0, at))
+
+    def _own_coroutine_done(self, ot: _TaskGraphNode, t0: float, atask: asyncio.Task) -> None:
+        if atask.cancelled() or atask.exception() is not None:
+            ex = atask.exception() if not atask.cancelled() else None
+            critical('Parallel: exception in coroutine own task {}: {}', ot.task.name, repr(ex))
+            self._async_exception = Exception('Parallel: Exception in user OwnTask.run(), quitting')
+            self._wake_up_async()
+            return
+        elapsed = time.perf_counter() - t0
+        debug('Parallel: done coroutine own task {}, elapsed={:.2f}s', ot.task.name, elapsed)
+        self._update_task_stats(True, ot.task.name, 0., elapsed)
+        self._update_weight(ot.task.name, elapsed)
+        if self._tracer is not None:
+            self._tracer.completed(ot.task.name, t0, elapsed, 0)
+        del self._running_task_nodes[ot.task.name]
+        out = atask.result()
+        self._mark_as_done(ot, out)
+        self._task_completed(ot.task.name, out)
+        self._wake_up_async()
+
     def _node_is_ready(self, ch: _TaskGraphNode) -> None:
         assert ch.state == _TaskGraphNodeState.Pending
-        assert ch.task.name not in self._ready_task_nodes
-        assert ch.task.name not in self._ready_own_task_nodes
-        assert ch.task.name in self._pending_task_nodes
-        debug('Parallel: task {} is ready'.format(ch.task.name))
+        debug('Parallel: task {} is ready', ch.task.name)
         ch.state = _TaskGraphNodeState.Ready
-        del self._pending_task_nodes[ch.task.name]
+        self._n_pending -= 1
         if isinstance(ch.task, OwnTask):
-            self._ready_own_task_nodes[ch.task.name] = ch
+            self._n_ready_own += 1
             heapq.heappush(self._ready_own_task_nodes_heap, ch)
         else:
-            self._ready_task_nodes[ch.task.name] = ch
-            heapq.heappush(self._ready_task_nodes_heap, ch)
+            self._push_ready_task_node(ch)
+
+    def _mark_as_done(self, node: _TaskGraphNode, out: any) -> None:
+        self._not_done_task_names.remove(node.task.name)
+        node.out = out  # before handling children, as journal fingerprints them together with their inputs
+        rdy = node.mark_as_done_and_handle_children()
+        for ch in rdy:
+            if self._tracer is not None:
+                self._tracer.ready(ch.task.name, node.task.name)
+            self._node_is_ready(ch)
+        self._n_done += 1
+        if self._publication_holds:
+            for name in self._publication_anchors.pop(node.task.name, ()):
+                if name in self._publication_holds:  # otherwise, already unpublished explicitly
+                    self._walk_publication(name)
+
+    def _push_ready_task_node(self, node: _TaskGraphNode) -> None:
+        self._n_ready += 1
+        if self._journal is not None and node.task.idempotent and node.task.name not in self._journal_group_chunks:
+            depouts = [parent.out for parent in node.parent_list() if isinstance(parent, _TaskGraphNode)]
+            fingerprint = _task_fingerprint(node.task, depouts)
+            if fingerprint is not None:
+                found, out = self._journal.lookup(node.task.name, fingerprint)
+                if found:
+                    node.out = out  # will be kept by _mark_as_done()
+                    self._journal_hit_nodes.append(node)
+                    return
+                self._journal_fingerprints[node.task.name] = fingerprint
+        self._enqueue_ready_task_node(node)
+
+    def _enqueue_ready_task_node(self, node: _TaskGraphNode) -> None:
+        if node.task.lane is not None and node.task.executor == TaskExecutor.Process and not self._dbg_serialize:
+            heapq.heappush(self._lane_heaps[self._lane_indexes[node.task.lane]], node)
+        elif node.task.locality in self._remote_localities and node.task.executor == TaskExecutor.Process:
+            heapq.heappush(self._locality_heaps.setdefault(node.task.locality, []), node)
+        elif node.task.executor == TaskExecutor.Inline:
+            heapq.heappush(self._ready_inline_task_nodes_heap, node)
+        elif node.task.executor == TaskExecutor.Thread and not self._dbg_serialize:
+            heapq.heappush(self._ready_thread_task_nodes_heap, node)
+        elif self._work_stealing:
+            # longest critical path first; _ws_seq keeps heap stable and avoids comparing nodes
+            self._ws_seq += 1
+            heapq.heappush(self._ready_task_nodes_heap, (-node.total_weight(), self._ws_seq, node))
+            self._ws_ready_work += node.own_weight
+        else:
+            heapq.heappush(self._ready_task_nodes_heap, node)
 
     def _process_out_tasks(self, procnum: int, tasks: list[tuple[str, tuple, any]]) -> float:
         outt = 0.
+        ispickled = procnum >= 0 and not self._dbg_serialize  # see _pickle_out_tasks()
         for taskname, times, out in tasks:
-            assert taskname in self._running_task_nodes
+            if taskname not in self._running_task_nodes:  # speculative copy which has lost, but wasn't killed in time
+                assert procnum >= 0
+                debug('Parallel: ignoring late result of task {} from {}', taskname, _worker_str(procnum))
+                if isinstance(out, tuple):
+                    self._notify_sender_shm_done(out[1])
+                continue  # for taskname
             (expectedprocnum, started, node) = self._running_task_nodes[taskname]
             assert node.state == _TaskGraphNodeState.Running
-            (cput, taskt) = times
-            assert procnum == expectedprocnum
+            cput, taskt, taskstarted = times[0], times[1], times[2]
+            spec = self._speculative.pop(taskname, None)
+            if spec is not None:
+                self._speculation_done(taskname, procnum, spec)
+            else:
+                assert procnum == expectedprocnum
+            nbytes = 0
+            if ispickled:
+                t0 = time.perf_counter()
+                out, nbytes = self._unpickle_out(out)
+                stats = self._pickle_stats(taskname)
+                stats.response_bytes += nbytes
+                stats.response_child_time += times[3]
+                stats.response_time += time.perf_counter() - t0
             dt = time.perf_counter() - started
-            debug('Parallel: task {} from process #{} took elapsed/task/cpu={:.2f}/{:.2f}/{:.2f}s'.format(
-                taskname, procnum + 1, dt, taskt, cput))
-            self._update_task_stats(False, taskname, cpu=cput, elapsed=taskt)
-            outt += taskt
-
-            self._update_weight(taskname, taskt)
+            debug('Parallel: task {} from {} took elapsed/task/cpu={:.2f}/{:.2f}/{:.2f}s',
+                  taskname, _worker_str(procnum), dt, taskt, cput)
+            if procnum != _JOURNAL_WORKER:  # nothing has been really run
+                if procnum != _INLINE_WORKER:
+                    self._release_resources(node)
+                self._update_task_stats(False, taskname, cpu=cput, elapsed=taskt)
+                self._update_task_metrics(procnum, node.task, taskt)
+                outt += taskt
+                self._update_weight(taskname, taskt)
+                if self._journal is not None:
+                    fingerprint = self._journal_fingerprints.pop(taskname, None)
+                    if fingerprint is not None:
+                        self._journal.append(taskname, fingerprint, out)
+                    groupchunk = self._journal_group_chunks.pop(taskname, None)
+                    if groupchunk is not None:
+                        self._journal.append_params(groupchunk[0], groupchunk[1], out)
+            if self._tracer is not None:
+                self._tracer.completed(taskname, None if ispickled and self._pool.is_remote(procnum) else taskstarted,
+                                       taskt, nbytes)
             del self._running_task_nodes[taskname]
-            assert taskname not in self._done_task_nodes
-            rdy = node.mark_as_done_and_handle_children()
-            for ch in rdy:
-                self._node_is_ready(ch)
-            self._done_task_nodes[taskname] = (node, out)
+            self._mark_as_done(node, out)
+            if self._async_running:
+                self._task_completed(taskname, out)
 
         return outt
 
+    def _update_task_metrics(self, procnum: int, task: Task, taskt: float) -> None:
+        worker = (_worker_str(procnum),)
+        self._metrics.inc('sanguine_parallel_tasks_completed_total', 1., worker)
+        self._metrics.inc('sanguine_parallel_task_seconds_total', taskt, worker)
+        if isinstance(task.w, TaskCost):
+            self._metrics.inc('sanguine_parallel_task_units_total', task.w.units, (worker[0], task.w.family))
+        self._metrics.observe('sanguine_parallel_task_duration_seconds', taskt,
+                              ('process',) if procnum >= 0 else worker)
+
+    def _collect_metrics(self, metrics: Metrics) -> None:
+        # called from HTTP or dumper thread, so only reads whatever can be read without locks
+        metrics.set('sanguine_parallel_tasks', self._n_pending, ('pending',))
+        metrics.set('sanguine_parallel_tasks', self._n_ready + self._n_ready_own, ('ready',))
+        metrics.set('sanguine_parallel_tasks', len(self._running_task_nodes), ('running',))
+        metrics.set('sanguine_parallel_tasks', self._n_done, ('done',))
+        for pidx, requests in enumerate(self._process_request_nodes):
+            metrics.set('sanguine_parallel_queue_depth', len(requests), (_worker_str(pidx),))
+        metrics.set('sanguine_parallel_queue_depth', self._thread_requests, (_worker_str(_THREAD_WORKER),))
+        mltimer = self._mltimer
+        if mltimer is not None:
+            metrics.set('sanguine_parallel_main_load', mltimer.recent_load())
+            for stage, t in list(mltimer.stats.items()):
+                metrics.set('sanguine_parallel_main_stage_seconds', t, (stage,))
+        metrics.set('sanguine_parallel_shm_bytes', sum(shm.size for shm in list(self._pool.publications.values())),
+                    ('publications',))
+        metrics.set('sanguine_parallel_shm_bytes', sum(shm.size for shm, _ in list(_attached_slabs.values())),
+                    ('received',))
+        metrics.set('sanguine_parallel_shm_bytes',
+                    sum(slab.shm.size for slab in list(_pool_of_shared_returns.slabs.values())), ('own',))
+
+    def metrics(self) -> Metrics:
+        return self._metrics
+
+    def _unpickle_out(self, data: bytes | tuple[bytes, SharedReturnParam]) -> tuple[any, int]:
+        # see _pickle_out_tasks(); out-of-band buffers are copied, as results may live forever
+        if isinstance(data, bytes):
+            return pickle.loads(data), len(data)
+        (data, blockparam) = data
+        block = _ReceivedBlock(blockparam)
+        out = pickle.loads(data, buffers=_read_oob(block.buf, 0, True))
+        block.close()
+        self._notify_sender_shm_done(blockparam)
+        return out, len(data) + blockparam[2]
+
+    def _n_queued_task_nodes(self) -> int:
+        # ready tasks which are not in _ready_task_nodes_heap
+        return (sum([len(d) for d in self._process_deques]) + len(self._ready_thread_task_nodes_heap)
+                + len(self._ready_inline_task_nodes_heap) + len(self._journal_hit_nodes)
+                + len(self._resource_blocked_nodes) + sum([len(h) for h in self._lane_heaps])
+                + sum([len(h) for h in self._locality_heaps.values()]))
+
+    def _schedule_all_best_tasks(self, mltimer: _MainLoopTimer) -> float:
+        maintexttasks = 0.
+        while True:
+            ok, dt = self._schedule_best_tasks(mltimer)
+            maintexttasks += dt
+            if not ok:
+                break
+        while self._schedule_thread_tasks(mltimer):
+            pass
+        return maintexttasks
+
     def _schedule_best_tasks(self, mltimer: _MainLoopTimer) -> tuple[
         bool, float]:  # may schedule multiple tasks as one meta-task
-        assert len(self._ready_task_nodes) == len(self._ready_task_nodes_heap)
-        if len(self._ready_task_nodes) == 0:
+        for lane, heap in enumerate(self._lane_heaps):  # lanes go first, both to reserved and to bulk processes
+            if len(heap) > 0:
+                pidx = self._find_best_process(lane=lane)
+                if pidx >= 0:
+                    ok, dt = self._schedule_best_tasks_from(mltimer, pidx, heap, lane)
+                    if ok:
+                        return ok, dt
+
+        for locality, heap in self._locality_heaps.items():
+            if len(heap) > 0:
+                pidx = self._find_best_process(locality=locality)
+                if pidx < 0 and not self._has_ready_bulk_tasks():  # local processes would be idle otherwise
+                    pidx = self._find_best_process()
+                if pidx >= 0:
+                    ok, dt = self._schedule_best_tasks_from(mltimer, pidx, heap, None)
+                    if ok:
+                        return ok, dt
+
+        if self._work_stealing:
+            return self._ws_schedule_best_tasks(mltimer)
+
+        assert self._n_ready == len(self._ready_task_nodes_heap) + self._n_queued_task_nodes()
+        if len(self._ready_task_nodes_heap) == 0:
             return False, 0.
 
         pidx = self._find_best_process() if not self._dbg_serialize else 0
         if pidx < 0:
             return False, 0.
+        return self._schedule_best_tasks_from(mltimer, pidx, self._ready_task_nodes_heap, None)
+
+    def _schedule_best_tasks_from(self, mltimer: _MainLoopTimer, pidx: int, heap: list[_TaskGraphNode],
+                                  lane: int | None) -> tuple[bool, float]:
+        if self._task_attempts and self._task_failed_on.get(heap[0].task.name) == pidx:
+            otherpidx = self._find_best_process(pidx, lane)
+            if otherpidx >= 0:  # retrying on another process if possible
+                pidx = otherpidx
+        nodes = []
+        total_time = 0.
+        while len(heap) > 0 and total_time < 0.1:  # heuristics: <0.1s is not worth jerking around
+            if self._task_attempts and self._is_retried(nodes, heap[0]):
+                break  # while
+            node = heapq.heappop(heap)
+            if node.task.resources is not None and not self._admit(node):
+                continue  # while
+            nodes.append(node)
+            total_time += node.own_weight
+
+        if len(nodes) == 0:
+            return False, 0.
+        return True, self._send_tasks_to_process(mltimer, pidx, nodes)
+
+    @staticmethod
+    def _task_plus(node: _TaskGraphNode) -> list:
+        # task itself, followed by outputs of its dependencies
+        assert not isinstance(node.task, OwnTask) and not isinstance(node.task, TaskPlaceholder)
+        taskplus = [node.task]
+        assert len(node.task.dependencies) == len(node.parent_list())
+        for parent in node.parent_list():
+            if isinstance(parent, _TaskGraphNode):
+                assert parent.state == _TaskGraphNodeState.Done
+                taskplus.append(parent.out)
+            else:
+                assert isinstance(parent, str)
+        assert len(taskplus) == 1 + len(node.task.dependencies)
+        return taskplus
+
+    def _start_task_nodes(self, pidx: int, nodes: list[_TaskGraphNode]) -> tuple[list[list], float]:
         taskpluses = []
         total_time = 0.
-        tasksstr = '['
         t0 = time.perf_counter()
-        i = 0
-        tout = 0.
-        while len(self._ready_task_nodes) > 0 and total_time < 0.1:  # heuristics: <0.1s is not worth jerking around
-            assert len(self._ready_task_nodes) == len(self._ready_task_nodes_heap)
-            node = heapq.heappop(self._ready_task_nodes_heap)
-            assert not isinstance(node.task, OwnTask) and not isinstance(node.task, TaskPlaceholder)
-            i += 1
-            taskplus = [node.task]
-            assert len(node.task.dependencies) == len(node.parents)
-            for parent in node.parents:
-                if isinstance(parent, _TaskGraphNode):
-                    done = self._done_task_nodes[parent.task.name]
-                    taskplus.append(done[1])
-                else:
-                    assert isinstance(parent, str)
-            assert len(taskplus) == 1 + len(node.task.dependencies)
-
+        for node in nodes:
+            taskplus = self._task_plus(node)
             assert node.state == _TaskGraphNodeState.Ready
-            assert node.task.name in self._ready_task_nodes
-            del self._ready_task_nodes[node.task.name]
+            self._n_ready -= 1
             node.state = _TaskGraphNodeState.Running
             self._running_task_nodes[node.task.name] = (pidx, t0, node)
+            if self._tracer is not None:
+                self._tracer.dispatched(node.task.name, _worker_str(pidx), t0)
 
             taskpluses.append(taskplus)
             total_time += node.own_weight
-            tasksstr += ',+' + node.task.name
 
-        tasksstr += ']'
-        if len(taskpluses) == 0:
-            return False, 0.
+        return taskpluses, total_time
+
+    def _send_tasks_to_process(self, mltimer: _MainLoopTimer, pidx: int, nodes: list[_TaskGraphNode]) -> float:
+        taskpluses, total_time = self._start_task_nodes(pidx, nodes)
+        tout = 0.
 
         if self._dbg_serialize:
             ex, out = _process_nonown_tasks(taskpluses, None)
             if ex is not None:
                 raise ex
             tout += self._process_out_tasks(pidx, out)
-            return True, tout
+            return tout
 
         self._process_requests[pidx].append(total_time)
+        self._process_request_nodes[pidx].append(nodes)
+        if len(self._process_request_nodes[pidx]) == 1:
+            self._update_process_deadline(pidx)
 
-        msg = (taskpluses, None)
+        mltimer.stage('scheduler.pickle')
+        pickled = self._pickle_task_pluses(nodes, taskpluses)
         mltimer.stage('scheduler.queue-put')
-        self._inqueues[pidx].put(msg)
+        self._pool.send(pidx, (pickled, self._released_blocks.pop(pidx, None)))
         mltimer.stage('scheduler')
         # self.logq.put((-1,time.perf_counter(),make_log_record(logging.INFO, 'Parallel: assigned tasks {} to process #{}'.format(tasksstr, pidx + 1))))
         mltimer.stage('scheduler.logging')
-        info('Parallel: assigned tasks {} to process #{}'.format(tasksstr, pidx + 1))
-        if __debug__:  # pickle.dumps is expensive by itself
-            debug('Parallel: request size: {}'.format(len(pickle.dumps(msg))))
+        info('Parallel: assigned tasks {} to process #{}', LazyLogArg(lambda: _tasks_str(nodes)), pidx + 1)
+        debug('Parallel: request size: {}', LazyLogArg(lambda: sum([len(data) for data in pickled])))
+        mltimer.stage('scheduler')
+        return tout
+
+    # speculative execution: at the end of the run, one slow task (say, huge archive on slow USB disk) may define
+    #                        wall-clock time while other processes are idle; so once such a task runs for
+    #                        clearly longer than its estimate, idle process starts the same task from scratch.
+    #                        Only idempotent tasks (Task.idempotent) are duplicated, and only if they were sent
+    #                        alone (so that we know when they started) and don't need TaskResources.
+    #                        Losing copy is killed only if its process has nothing else queued (otherwise, innocent
+    #                        requests would be retried elsewhere); if it has, it runs to completion
+
+    def _speculation_candidate(self, pidx: int) -> _TaskGraphNode | None:
+        batches = self._process_request_nodes[pidx]
+        if len(batches) != 1 or len(batches[0]) != 1:  # with anything queued behind it, it can't be cancelled
+            return None
+        node = batches[0][0]
+        if (not node.task.idempotent or node.task.resources is not None or node.task.name in self._speculative
+                or node.state != _TaskGraphNodeState.Running):
+            return None
+        return node
+
+    def _speculation_threshold(self, node: _TaskGraphNode) -> float:
+        return max(node.own_weight * self._speculate, _SPECULATE_MIN_ELAPSED)
+
+    def _speculation_timeout(self) -> float | None:
+        # how long main loop may wait before it is time to look for stragglers again, None means 'forever'
+        if self._speculate is None or self._has_ready_bulk_tasks():
+            return None
+        if not any([len(requests) == 0 for requests in self._process_requests]):
+            return None  # no idle processes, and the next one to become idle will report to us anyway
+        now = time.perf_counter()
+        timeout = None
+        for pidx in range(self._nprocesses):
+            node = self._speculation_candidate(pidx)
+            if node is not None:
+                left = self._process_head_started[pidx] + self._speculation_threshold(node) - now
+                timeout = left if timeout is None else min(timeout, left)
+        return max(timeout, _SPECULATE_MIN_WAIT) if timeout is not None else None
+
+    def _speculate_on_stragglers(self) -> None:
+        if self._has_ready_bulk_tasks():
+            return  # idle processes will have something better to do
+        now = time.perf_counter()
+        for pidx in range(self._nprocesses):
+            node = self._speculation_candidate(pidx)
+            if node is None:
+                continue  # for pidx
+            elapsed = now - self._process_head_started[pidx]
+            if elapsed < self._speculation_threshold(node):
+                continue  # for pidx
+            dup = self._find_best_process(pidx, self._lane_indexes[node.task.lane]
+                                          if node.task.lane is not None and not self._dbg_serialize else None)
+            if dup < 0 or len(self._process_requests[dup]) > 0:
+                return  # no idle processes left
+            info('Parallel: task {} runs on process #{} for {:.2f}s (estimated {:.2f}s), '
+                 'starting its speculative duplicate on process #{}', node.task.name, pidx + 1, elapsed,
+                 node.own_weight, dup + 1)
+            self._speculative[node.task.name] = (pidx, dup)
+            self._n_speculative += 1
+            self._process_requests[dup].append(node.own_weight)
+            self._process_request_nodes[dup].append([node])
+            self._update_process_deadline(dup)
+            self._pool.send(dup, (self._pickle_task_pluses([node], [self._task_plus(node)]),
+                                  self._released_blocks.pop(dup, None)))
+
+    def _speculation_done(self, taskname: str, procnum: int, spec: tuple[int, int]) -> None:
+        (original, dup) = spec
+        assert procnum == original or procnum == dup
+        loser = dup if procnum == original else original
+        if procnum == dup:
+            self._n_speculative_wins += 1
+            (_, started, node) = self._running_task_nodes[taskname]
+            self._running_task_nodes[taskname] = (dup, started, node)
+        # remote loser, or one which got more requests since, will complete, and its result will be ignored
+        batches = self._process_request_nodes[loser]
+        assert len(batches) > 0 and batches[0][0].task.name == taskname
+        cancel = not self._pool.is_remote(loser) and len(batches) == 1
+        info('Parallel: task {}: {} copy has won, {} the one on process #{}', taskname,
+             'speculative' if procnum == dup else 'original', 'cancelling' if cancel else 'ignoring', loser + 1)
+        if cancel:
+            self._pool.cancel(loser)
+
+    def _pickle_task_pluses(self, nodes: list[_TaskGraphNode], taskpluses: list[list]) -> list[bytes]:
+        # one by one, to account per task; it costs the same as pickling by queue feeder thread, which would hold
+        #   the GIL anyway
+        pickled = []
+        for node, taskplus in zip(nodes, taskpluses):
+            t0 = time.perf_counter()
+            data = pickle.dumps(taskplus, protocol=pickle.HIGHEST_PROTOCOL)
+            stats = self._pickle_stats(node.task.name)
+            stats.n += 1
+            stats.request_bytes += len(data)
+            stats.request_time += time.perf_counter() - t0
+            if self._tracer is not None:
+                self._tracer.pickled(node.task.name, len(data))
+            pickled.append(data)
+        return pickled
+
+    def _pickle_stats(self, name: str) -> _TaskPickleStats:
+        srch = self._task_stats_srch.find_val_for_str(name)
+        key = srch[0] if srch is not None else None
+        stats = self._pickle_stats_data.get(key)
+        if stats is None:
+            stats = _TaskPickleStats()
+            self._pickle_stats_data[key] = stats
+        return stats
+
+    def _log_pickle_stats(self) -> None:
+        for key, stats in sorted(self._pickle_stats_data.items(),
+                                 key=lambda item: -item[1].request_bytes - item[1].response_bytes):
+            avgresponse = stats.response_bytes / stats.n
+            info_or_perf_warn(avgresponse > _PICKLE_PERF_WARN_BYTES,
+                              '-> {}: {}, request {:.1f}M/{:.2f}s, response {:.1f}M/{:.2f}s+{:.2f}s in child{}',
+                              key + '*' if key is not None else '_unaccounted', stats.n,
+                              stats.request_bytes / 1048576., stats.request_time,
+                              stats.response_bytes / 1048576., stats.response_time, stats.response_child_time,
+                              ' (consider SharedReturn)' if avgresponse > _PICKLE_PERF_WARN_BYTES else '')
+
+    def _start_threads(self) -> None:
+        assert self._thread_pool is None
+        info('Parallel: starting thread pool with {} threads...', self._nthreads)
+        self._thread_pool = ThreadPoolExecutor(max_workers=self._nthreads, thread_name_prefix='sanguine.tasks')
+        self._inbox = queue.Queue()
+        self._forwarding_thread = Thread(target=_forward_outq, args=(self._pool.outq, self._inbox), daemon=True)
+        self._forwarding_thread.start()
+
+    def _stop_threads(self, force: bool) -> None:
+        if self._thread_pool is None:
+            return
+        self._thread_pool.shutdown(wait=not force, cancel_futures=force)
+        self._pool.outq.put(_StopForwarding())
+        self._forwarding_thread.join()
+        # whatever was forwarded but not processed, can only be ProcessStarted
+        while True:
+            try:
+                got = self._inbox.get_nowait()
+            except queue.Empty:
+                break  # while True
+            if isinstance(got, ProcessStarted):
+                self._pool.process_started(got.proc_num)
+        self._inbox = self._pool.outq
+        self._thread_pool = None
+        self._forwarding_thread = None
+
+    def _schedule_thread_tasks(self, mltimer: _MainLoopTimer) -> bool:
+        if len(self._ready_thread_task_nodes_heap) == 0 or self._thread_requests >= self._nthreads:
+            return False
+        if self._thread_pool is None:
+            mltimer.stage('scheduler.start-threads')
+            self._start_threads()
+            mltimer.stage('scheduler')
+
+        nodes = []
+        total_time = 0.
+        while len(self._ready_thread_task_nodes_heap) > 0 and total_time < _THREAD_MAX_BATCH:
+            node = heapq.heappop(self._ready_thread_task_nodes_heap)
+            if node.task.resources is not None and not self._admit(node):
+                continue  # while
+            nodes.append(node)
+            total_time += node.own_weight
+        if len(nodes) == 0:
+            return False
+        taskpluses, _ = self._start_task_nodes(_THREAD_WORKER, nodes)
+        self._thread_requests += 1
+        self._thread_pool.submit(_thread_func, self._inbox, taskpluses)
+        mltimer.stage('scheduler.logging')
+        info('Parallel: assigned tasks {} to thread pool', LazyLogArg(lambda: _tasks_str(nodes)))
         mltimer.stage('scheduler')
-        return True, tout
+        return True
+
+    def _run_all_inline_tasks(self, mltimer: _MainLoopTimer) -> bool:
+        ran = False
+        while len(self._ready_inline_task_nodes_heap) > 0:
+            node = heapq.heappop(self._ready_inline_task_nodes_heap)
+            taskpluses, _ = self._start_task_nodes(_INLINE_WORKER, [node])
+            ex, out = _process_nonown_tasks(taskpluses, None)
+            if ex is not None:
+                raise ex
+            self._process_out_tasks(_INLINE_WORKER, out)  # may make more inline tasks ready
+            ran = True
+        mltimer.stage('scheduler')
+        return ran
+
+    def _complete_all_journaled_tasks(self) -> None:
+        while len(self._journal_hit_nodes) > 0:  # completing may make more journaled tasks ready
+            nodes = self._journal_hit_nodes
+            self._journal_hit_nodes = []
+            self._start_task_nodes(_JOURNAL_WORKER, nodes)
+            info('Parallel: {} task(s) completed from journal', len(nodes))
+            self._process_out_tasks(_JOURNAL_WORKER, [(node.task.name, (0., 0., None), node.out) for node in nodes])
+
+    # work-stealing scheduler: ready tasks are pre-assigned to per-process deques (in the main process),
+    #                          each process gets its next batch from the head of its own deque,
+    #                          and idle processes steal not-started-yet tasks from the tail of the busiest deque.
+    #                          max_leaf_weight (i.e. critical path estimate) defines both priority and batch size
+
+    def _ws_process_load(self, pidx: int) -> float:
+        return sum(self._process_requests[pidx]) + self._process_deque_weights[pidx]
+
+    def _ws_critical_path(self) -> float:
+        crit = -self._ready_task_nodes_heap[0][0] if len(self._ready_task_nodes_heap) > 0 else 0.
+        for d in self._process_deques:
+            if len(d) > 0:
+                crit = max(crit, d[0].total_weight())
+        return crit
+
+    def _ws_batch_budget(self, head: _TaskGraphNode) -> float:
+        # lower bound for remaining makespan; whatever head task has in excess of its own chain, is its slack
+        #   which we can spend on batching. Tasks on critical path go alone, tasks with lots of parallel slack
+        #   are batched up to _WS_MAX_BATCH
+        bound = max(self._ws_critical_path(), self._ws_ready_work / max(self._n_bulk_processes, 1))
+        slack = bound - head.total_weight()
+        return min(_WS_MAX_BATCH, max(slack, 0.) * _WS_SLACK_FRACTION)
+
+    def _ws_distribute(self) -> None:
+        while len(self._ready_task_nodes_heap) > 0:
+            best = min(range(self._n_bulk_processes), key=lambda i: self._ws_process_load(i))
+            if len(self._process_deques[best]) > 0 and self._ws_process_load(best) >= _WS_DEQUE_TARGET:
+                return
+            (_, _, node) = heapq.heappop(self._ready_task_nodes_heap)
+            assert node.state == _TaskGraphNodeState.Ready
+            self._process_deques[best].append(node)
+            self._process_deque_weights[best] += node.own_weight
+
+    def _ws_steal(self, thief: int) -> bool:
+        victim = -1
+        victimw = 0.
+        for i in range(self._nprocesses):
+            if i != thief and len(self._process_deques[i]) > 0 and self._process_deque_weights[i] >= victimw:
+                victim = i
+                victimw = self._process_deque_weights[i]
+        if victim < 0:
+            return False
 
-    def _notify_sender_shm_done(self, pidx: int, name: str) -> None:
+        # stealing up to half of victim's queued work from its tail (least critical tasks), but at least one task
+        vd = self._process_deques[victim]
+        stolen = []
+        stolenw = 0.
+        while len(vd) > 0 and (len(stolen) == 0 or stolenw + vd[-1].own_weight <= victimw / 2):
+            node = vd.pop()
+            stolen.append(node)
+            stolenw += node.own_weight
+        self._process_deque_weights[victim] -= stolenw
+        for node in reversed(stolen):
+            self._process_deques[thief].append(node)
+        self._process_deque_weights[thief] += stolenw
+        self._ws_nsteals += 1
+        debug('Parallel: process #{} stole {} task(s) ({:.2f}s) from process #{}',
+              thief + 1, len(stolen), stolenw, victim + 1)
+        return True
+
+    def _ws_can_send_to(self, pidx: int) -> bool:
+        reqs = self._process_requests[pidx]
+        return len(reqs) == 0 or (len(reqs) == 1 and reqs[0] < _WS_PREFETCH_THRESHOLD)
+
+    def _ws_schedule_best_tasks(self, mltimer: _MainLoopTimer) -> tuple[bool, float]:
+        assert self._n_ready == len(self._ready_task_nodes_heap) + self._n_queued_task_nodes()
+        if self._n_ready == 0:
+            return False, 0.
+
+        self._ws_distribute()
+        pidx = -1
+        for i in range(self._n_bulk_processes):
+            if self._ws_can_send_to(i) and len(self._process_deques[i]) > 0:
+                pidx = i
+                break  # for i
+        if pidx < 0:  # nobody has own work, trying to steal
+            for i in range(self._n_bulk_processes):
+                if self._ws_can_send_to(i) and self._ws_steal(i):
+                    pidx = i
+                    break  # for i
+        if pidx < 0:
+            return False, 0.
+
+        pd = self._process_deques[pidx]
+        budget = self._ws_batch_budget(pd[0])
+        nodes = []
+        total_time = 0.
+        while len(pd) > 0 and (len(nodes) == 0 or total_time + pd[0].own_weight <= budget):
+            if self._task_attempts and self._is_retried(nodes, pd[0]):
+                break  # while
+            node = pd.popleft()
+            if node.task.resources is not None and not self._admit(node):
+                self._process_deque_weights[pidx] -= node.own_weight
+                self._ws_ready_work -= node.own_weight  # will be added back when unblocked
+                continue  # while
+            nodes.append(node)
+            total_time += node.own_weight
+        self._process_deque_weights[pidx] -= total_time
+        self._ws_ready_work -= total_time
+        if len(nodes) == 0:
+            return True, 0.  # whatever we've blocked, won't be there next time
+        return True, self._send_tasks_to_process(mltimer, pidx, nodes)
+
+    def _notify_sender_shm_done(self, sharedparam: SharedReturnParam) -> None:
+        # blocks of child processes are released in bulk, along with the next request to the same process
+        (name, offset, _, pidx) = sharedparam
         if pidx < 0:
             assert pidx == -1
-            debug('Parallel: Releasing own shm={}'.format(name))
-            _pool_of_shared_returns.done_with(name)
+            debug('Parallel: Releasing own shm={}@{}', name, offset)
+            _pool_of_shared_returns.done_with([(name, offset)])
         else:
-            self._inqueues[pidx].put((None, name))
+            self._released_blocks.setdefault(pidx, []).append((name, offset))
+
+    def _flush_released_blocks(self) -> None:  # whoever is idle, won't get next request any time soon
+        for pidx, handles in self._released_blocks.items():
+            self._pool.send(pidx, (None, handles))
+        self._released_blocks = {}
 
     @staticmethod
     def _update_task_stats_internal(some_task_stats_data, srch: tuple[str, tuple[int, float, float]], cpu,
@@ -736,9 +1796,80 @@ class Parallel:
                 return
             Parallel._update_task_stats_internal(self._task_stats_data, srch, cpu, elapsed)
 
+    def _run_own_task_batch(self, mltimer: _MainLoopTimer) -> None:
+        # head of the heap, together with all the ready own tasks having the same batchf and the same tags;
+        #   the same tags means that whatever the batch adds, gets exactly the same data dependency guarantees
+        #   as if it was added by any of the coalesced tasks
+        assert self._current_task_node is None
+        mltimer.stage('scheduler')
+        head = self._ready_own_task_nodes_heap[0]
+        batchf = head.task.batchf
+        tags = head.guaranteed_tags  # interned, so comparing by identity
+        nodes = []
+        rest = []
+        for node in self._ready_own_task_nodes_heap:
+            if node.task.batchf is batchf and node.guaranteed_tags is tags:
+                nodes.append(node)
+            else:
+                rest.append(node)
+        if len(nodes) < 2:
+            return self._run_own_task(mltimer)
+        heapq.heapify(rest)
+        self._ready_own_task_nodes_heap = rest
+        mltimer.stage('own-tasks.overhead')
+
+        items = []
+        for ot in nodes:
+            if __debug__ and ot.task.data_dependencies is not None:
+                dd = ot.task.data_dependencies
+                for req in dd.required_tags:
+                    assert req in self._data_dependencies
+                for reqnot in dd.required_not_tags:
+                    assert reqnot not in self._data_dependencies
+                for prov in dd.provided_tags:
+                    self._data_dependencies[prov] = 1
+            assert len(ot.parent_list()) == len(ot.task.dependencies)
+            items.append(tuple([ot.task.param] + [p.out for p in ot.parent_list() if isinstance(p, _TaskGraphNode)]))
+
+        mltimer.stage('own-tasks.logging')
+        info('Parallel: running {} own tasks as one batch, starting with {}', len(nodes), head.task.name)
+        t0 = time.perf_counter()
+        tp0 = time.process_time()
+
+        mltimer.stage('own-tasks')
+        self._current_task_node = head
+        try:
+            outs = batchf(items)
+        except Exception as e:
+            critical('Parallel: exception in batch of own tasks starting with {}: {}', head.task.name, e)
+            warn(traceback.format_exc())
+            raise Exception('Parallel: Exception in user OwnTask.batchf(), quitting')
+        finally:
+            self._current_task_node = None
+        abort_if_not(len(outs) == len(nodes), lambda: 'Parallel: OwnTask.batchf() returned {} outputs for {} tasks'.format(
+            len(outs), len(nodes)))
+
+        elapsed = (time.perf_counter() - t0) / len(nodes)
+        cpu = (time.process_time() - tp0) / len(nodes)
+        mltimer.stage('scheduler')
+        self._n_coalesced_own_tasks += len(nodes)
+        self._n_own_task_batches += 1
+        for i, (ot, out) in enumerate(zip(nodes, outs)):
+            self._update_task_stats(True, ot.task.name, cpu, elapsed)
+            self._update_weight(ot.task.name, elapsed)
+            if self._tracer is not None:  # batch is traced as if its tasks were run one by one
+                self._tracer.dispatched(ot.task.name, _worker_str(_INLINE_WORKER), t0 + i * elapsed)
+                self._tracer.completed(ot.task.name, t0 + i * elapsed, elapsed, 0)
+            assert ot.state == _TaskGraphNodeState.Ready
+            self._n_ready_own -= 1
+            self._mark_as_done(ot, out)
+            if self._async_running:
+                self._task_completed(ot.task.name, out)
+        mltimer.stage('own-tasks.overhead')
+
     def _run_own_task(self, mltimer: _MainLoopTimer) -> None:
         assert self._current_task_node is None
-        assert len(self._ready_own_task_nodes) > 0
+        assert self._n_ready_own > 0
         towntask = 0.
         mltimer.stage('scheduler')
         ot = heapq.heappop(self._ready_own_task_nodes_heap)
@@ -756,11 +1887,11 @@ class Parallel:
                 self._data_dependencies[prov] = 1
 
         params = []
-        assert len(ot.parents) == len(ot.task.dependencies)
-        for p in ot.parents:
+        assert len(ot.parent_list()) == len(ot.task.dependencies)
+        for p in ot.parent_list():
             if isinstance(p, _TaskGraphNode):
-                param = self._done_task_nodes[p.task.name]
-                params.append(param[1])
+                assert p.state == _TaskGraphNodeState.Done
+                params.append(p.out)
             else:
                 assert isinstance(p, str)
 
@@ -768,7 +1899,7 @@ class Parallel:
         assert len(params) <= 3
 
         mltimer.stage('own-tasks.logging')
-        debug('Parallel: running own task {}'.format(ot.task.name))
+        debug('Parallel: running own task {}', ot.task.name)
         t0 = time.perf_counter()
         tp0 = time.process_time()
 
@@ -781,6 +1912,10 @@ class Parallel:
         self._current_task_node = None
         if ex is not None:
             raise Exception('Parallel: Exception in user OwnTask.run(), quitting')
+        if inspect.iscoroutine(out):
+            mltimer.stage('own-tasks.overhead')
+            self._start_own_coroutine(ot, out)  # will be completed by _own_coroutine_done()
+            return
         # newnall = len(self.all_task_nodes)
         # assert newnall >= nall
         # wereadded = newnall > nall
@@ -788,52 +1923,215 @@ class Parallel:
         elapsed = time.perf_counter() - t0
         cpu = time.process_time() - tp0
         mltimer.stage('own-tasks.logging')
-        debug('Parallel: done own task {}, cpu/elapsed={:.2f}/{:.2f}s'.format(
-            ot.task.name, cpu, elapsed))
+        debug('Parallel: done own task {}, cpu/elapsed={:.2f}/{:.2f}s', ot.task.name, cpu, elapsed)
         towntask += elapsed
 
         mltimer.stage('scheduler')
         self._update_task_stats(True, ot.task.name, cpu, elapsed)
         self._update_weight(ot.task.name, elapsed)
+        if self._tracer is not None:
+            self._tracer.dispatched(ot.task.name, _worker_str(_INLINE_WORKER), t0)
+            self._tracer.completed(ot.task.name, t0, elapsed, 0)
 
         assert ot.state == _TaskGraphNodeState.Ready
-        assert ot.task.name in self._ready_own_task_nodes
-        del self._ready_own_task_nodes[ot.task.name]
-        rdy = ot.mark_as_done_and_handle_children()
-        for ch in rdy:
-            self._node_is_ready(ch)
-        ot.state = _TaskGraphNodeState.Done
-        self._done_task_nodes[ot.task.name] = (ot, out)
+        self._n_ready_own -= 1
+        self._mark_as_done(ot, out)
+        if self._async_running:
+            self._task_completed(ot.task.name, out)
         mltimer.stage('own-tasks.overhead')
 
     def is_all_done(self) -> bool:
-        return len(self._done_task_nodes) == len(self._all_task_nodes)
+        return self._n_done == len(self._all_task_nodes)
 
     def add_task(self, task: Task) -> None:  # to be called from owntask.f()
         assert task.name not in self._all_task_nodes
         added = self._internal_add_task_if(task)
         abort_if_not(added,
                      lambda: 'Parallel: cannot add task {}, are you sure all dependencies are known?'.format(task.name))
+        self._wake_up_async()
+
+    def add_task_group(self, group: TaskGroup) -> list[str]:  # can be called from owntask.f() too
+        # returns names of added reducer own tasks (or of chunk tasks if there is no reducer),
+        #   callers usually depend on them via group.reducer_name + '.*'
+        assert not is_lambda(group.f) or group.executor != TaskExecutor.Process
+        params = group.params
+        groupweights = group.weights
+        journalkey = None
+        fingerprints = None
+        added = []
+        if self._journal is not None and group.idempotent and not group.dependencies:
+            # journaled per param rather than per chunk, as chunks are not stable across restarts
+            journalkey = _group_journal_key(group)
+            params, groupweights, fingerprints, journaled = self._journaled_group_params(group, journalkey)
+            if journaled:
+                added.append(self._add_journaled_group_outs(group, journaled))
+        nparams = len(params)
+        if nparams == 0:
+            return added
+        weights = groupweights
+        if weights is None:
+            weights = [_TASK_GROUP_DEFAULT_PARAM_WEIGHT] * nparams
+        elif group.cost_family is not None:  # group.weights are in units
+            weights = [self._cost_model.estimate(TaskCost(group.cost_family, units)) for units in groupweights]
+        totalw = sum(weights)
+        match group.executor:
+            case TaskExecutor.Process:
+                nworkers = max(self._nprocesses, 1)
+            case TaskExecutor.Thread:
+                nworkers = self._nthreads
+            case _:
+                nworkers = 1
+        nchunks = max(1, min(nparams, nworkers * _TASK_GROUP_CHUNKS_PER_WORKER,
+                             int(totalw / _TASK_GROUP_MIN_CHUNK_WEIGHT)))
+
+        reducerf = None if group.reducer is None else lambda _, outs: group.reducer(outs)
+        reducerbatchf = None if group.reducer is None else lambda items: [group.reducer(outs) for (_, outs) in items]
+        for i, chunk in enumerate(_split_task_group(weights, nchunks)):
+            taskname = '{}.{}'.format(group.name, i)
+            if group.cost_family is not None:
+                w = TaskCost(group.cost_family, sum(groupweights[pi] for pi in chunk), len(chunk))
+            else:
+                w = sum(weights[pi] for pi in chunk)  # explicit w, so not stored in JSON
+            task = Task(taskname, _task_group_chunk_func, (group.f, [params[pi] for pi in chunk]),
+                        group.dependencies, w, executor=group.executor, idempotent=group.idempotent)
+            if journalkey is not None:
+                self._journal_group_chunks[taskname] = (journalkey, [fingerprints[pi] for pi in chunk])
+            if reducerf is None:
+                self.add_task(task)
+                added.append(taskname)
+                continue  # for chunk
+            owntaskname = '{}.{}'.format(group.reducer_name, i)
+            owntask = OwnTask(owntaskname, reducerf, None, [taskname], 0.001 * len(chunk),
+                              datadeps=group.reducer_datadeps, batchf=reducerbatchf)
+            self.add_tasks([task, owntask])
+            added.append(owntaskname)
+        debug('Parallel: task group {}: {} params split into {} chunks', group.name, nparams, len(added))
+        self._wake_up_async()
+        return added
+
+    def _journaled_group_params(self, group: TaskGroup, journalkey: str) -> tuple[
+            list[any], list[float] | None, list[bytes | None], list[any]]:
+        # returns params still to be run, their weights and fingerprints, and outputs of the journaled ones
+        params = []
+        weights = None if group.weights is None else []
+        fingerprints = []
+        journaled = []
+        for pi, param in enumerate(group.params):
+            fingerprint = _group_param_fingerprint(param)
+            if fingerprint is not None:
+                found, out = self._journal.lookup_param(journalkey, fingerprint)
+                if found:
+                    journaled.append(out)
+                    continue  # for pi
+            params.append(param)
+            if weights is not None:
+                weights.append(group.weights[pi])
+            fingerprints.append(fingerprint)
+        if journaled:
+            debug('Parallel: task group {}: {} of {} params completed from journal', group.name, len(journaled),
+                  len(group.params))
+        return params, weights, fingerprints, journaled
+
+    def _add_journaled_group_outs(self, group: TaskGroup, outs: list[any]) -> str:
+        # journaled outputs go to the reducer (or to dependents) as one more chunk, without running anything
+        if group.reducer is None:
+            taskname = '{}.journaled'.format(group.name)
+            self.add_task(OwnTask(taskname, lambda _: outs, None, [], 0.001))
+            return taskname
+        owntaskname = '{}.journaled'.format(group.reducer_name)
+        self.add_task(OwnTask(owntaskname, lambda _: group.reducer(outs), None, [], 0.001 * len(outs),
+                              datadeps=group.reducer_datadeps))
+        return owntaskname
 
     def replace_task_placeholder(self, task: Task) -> None:
         assert task.name in self._all_task_nodes
-        assert task.name in self._pending_task_nodes
-        oldtasknode = self._pending_task_nodes[task.name]
+        oldtasknode = self._all_task_nodes[task.name]
         assert oldtasknode.state == _TaskGraphNodeState.Pending
         assert isinstance(oldtasknode.task, TaskPlaceholder)
-        children = self._pending_task_nodes[task.name].children
-        del self._pending_task_nodes[task.name]
+        self._n_pending -= 1
         del self._all_task_nodes[task.name]
+        self._not_done_task_names.remove(task.name)
         self.add_task(task)
-        assert task.name in self._pending_task_nodes
-        assert len(self._pending_task_nodes[task.name].children) == 0
-        self._pending_task_nodes[task.name].children = children
-        debug('Parallel: replaced task placeholder {}, inherited {} children'.format(task.name, len(children)))
+        newtasknode = self._all_task_nodes[task.name]
+        assert newtasknode.state == _TaskGraphNodeState.Pending
+        assert len(newtasknode.child_list()) == 0
+        for stack, _ in self._publication_holds.values():
+            stack[:] = [newtasknode if n is oldtasknode else n for n in stack]
+        for ch in oldtasknode.child_list():
+            newtasknode.append_child(ch)
+            # children read outputs of their parents, so they have to refer to the new node
+            if ch.parents is oldtasknode:
+                ch.parents = newtasknode
+            elif not isinstance(ch.parents, _TaskGraphNode):
+                ch.parents = tuple(newtasknode if p is oldtasknode else p for p in ch.parents)
+        debug('Parallel: replaced task placeholder {}, inherited {} children', task.name,
+              len(newtasknode.child_list()))
+
+    # admission control: ready task which doesn't fit into resource budget, goes to _resource_blocked_nodes,
+    #                    and scheduler goes on with smaller ones; blocked tasks are moved back to ready ones
+    #                    when running tasks release enough resources. Task exceeding the budget by itself
+    #                    is admitted only when nobody else is using the same resource
+
+    def _fits(self, need: tuple[int, int, int]) -> bool:
+        for i in range(len(need)):
+            if need[i] and self._resource_budget[i] and self._resources_in_use[i] \
+                    and self._resources_in_use[i] + need[i] > self._resource_budget[i]:
+                return False
+        return True
+
+    def _admit(self, node: _TaskGraphNode) -> bool:
+        if self._resource_budget is None:
+            return True
+        need = node.task.resources.as_tuple()
+        if not self._fits(need):
+            debug('Parallel: not enough resources for task {} yet', node.task.name)
+            self._n_resource_blocks += 1
+            self._resource_blocked_nodes.append(node)
+            return False
+        for i in range(len(need)):
+            self._resources_in_use[i] += need[i]
+        return True
+
+    def _release_resources(self, node: _TaskGraphNode) -> None:
+        if node.task.resources is None or self._resource_budget is None:
+            return
+        need = node.task.resources.as_tuple()
+        for i in range(len(need)):
+            self._resources_in_use[i] -= need[i]
+            assert self._resources_in_use[i] >= 0
+        if len(self._resource_blocked_nodes) > 0:
+            blocked = self._resource_blocked_nodes
+            self._resource_blocked_nodes = []
+            for bnode in blocked:
+                if self._fits(bnode.task.resources.as_tuple()):
+                    self._enqueue_ready_task_node(bnode)  # still may be blocked again by somebody else
+                else:
+                    self._resource_blocked_nodes.append(bnode)
 
-    def _find_best_process(self) -> int:
+    def _is_retried(self, nodes: list[_TaskGraphNode], nextnode: _TaskGraphNode) -> bool:
+        # whether nextnode cannot be added to the batch of nodes, as either of them is a retried one
+        if len(nodes) == 0:
+            return False
+        return nextnode.task.name in self._task_attempts or nodes[-1].task.name in self._task_attempts
+
+    def _has_ready_bulk_tasks(self) -> bool:
+        return len(self._ready_task_nodes_heap) > 0 or any([len(d) > 0 for d in self._process_deques])
+
+    def _find_best_process(self, avoid: int = -1, lane: int | None = None, locality: str | None = None) -> int:
+        # lane is an index within _lane_heaps, None means bulk
+        # locality, if specified, means 'only remote processes having it'
+        if lane is None:
+            lane = len(self._lane_heaps)
         best = -1
         bestf = None
         for i in range(len(self._process_requests)):
+            if i == avoid:
+                continue  # for i
+            if locality is not None:
+                if self._process_localities[i] is None or locality not in self._process_localities[i]:
+                    continue  # for i
+            elif lane > self._process_max_lane[i]:
+                continue  # for i
             if len(self._process_requests[i]) == 0:
                 return i
             elif len(self._process_requests[i]) == 1:
@@ -847,15 +2145,38 @@ class Parallel:
         return best
 
     def received_shared_return(self, sharedparam: SharedReturnParam) -> any:
-        (name, sender) = sharedparam
-        shm = shared_memory.SharedMemory(name)
-        out = pickle.loads(shm.buf)
-        self._notify_sender_shm_done(sender, name)
+        block = _ReceivedBlock(sharedparam)
+        out = _load_payload(block.buf, True)
+        block.close()
+        self._notify_sender_shm_done(sharedparam)
         return out
 
+    def received_shared_return_view(self, sharedparam: SharedReturnParam) -> SharedReturnView:
+        # zero-copy alternative to received_shared_return(), sender is notified when returned view is closed
+        block = _ReceivedBlock(sharedparam)
+
+        def onclose() -> None:
+            block.close()
+            self._notify_sender_shm_done(sharedparam)
+
+        return SharedReturnView(block.buf, onclose)
+
+    def received_shared_file_table(self, sharedparam: SharedFileTableParam) -> SharedFileTableView:
+        # sender is notified when returned view is closed
+        block = _ReceivedBlock(sharedparam)
+
+        def onclose() -> None:
+            block.close()
+            self._notify_sender_shm_done(sharedparam)
+
+        return SharedFileTableView(block.buf, onclose)
+
     def _update_weight(self, taskname: str, dt: float) -> None:
-        task = self._all_task_nodes[taskname].task
-        if task.w is None:  # if not None - no sense in saving tasks with explicitly specified weights
+        node = self._all_task_nodes[taskname]
+        task = node.task
+        if isinstance(task.w, TaskCost):
+            self._cost_model.observe(task.w, dt, node.own_weight)
+        elif task.w is None:  # if not None - no sense in saving tasks with explicitly specified weights
             oldw = self._json_weights.get(taskname)
             if oldw is None:
                 self._updated_json_weights[taskname] = dt
@@ -864,7 +2185,14 @@ class Parallel:
                                                                oldw + dt) / 2  # heuristics to get some balance between new value and history
         else:
             if abs(task.w - dt) > task.w * 0.3:  # ~30% tolerance
-                debug('Parallel: task {}: expected={:.2f}, real={:.2f}'.format(task.name, task.w, dt))
+                debug('Parallel: task {}: expected={:.2f}, real={:.2f}', task.name, task.w, dt)
+
+    def add_task_cost_family(self, family: str, per_item: float, per_unit: float) -> None:
+        # priors for TaskCost of this family, used until enough has been learned
+        self._cost_model.set_priors(family, per_item, per_unit)
+
+    def estimated_time_for_cost(self, cost: TaskCost) -> float:
+        return self._cost_model.estimate(cost)
 
     def estimated_time(self, taskname: str, defaulttime: float) -> float:
         return self._updated_json_weights.get(taskname, self._json_weights.get(taskname, defaulttime))
@@ -887,109 +2215,114 @@ class Parallel:
 
     def shutdown(self, force: bool) -> None:
         assert not self._shutting_down
-
-        if force:
-            for i in range(self._nprocesses):
-                self._processes[i].kill()
-        else:
-            for i in range(self._nprocesses):
-                self._inqueues[i].put(None)
-        # self.logq.put(None) - moved to join_all() to prevent processes hanging because of unread log messages
-        # print('Parallel: shutting down')
-        self._logq.put(EndOfRegularLog())
+        if not force:  # shared pool outlives us; for our own pool, it is just before processes exit
+            self._flush_released_blocks()
+        if self._owns_pool or force:  # after forced shutdown, shared pool is not usable anymore
+            self._pool.shutdown(force)
         self._shutting_down = True
 
     def join_all(self, force: bool) -> None:
         assert self._shutting_down
         assert not self._has_joined
 
-        # read late log messages from logq; if we don't read them, processes may not terminate
-        # while True:
-        #   try:
-        #        record = self.logq.get(False)
-        #        (procnum, t, rec) = record
-        #        assert isinstance(rec, logging.LogRecord)
-        #        _patch_log_rec(rec, procnum, t)
-        #        log_record(rec)
-        #    except QueueEmpty:
-        #        break
-
-        # for i in range(len(self.inqueues)):
-        #    j = 0
-        #    while not self.inqueues[i].empty():
-        #        self.inqueues[i].get()
-        #        j += 1
-        #    if j != 0:
-        #        alert('{} unread messages from process #{}, skipped'.format(j,i+1))
-        #
-
-        if not force:
-            n = 0
-            while not all(self._procrunningconfirmed):
-                if n == 0:
-                    info(
-                        'Parallel: joinAll(): waiting for all processes to confirm start before joining to avoid not started yet join race')
-                    n = 1
-                got = self._outq.get()
-                if isinstance(got, ProcessStarted):
-                    self._procrunningconfirmed[got.proc_num] = True
-                    # debug('Parallel: joinAll(): process #{} confirmed as started',got.procnum+1)
-
-        teol0 = time.perf_counter()
-        endoflog = self._out_logq.get()
-        assert endoflog is None
-        dteol = time.perf_counter() - teol0
+        self._stop_threads(force)
+        self._metrics.remove_collector(self._collect_metrics)
+        dteol = self._pool.sync_log()
         if self._old_logging_hook is not False:
             set_logging_hook(self._old_logging_hook)
             self._old_logging_hook = False
             # debug() should go after set_logging_hook()
             info_or_perf_warn(dteol > 0.05,
-                              'Parallel: after waiting for {:.2f}s for log thread to process its queue, setting logging hook back to {}'.format(
-                                  dteol, repr(self._old_logging_hook)))
+                              'Parallel: after waiting for {:.2f}s for log thread to process its queue, setting logging hook back to {}',
+                              dteol, repr(self._old_logging_hook))
         else:
-            info_or_perf_warn(dteol > 0.05,
-                              'Parallel: took {:.2f}s to wait for log thread to process its queue'.format(dteol))
+            info_or_perf_warn(dteol > 0.05, 'Parallel: took {:.2f}s to wait for log thread to process its queue', dteol)
         # print('synced with log thread')
 
-        info('All processes confirmed as started, waiting for joins')
-        for i in range(self._nprocesses):
-            self._processes[i].join()
-            debug('Process #{} joined'.format(i + 1))
-
-        self._logq.put(None)  # moved here to prevent processes hanging because of unread log messages
-        self._logthread.join()
+        if self._owns_pool or force:
+            self._pool.join_all(force)
+        self._pool.detach(self)
         self._has_joined = True
 
+    def add_publication(self, name: str, shm: shared_memory.SharedMemory) -> None:  # used by SharedPublication
+        assert name not in self.publications
+        self.publications[name] = shm
+        curnode = self._current_task_node
+        if curnode is None:
+            curnode = _current_own_coroutine_node.get()
+        if curnode is None:
+            return  # not made by an own task, lives until the end of session
+        # publication made by an own task lives while this own task, or any task depending on it
+        #   (directly or indirectly, including pattern dependencies) or added by such tasks, is not Done;
+        #   then it is unpublished (and unlinked) automatically
+        self._publication_holds[name] = ([curnode], set())
+        self._walk_publication(name)
+
+    def _walk_publication(self, name: str) -> None:
+        # depth-first walk over the subtree, stopping at the first not-Done task, which then holds the publication
+        #   until it is Done itself; each Done task is walked through once, so the whole walk is O(subtree)
+        (stack, walked) = self._publication_holds[name]
+        while len(stack) > 0:
+            n = stack[-1]
+            if n.state != _TaskGraphNodeState.Done:
+                self._publication_anchors.setdefault(n.task.name, []).append(name)
+                return
+            stack.pop()
+            if id(n) in walked:
+                continue  # while
+            walked.add(id(n))
+            stack.extend(n.child_list())
+            stack.extend(self._publication_adders.get(n.task.name, ()))
+        debug('Parallel: no more tasks depend on publication {}, unpublishing it', name)
+        self.unpublish(name)
+
     def unpublish(self, name: str) -> None:
         pub = self.publications[name]
         pub.close()
+        _unlink_shm(pub)
         del self.publications[name]
+        if self._publication_holds.pop(name, None) is not None and not self._publication_holds:
+            self._publication_adders = {}
+        _drop_from_cache_of_published([name])  # thread-executed tasks memoize within main process
+        if self._pool.is_usable():  # children of a shared pool would otherwise keep it memoized forever
+            self._pool.drop_published_in_children([name])
 
     def _log_stats(self, dbglevel: int) -> None:
-        assert len(self._ready_task_nodes) == len(self._ready_task_nodes_heap)
+        assert self._n_ready == len(self._ready_task_nodes_heap) + self._n_queued_task_nodes()
         statsstr = 'Parallel: {} tasks, including {} pending, {}/{} ready, {} running, {} done'.format(
-            len(self._all_task_nodes), len(self._pending_task_nodes), len(self._ready_task_nodes),
-            len(self._ready_own_task_nodes), len(self._running_task_nodes), len(self._done_task_nodes))
+            len(self._all_task_nodes), self._n_pending, self._n_ready, self._n_ready_own,
+            len(self._running_task_nodes), self._n_done)
         if statsstr != self._last_log_stats_str:
             log_with_level(dbglevel, statsstr)
             self._last_log_stats_str = statsstr
 
-        if __debug__:
-            debug(
-                'Parallel: pending tasks (up to 10 first): {}'.format(repr([t for t in self._pending_task_nodes][:10])))
-            debug('Parallel: ready tasks (up to 10 first): {}'.format(repr([t for t in self._ready_task_nodes][:10])))
-            debug('Parallel: ready own tasks: {}'.format(repr([t for t in self._ready_own_task_nodes])))
-            debug(
-                'Parallel: running tasks (up to 10 first): {}'.format(repr([t for t in self._running_task_nodes][:10])))
-        assert (len(self._all_task_nodes) == len(self._pending_task_nodes)
-                + len(self._ready_task_nodes) + len(self._ready_own_task_nodes)
-                + len(self._running_task_nodes) + len(self._done_task_nodes))
+            now = time.perf_counter()  # final stats (dbglevel=INFO) always get details
+            if __debug__ and (dbglevel > logging.DEBUG
+                              or now - self._last_log_stats_details >= _LOG_STATS_DETAILS_PERIOD):
+                self._last_log_stats_details = now
+                debug('Parallel: pending tasks (up to 10 first): {}',
+                      LazyLogArg(lambda: repr(self._first_task_names_in_state(_TaskGraphNodeState.Pending, 10))))
+                debug('Parallel: ready tasks, including own ones (up to 10 first): {}',
+                      LazyLogArg(lambda: repr(self._first_task_names_in_state(_TaskGraphNodeState.Ready, 10))))
+                debug('Parallel: running tasks (up to 10 first): {}',
+                      LazyLogArg(lambda: repr([t for t in self._running_task_nodes][:10])))
+        assert (len(self._all_task_nodes) == self._n_pending + self._n_ready + self._n_ready_own
+                + len(self._running_task_nodes) + self._n_done)
+
+    def _first_task_names_in_state(self, state: _TaskGraphNodeState, n: int) -> list[str]:  # debug only
+        out = []
+        for node in self._all_task_nodes.values():
+            if node.state == state:
+                out.append(node.task.name)
+                if len(out) >= n:
+                    break  # for node
+        return out
 
     def __exit__(self, exceptiontype: Type[BaseException] | None, exceptionval: BaseException | None,
                  exceptiontraceback: TracebackType | None):
         force = False
         if exceptiontype is not None:
-            critical('Parallel: exception {}: {}'.format(str(exceptiontype), repr(exceptionval)))
+            critical('Parallel: exception {}: {}', str(exceptiontype), repr(exceptionval))
             alert('\n'.join(traceback.format_tb(exceptiontraceback)))
             force = True
 
@@ -998,9 +2331,11 @@ class Parallel:
         if not self._has_joined:
             self.join_all(force)
 
-        if log_elapsed() is not None:
+        if not self._owns_pool and not force:
+            pass  # logging thread belongs to the pool and is still running
+        elif log_elapsed() is not None:
             logpct = (log_elapsed() - log_waited()) / log_elapsed() * 100.
-            info_or_perf_warn(logpct > 50., 'Parallel: logging thread load {:.1f}%'.format(logpct))
+            info_or_perf_warn(logpct > 50., 'Parallel: logging thread load {:.1f}%', logpct)
         else:
             warn('Parallel: logging thread did not finish properly?')
 
@@ -1008,9 +2343,21 @@ class Parallel:
         for name in names:
             self.unpublish(name)
 
+        if self._journal is not None:
+            completed = exceptiontype is None and self.is_all_done()
+            info('Parallel: journal {}: {} task(s) and {} task group param(s) completed from journal{}',
+                 self._journal.fname, self._journal.nhits, self._journal.nparamhits,
+                 ', removing it' if completed else '')
+            self._journal.close(completed)
+            self._journal = None
+
+        if self._tracer is not None:  # even after exception, as it is what slow or stuck runs need most
+            self._tracer.write()
+
         if exceptiontype is None:
             if self._json_fname is not None:
                 sortedw = dict(sorted(self._updated_json_weights.items(), key=lambda item: -item[1]))
+                sortedw = {_COST_MODEL_JSON_KEY: self._cost_model.to_json()} | sortedw
                 with open(self._json_fname, 'wt', encoding='utf-8') as wf:
                     # noinspection PyTypeChecker
                     json.dump(sortedw, wf, indent=2)
@@ -0,0 +1,453 @@
+import logging
+import time
+from multiprocessing import Queue as PQueue, SimpleQueue, Process, shared_memory
+from multiprocessing.connection import wait as wait_for_sentinels
+from threading import Thread  # only for logging and watchdog!
+
+from sanguine.install.install_logging import add_logging_handler
+from sanguine.tasks._tasks_common import *
+from sanguine.tasks._tasks_logging import (_ChildProcessLogHandler, _ChildLogBatcher, create_logging_thread,
+                                           EndOfRegularLog)
+from sanguine.tasks._tasks_remote import RemoteWorker, parse_remote_address
+from sanguine.tasks._tasks_shared import (_pool_of_shared_returns, _drop_from_cache_of_published, _unlink_shm,
+                                          _share_resource_tracker, _forget_attached_slabs, _dumps_oob, _oob_size,
+                                          _write_oob, SharedReturnParam)
+
+if typing.TYPE_CHECKING:
+    from sanguine.tasks import Parallel
+
+_WATCHDOG_PERIOD: float = 0.5  # how often watchdog checks deadlines, and picks up respawned processes
+
+
+### child process side
+
+def _run_task(task: Task, depparams: list[any]) -> (Exception | None, any):
+    ndep = len(depparams)
+    assert ndep <= 3
+    try:
+        match ndep:
+            case 0:
+                out = task.f(task.param)
+            case 1:
+                out = task.f(task.param, depparams[0])
+            case 2:
+                out = task.f(task.param, depparams[0], depparams[1])
+            case 3:
+                out = task.f(task.param, depparams[0], depparams[1], depparams[2])
+            case _:
+                assert False
+        return None, out
+    except Exception as e:
+        critical('Parallel: exception in task {}: {}', task.name, e)
+        warn(traceback.format_exc())
+        return e, None
+
+
+def _process_nonown_tasks(tasks: list[list], dwait: float | None,
+                          cpuclock: Callable[[], float] = time.process_time) -> tuple[Exception | None, any]:
+    # cpuclock is time.thread_time when running within thread pool of the main process
+    # on exception, returns tasks completed before the failed one together with the exception
+    assert isinstance(tasks, list)
+    outtasks: list[tuple[str, tuple[float, float, float], any]] = []  # (name, (cpu, elapsed, started), out)
+    for tplus in tasks:
+        task = tplus[0]
+        ndep = len(task.dependencies)
+        assert len(tplus) == 1 + ndep
+        t0 = time.perf_counter()
+        tp0 = cpuclock()
+        if dwait is not None:
+            debug('after waiting for {:.2f}s, starting task {}', dwait, task.name)
+            dwait = None
+        else:
+            debug('starting task {}', task.name)
+        (ex, out) = _run_task(task, tplus[1:])
+        if ex is not None:
+            return ex, outtasks  # for tplus
+        elapsed = time.perf_counter() - t0
+        cpu = cpuclock() - tp0
+        info('done task {}, cpu/elapsed={:.2f}/{:.2f}s', task.name, cpu, elapsed)
+        outtasks.append((task.name, (cpu, elapsed, t0), out))
+        # end of for tplus
+    return None, outtasks
+
+
+def _pickle_out_tasks(outtasks: list[tuple[str, tuple[float, float, float], any]], shm: bool) -> list[
+        tuple[str, tuple[float, float, float, float], bytes | tuple[bytes, SharedReturnParam]]]:
+    # results are pickled here rather than by outq feeder thread, to account for their size and pickling time
+    #   (added to times); outq then only copies bytes
+    # large out-of-band buffers go to our shared return arena instead, bypassing outq (and its extra copies)
+    #   altogether; main process copies them out once, and releases the block as for SharedReturn
+    pickled = []
+    for name, times, out in outtasks:
+        t0 = time.perf_counter()
+        if shm:
+            data, buffers = _dumps_oob(out)
+        else:  # remote worker
+            data, buffers = pickle.dumps(out, protocol=pickle.HIGHEST_PROTOCOL), []
+        if len(buffers) > 0:
+            size = _oob_size(buffers)
+            slab, offset = _pool_of_shared_returns.alloc(size)
+            with slab.shm.buf[offset:offset + size] as buf:
+                _write_oob(buf, 0, buffers)
+            data = (data, (slab.shm.name, offset, size, current_proc_num()))
+        pickled.append((name, times + (time.perf_counter() - t0,), data))
+    return pickled
+
+
+def _task_failed(proc_num: int, tasks: list[list],
+                 outtasks: list[tuple[str, tuple[float, float, float], any]]) -> TaskFailed:
+    return TaskFailed(proc_num, tasks[len(outtasks)][0].name, outtasks,
+                      [tplus[0].name for tplus in tasks[len(outtasks) + 1:]])
+
+
+class DropPublished:  # message to child process: forget memoized from_publication() data
+    names: list[str] | None  # None means 'all'
+
+    def __init__(self, names: list[str] | None) -> None:
+        self.names = names
+
+
+def _proc_func(proc_num: int, inq: PQueue, outq: PQueue, logq, shm: bool = True,
+               loglevel: int = logging.DEBUG) -> None:
+    batcher = _ChildLogBatcher(logq)
+    try:
+        assert current_proc_num() == -1
+        set_current_proc_num(proc_num)
+
+        batcher.install(loglevel)
+        add_logging_handler(_ChildProcessLogHandler(batcher))
+
+        debug('Process started')
+        outq.put(ProcessStarted(proc_num))
+        while True:
+            batcher.flush()  # whatever was logged by the last task, goes before its results are processed
+            waitt0 = time.perf_counter()
+            msg = inq.get()
+            if msg is None:
+                break  # while True
+
+            dwait = time.perf_counter() - waitt0
+
+            if isinstance(msg, DropPublished):
+                info('after waiting for {:.2f}s, dropping {} published item(s) from cache',
+                     dwait, 'all' if msg.names is None else len(msg.names))
+                _drop_from_cache_of_published(msg.names)
+                continue  # while True
+
+            (tasks, released) = msg  # shared blocks which main process is done with, batched with the next request
+            if released is not None:
+                debug('releasing {} shared block(s)', len(released))
+                _pool_of_shared_returns.done_with(released)
+            if tasks is None:
+                info('after waiting for {:.2f}s, released {} shared block(s)', dwait, len(released))
+                continue  # while True
+
+            tasks = [pickle.loads(data) for data in tasks]  # pickled one by one by Parallel
+            ex, outtasks = _process_nonown_tasks(tasks, dwait)
+            if ex is not None:  # it is up to Parallel whether to retry it or to give up
+                outmsg = _task_failed(proc_num, tasks, _pickle_out_tasks(outtasks, shm))
+            else:
+                outmsg = (proc_num, _pickle_out_tasks(outtasks, shm))
+            batcher.flush()
+            outq.put(outmsg)
+            # end of while True
+    except Exception as e:
+        # print('Exception!:'+traceback.format_exc())
+        critical('_proc_func() internal exception: {}', repr(e))
+        warn(traceback.format_exc())
+        batcher.flush()
+        outq.put(e)
+    _pool_of_shared_returns.cleanup()
+    debug('exiting process')
+    batcher.uninstall()
+
+
+### ProcessPool
+
+def _watchdog_func(pool: "ProcessPool") -> None:
+    # detects dead children via their sentinels, and kills children which went over their deadlines
+    #   both are reported to main loop as ProcessDied
+    while not pool._stopping_watchdog:
+        processes = list(pool.processes)
+        sentinels = {p.sentinel: i for i, p in enumerate(processes) if not pool.reported_dead[i]}
+        ready = wait_for_sentinels(list(sentinels.keys()), timeout=_WATCHDOG_PERIOD)
+        if pool._stopping_watchdog:
+            break  # while True
+        for sentinel in ready:
+            i = sentinels[sentinel]
+            if pool.processes[i] is not processes[i]:
+                continue  # for sentinel, already respawned
+            pool.reported_dead[i] = True
+            processes[i].join(1.)  # sentinel may go ahead of exit code
+            pool.outq.put(ProcessDied(i, processes[i].exitcode, pool.timed_out[i], pool.cancelled[i]))
+        now = time.perf_counter()
+        for i, deadline in enumerate(pool.deadlines):  # local processes only
+            if deadline is not None and now > deadline and not pool.timed_out[i]:
+                critical('ProcessPool: process #{} went over its deadline by {:.1f}s, killing it',
+                         i + 1, now - deadline)
+                pool.timed_out[i] = True
+                pool.processes[i].kill()
+
+
+class ProcessPool:
+    # set of child processes which can be reused by several consecutive Parallel sessions:
+    #   startup cost (starting processes, importing modules, loading plugins) is paid only once,
+    #   and child-side from_publication() memoizing survives between sessions
+    # Parallel creates its own private ProcessPool if none is specified
+    # remote_agents are 'host:port' of agents (see _tasks_remote.py), each providing as many workers as it has
+    #   processes; they are numbered after local processes
+    nprocesses: int  # local ones
+    outq: PQueue
+    logq: SimpleQueue
+    out_logq: SimpleQueue
+    processes: list[Process]
+    inqueues: list[PQueue]
+    procrunningconfirmed: list[bool]  # otherwise join() on a not running yet process may hang
+    publications: dict[str, shared_memory.SharedMemory]  # semi-public: used by SharedPublication
+    remote_agents: list[str]
+    remote_authkey: bytes | None
+    remotes: list[RemoteWorker]
+    loglevel: int  # filtered in children, before anything is sent to logging thread
+    deadlines: list[float | None]  # perf_counter() per process, set by attached Parallel
+    timed_out: list[bool]
+    cancelled: list[bool]
+    reported_dead: list[bool]
+    _logthread: Thread
+    _watchdog: Thread
+    _stopping_watchdog: bool
+    _attached: "Parallel|None"
+    _started: bool
+    _shutting_down: bool
+    _has_joined: bool
+
+    def __init__(self, nproc: int = 0, remote_agents: list[str] | None = None,
+                 remote_authkey: bytes | None = None, loglevel: int | None = None) -> None:
+        assert current_proc_num() == -1
+        assert nproc >= 0
+        if nproc:
+            self.nprocesses = nproc
+        else:
+            self.nprocesses = os.cpu_count() - 1  # -1 for the master process
+        assert self.nprocesses >= 0
+        self.processes = []
+        self.inqueues = []
+        self.procrunningconfirmed = []
+        self.publications = {}
+        self.remote_agents = remote_agents if remote_agents is not None else []
+        abort_if_not(len(self.remote_agents) == 0 or remote_authkey is not None,
+                     'ProcessPool: remote agents require authkey')
+        self.remote_authkey = remote_authkey
+        self.remotes = []
+        self.loglevel = loglevel if loglevel is not None else logging.DEBUG if __debug__ else logging.INFO
+        self.deadlines = [None] * self.nprocesses
+        self.timed_out = [False] * self.nprocesses
+        self.cancelled = [False] * self.nprocesses
+        self.reported_dead = [False] * self.nprocesses
+        self._stopping_watchdog = False
+        self._attached = None
+        self._started = False
+        self._shutting_down = False
+        self._has_joined = False
+
+    def __enter__(self) -> "ProcessPool":
+        self.start()
+        return self
+
+    def start(self) -> None:
+        assert not self._started
+        info('ProcessPool: starting {} processes...', self.nprocesses)
+        self.outq = PQueue()
+        self.logq = SimpleQueue()
+        self.out_logq = SimpleQueue()
+        self._logthread = create_logging_thread(self.logq, self.out_logq)
+        self._logthread.start()
+        _share_resource_tracker()
+        for i in range(self.nprocesses):
+            inq, p = self._start_process(i)
+            self.inqueues.append(inq)
+            self.processes.append(p)
+            self.procrunningconfirmed.append(False)
+        self._watchdog = Thread(target=_watchdog_func, args=(self,), daemon=True)
+        self._watchdog.start()
+        for agent in self.remote_agents:
+            self._connect_remote_agent(agent)
+        self._started = True
+        assert len(self.inqueues) == len(self.processes)
+
+    def _connect_remote_agent(self, agent: str) -> None:
+        # first connection tells how many processes agent has, and then we're making all the others
+        address = parse_remote_address(agent)
+        worker = RemoteWorker(address, self.nworkers())
+        if not worker.connect(self.remote_authkey):
+            return  # warning is already logged, going on without this agent
+        workers = [worker]
+        for _ in range(worker.nproc - 1):
+            worker = RemoteWorker(address, self.nworkers() + len(workers))
+            if not worker.connect(self.remote_authkey):
+                break  # for _
+            workers.append(worker)
+        info('ProcessPool: agent {}: {} remote processes, localities {}', agent, len(workers),
+             sorted(worker.localities))
+        for worker in workers:
+            worker.start_receiving(self)
+        self.remotes += workers
+
+    def nworkers(self) -> int:
+        return self.nprocesses + len(self.remotes)
+
+    def is_remote(self, pidx: int) -> bool:
+        return pidx >= self.nprocesses
+
+    def _start_process(self, i: int) -> tuple[PQueue, Process]:
+        inq = PQueue()
+        p = Process(target=_proc_func, args=(i, inq, self.outq, self.logq, True, self.loglevel))
+        p.start()
+        return inq, p
+
+    def respawn(self, pidx: int) -> bool:
+        # replacing dead process with a new one, with a new inqueue (old one might have been left locked)
+        #   NB: process killed while writing to outq or logq may still leave them locked, nothing we can do about it
+        # for remote worker, reconnecting; returns False if it is gone for good
+        if self.is_remote(pidx):
+            worker = self.remotes[pidx - self.nprocesses]
+            worker.join()
+            info('ProcessPool: reconnecting remote process #{}...', pidx + 1)
+            if not worker.connect(self.remote_authkey):
+                return False
+            worker.start_receiving(self)
+            return True
+        assert self.reported_dead[pidx]
+        self.processes[pidx].join()
+        _forget_attached_slabs(pidx, True)  # dead process didn't unlink its slabs
+        info('ProcessPool: respawning process #{}...', pidx + 1)
+        self.inqueues[pidx], self.processes[pidx] = self._start_process(pidx)
+        self.procrunningconfirmed[pidx] = False
+        self.deadlines[pidx] = None
+        self.timed_out[pidx] = False
+        self.cancelled[pidx] = False
+        self.reported_dead[pidx] = False
+        return True
+
+    def cancel(self, pidx: int) -> None:
+        # killing local process as whatever it is running is not needed anymore, reported as ProcessDied.cancelled
+        assert not self.is_remote(pidx)
+        self.cancelled[pidx] = True
+        self.processes[pidx].kill()
+
+    def is_usable(self) -> bool:
+        return self._started and not self._shutting_down
+
+    def is_shutting_down(self) -> bool:
+        return self._shutting_down
+
+    def attach(self, parallel: "Parallel") -> None:
+        abort_if_not(self.is_usable(), 'ProcessPool: attaching to a pool which is not running')
+        abort_if_not(self._attached is None, 'ProcessPool: only one Parallel at a time can be attached')
+        self._attached = parallel
+
+    def detach(self, parallel: "Parallel") -> None:
+        assert self._attached is parallel
+        self._attached = None
+
+    def process_started(self, proc_num: int) -> None:
+        self.procrunningconfirmed[proc_num] = True
+
+    def send(self, pidx: int, msg: any) -> None:
+        if self.is_remote(pidx):
+            self.remotes[pidx - self.nprocesses].put(msg)
+        else:
+            self.inqueues[pidx].put(msg)
+
+    def sync_log(self) -> float:
+        # waits until logging thread processes everything logged so far
+        teol0 = time.perf_counter()
+        self.logq.put(EndOfRegularLog())
+        endoflog = self.out_logq.get()
+        assert endoflog is None
+        return time.perf_counter() - teol0
+
+    def drop_published_in_children(self, names: list[str] | None) -> None:
+        for i in range(self.nprocesses):
+            self.send(i, DropPublished(names))
+
+    def add_publication(self, name: str, shm: shared_memory.SharedMemory) -> None:  # used by SharedPublication
+        assert name not in self.publications
+        self.publications[name] = shm
+
+    def unpublish(self, name: str) -> None:  # for publications made against the pool itself
+        pub = self.publications[name]
+        pub.close()
+        _unlink_shm(pub)
+        del self.publications[name]
+        _drop_from_cache_of_published([name])  # thread-executed tasks memoize within main process
+        if self.is_usable():
+            self.drop_published_in_children([name])
+
+    def invalidate_published(self, names: list[str] | None = None) -> None:
+        # explicit invalidation of child-side memoized from_publication() data; None means 'everything'
+        assert self._attached is None
+        self.drop_published_in_children(names)
+
+    def shutdown(self, force: bool) -> None:
+        assert not self._shutting_down
+        self._stopping_watchdog = True  # exiting processes are not dead ones
+
+        if force:
+            for i in range(self.nprocesses):
+                self.processes[i].kill()
+        else:
+            for i in range(self.nprocesses):
+                self.inqueues[i].put(None)
+        for worker in self.remotes:  # even on force, we cannot kill them, just asking to exit asap
+            try:
+                worker.put(None)
+            except OSError:
+                pass  # already gone
+        # self.logq.put(None) - moved to join_all() to prevent processes hanging because of unread log messages
+        # print('Parallel: shutting down')
+        self._shutting_down = True
+
+    def join_all(self, force: bool) -> None:
+        assert self._shutting_down
+        assert not self._has_joined
+
+        if not force:
+            n = 0
+            while not all(self.procrunningconfirmed):
+                if n == 0:
+                    info(
+                        'Parallel: joinAll(): waiting for all processes to confirm start before joining to avoid not started yet join race')
+                    n = 1
+                got = self.outq.get()
+                if isinstance(got, ProcessStarted):
+                    self.procrunningconfirmed[got.proc_num] = True
+                    # debug('Parallel: joinAll(): process #{} confirmed as started',got.procnum+1)
+
+        self._watchdog.join()
+        info('All processes confirmed as started, waiting for joins')
+        for i in range(self.nprocesses):
+            self.processes[i].join()
+            debug('Process #{} joined', i + 1)
+        _forget_attached_slabs(None, force)  # processes which exited normally have unlinked their slabs themselves
+        if not force:  # otherwise, receiving threads are daemons, and may be left behind
+            for worker in self.remotes:
+                worker.join()
+
+        self.logq.put(None)  # moved here to prevent processes hanging because of unread log messages
+        self._logthread.join()
+        self._has_joined = True
+
+    def close(self, force: bool = False) -> None:
+        if not self._started or self._has_joined:
+            return
+        names = [name for name in self.publications]
+        for name in names:
+            self.unpublish(name)
+        if not self._shutting_down:
+            self.shutdown(force)
+        self.sync_log()
+        self.join_all(force)
+
+    def __exit__(self, exceptiontype: Type[BaseException] | None, exceptionval: BaseException | None,
+                 exceptiontraceback: TracebackType | None):
+        self.close(exceptiontype is not None)
@@ -0,0 +1,153 @@
+# remote worker agents: ProcessPool may have, in addition to its own child processes, worker processes
+#   running on other machines (or just started separately), connected over TCP via multiprocessing.connection
+# usage (on worker machine): SANGUINE_TASKS_AUTHKEY=... py -m sanguine.tasks._tasks_agent <host:port> [nproc] [locality...]
+#   agent runs the same sanguine code, and has to be started from the same directory as the main process
+#   localities are arbitrary strings (such as 'downloads'), Task.locality tells which ones the task needs
+# NB: remote tasks cannot use shared memory (SharedReturn, SharedPublication etc.), their outputs are just pickled;
+#     also Task.timeout doesn't apply to them, and task functions must be importable by agent (not from __main__)
+import time
+from multiprocessing import Process
+from multiprocessing.connection import Client, Connection, Listener
+from threading import Lock, Thread
+
+from sanguine.tasks._tasks_common import *
+
+if typing.TYPE_CHECKING:
+    from sanguine.tasks import ProcessPool
+
+REMOTE_AUTHKEY_ENV: str = 'SANGUINE_TASKS_AUTHKEY'
+
+
+class _RemoteHello:  # main process -> agent, first message over each connection
+    def __init__(self, proc_num: int) -> None:
+        self.proc_num = proc_num
+
+
+class _RemoteWelcome:  # agent -> main process
+    def __init__(self, nproc: int, localities: list[str]) -> None:
+        self.nproc = nproc
+        self.localities = localities
+
+
+class _RemoteLogRecord:  # remote worker -> main process, as log batches go over the same connection
+    def __init__(self, record: any) -> None:  # _LogBatch
+        self.record = record
+
+
+def parse_remote_address(address: str) -> tuple[str, int]:
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+### remote side
+
+class _ConnInQueue:  # just enough of PQueue for _proc_func()
+    def __init__(self, conn: Connection) -> None:
+        self.conn = conn
+
+    def get(self) -> any:
+        return self.conn.recv()
+
+
+class _ConnOutQueue:
+    def __init__(self, conn: Connection, islog: bool, lock: Lock) -> None:
+        self.conn = conn
+        self.islog = islog
+        self.lock = lock  # log batches are sent from their own thread
+
+    def put(self, msg: any) -> None:
+        with self.lock:
+            self.conn.send(_RemoteLogRecord(msg) if self.islog else msg)
+
+
+def _remote_proc_func(proc_num: int, conn: Connection) -> None:
+    from sanguine.tasks._tasks_pool import _proc_func
+    lock = Lock()
+    _proc_func(proc_num, _ConnInQueue(conn), _ConnOutQueue(conn, False, lock), _ConnOutQueue(conn, True, lock), False)
+    conn.close()
+
+
+def run_agent(address: tuple[str, int], authkey: bytes, nproc: int, localities: list[str]) -> None:
+    # serves forever, each connection from main process gets its own worker process
+    with Listener(address, authkey=authkey) as listener:
+        info('Agent: listening on {}:{}, {} processes, localities {}', address[0], address[1], nproc, localities)
+        while True:
+            try:
+                conn = listener.accept()
+                hello = conn.recv()
+                abort_if_not(isinstance(hello, _RemoteHello))
+                conn.send(_RemoteWelcome(nproc, localities))
+            except Exception as e:  # including failed authentication
+                warn('Agent: cannot accept connection: {}', e)
+                continue  # while True
+            info('Agent: starting worker process #{}', hello.proc_num + 1)
+            p = Process(target=_remote_proc_func, args=(hello.proc_num, conn), daemon=True)
+            p.start()
+            conn.close()  # child has its own copy
+
+
+### main process side
+
+class RemoteWorker:
+    # one remote worker process, as seen by ProcessPool; it duck-types as inqueue of a local process
+    address: tuple[str, int]
+    proc_num: int
+    localities: frozenset[str]
+    nproc: int  # of the whole agent
+    conn: Connection | None
+    _receiver: Thread | None
+
+    def __init__(self, address: tuple[str, int], proc_num: int) -> None:
+        self.address = address
+        self.proc_num = proc_num
+        self.localities = frozenset()
+        self.nproc = 0
+        self.conn = None
+        self._receiver = None
+
+    def connect(self, authkey: bytes) -> bool:
+        try:
+            conn = Client(self.address, authkey=authkey)
+            conn.send(_RemoteHello(self.proc_num))
+            welcome = conn.recv()
+        except Exception as e:
+            warn('ProcessPool: cannot connect to agent {}:{}: {}', self.address[0], self.address[1], e)
+            return False
+        assert isinstance(welcome, _RemoteWelcome)
+        self.conn = conn
+        self.localities = frozenset(welcome.localities)
+        self.nproc = welcome.nproc
+        return True
+
+    def start_receiving(self, pool: "ProcessPool") -> None:
+        self._receiver = Thread(target=_remote_receiver_func, args=(pool, self), daemon=True)
+        self._receiver.start()
+
+    def put(self, msg: any) -> None:
+        self.conn.send(msg)
+
+    def join(self) -> None:
+        if self._receiver is not None:
+            self._receiver.join()
+            self._receiver = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def _remote_receiver_func(pool: "ProcessPool", worker: RemoteWorker) -> None:
+    # moves whatever remote worker sends, to outq and logq of the pool, as if it came from a local child
+    while True:
+        try:
+            got = worker.conn.recv()
+        except (EOFError, OSError):
+            if not pool.is_shutting_down():
+                pool.outq.put(ProcessDied(worker.proc_num, None, False))
+            break  # while True
+        if isinstance(got, _RemoteLogRecord):
+            batch = got.record
+            batch.clockoffset = time.perf_counter() - batch.sent  # remote clock is meaningless here
+            pool.logq.put(batch)
+        elif not isinstance(got, ProcessStarted):  # remote workers are not joined, so nobody needs it
+            pool.outq.put(got)
+
@@ -1,56 +1,219 @@
-from multiprocessing import shared_memory
+import math
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from multiprocessing import resource_tracker, shared_memory
+from threading import Lock
 
 from sanguine.common import *
+from sanguine.tasks._tasks_common import current_proc_num
 
 if typing.TYPE_CHECKING:
-    from sanguine.tasks import Parallel, current_proc_num
+    from sanguine.tasks import Parallel, ProcessPool
+
+
+### shm helpers: segment is owned (and eventually unlinked) by its creator, everybody else just attaches to it
+
+def _share_resource_tracker() -> None:
+    # to be called before starting child processes, so that all of them share our resource tracker;
+    #   otherwise, tracker of the process which merely attached to shm, would 'clean up' (and complain about)
+    #   shm which was already unlinked by its creator
+    if sys.platform != 'win32':  # no tracker for shm on Windows, it is gone with the last handle anyway
+        resource_tracker.ensure_running()
+
+
+def _attach_shm(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    return shared_memory.SharedMemory(name)  # registering it again with shared tracker is a no-op
+
+
+def _unlink_shm(shm: shared_memory.SharedMemory) -> None:
+    try:
+        shm.unlink()
+    except FileNotFoundError:  # already unlinked, e.g. by resource tracker of the creator which has died
+        pass
+
+
+### out-of-band pickling (protocol 5): large buffers (bytearray, PickleBuffer, numpy arrays etc.) are copied
+#   to shared memory as is, bypassing pickled stream; receiver may rebuild objects right over shared memory
+#   NB: plain bytes are always pickled in-band, large ones should be wrapped into pickle.PickleBuffer
+#       by the producer (see _pack_archives() in sanguine.cache.root_git_data);
+#       small buffers (such as hashes) are not worth it, and stay in-band anyway
+#   layout: nbuffers, (nbytes, readonly)[nbuffers], then buffers, each aligned
+
+_OOB_MIN_BYTES: int = 65536
+_OOB_ALIGN: int = 64
+_OOB_HEADER = struct.Struct('<q')
+_OOB_BUFFER_HEADER = struct.Struct('<qq')
+_PAYLOAD_HEADER = struct.Struct('<q')  # SharedReturn/SharedPublication: length of pickled data, then out-of-band
+
+
+def _oob_align(n: int) -> int:
+    return (n + _OOB_ALIGN - 1) // _OOB_ALIGN * _OOB_ALIGN
+
+
+def _dumps_oob(item: any) -> tuple[bytes, list[memoryview]]:
+    buffers = []
+
+    def inband(pb: pickle.PickleBuffer) -> bool:
+        mv = pb.raw()
+        if mv.nbytes < _OOB_MIN_BYTES:
+            return True
+        buffers.append(mv)
+        return False
+
+    return pickle.dumps(item, protocol=5, buffer_callback=inband), buffers
+
+
+def _oob_size(buffers: list[memoryview]) -> int:
+    size = _OOB_HEADER.size + _OOB_BUFFER_HEADER.size * len(buffers)
+    for mv in buffers:
+        size = _oob_align(size) + mv.nbytes
+    return size
+
+
+def _write_oob(buf: memoryview, pos: int, buffers: list[memoryview]) -> None:  # pos must be aligned
+    _OOB_HEADER.pack_into(buf, pos, len(buffers))
+    pos += _OOB_HEADER.size
+    for mv in buffers:
+        _OOB_BUFFER_HEADER.pack_into(buf, pos, mv.nbytes, 1 if mv.readonly else 0)
+        pos += _OOB_BUFFER_HEADER.size
+    for mv in buffers:
+        pos = _oob_align(pos)
+        buf[pos:pos + mv.nbytes] = mv
+        pos += mv.nbytes
+
+
+def _read_oob(buf: memoryview, pos: int, copy: bool) -> list[any]:
+    # with copy, buffers are independent from shared memory (bytes or bytearray, as they were);
+    #   otherwise they're views into it, valid only while it stays mapped
+    (n,) = _OOB_HEADER.unpack_from(buf, pos)
+    if n == 0:
+        return []
+    hdrpos = pos + _OOB_HEADER.size
+    pos = hdrpos + _OOB_BUFFER_HEADER.size * n
+    out = []
+    for i in range(n):
+        (nbytes, readonly) = _OOB_BUFFER_HEADER.unpack_from(buf, hdrpos + _OOB_BUFFER_HEADER.size * i)
+        pos = _oob_align(pos)
+        if copy:
+            with buf[pos:pos + nbytes] as mv:
+                out.append(bytes(mv) if readonly else bytearray(mv))
+        else:
+            out.append(buf[pos:pos + nbytes])
+        pos += nbytes
+    return out
 
 
-### SharedReturn
+def _payload_size(data: bytes, buffers: list[memoryview]) -> int:
+    return _oob_align(_PAYLOAD_HEADER.size + len(data)) + _oob_size(buffers)
 
-class SharedReturn:
-    shm: shared_memory.SharedMemory
-    closed: bool
 
-    def __init__(self, item: any):
-        data = pickle.dumps(item)
-        self.shm = shared_memory.SharedMemory(create=True, size=len(data))
-        shared = self.shm.buf
-        shared[:] = data
-        _pool_of_shared_returns.register(self)
-        self.closed = False
+def _write_payload(buf: memoryview, data: bytes, buffers: list[memoryview]) -> None:
+    _PAYLOAD_HEADER.pack_into(buf, 0, len(data))
+    buf[_PAYLOAD_HEADER.size:_PAYLOAD_HEADER.size + len(data)] = data
+    _write_oob(buf, _oob_align(_PAYLOAD_HEADER.size + len(data)), buffers)
 
-    def name(self) -> str:
-        return self.shm.name
 
-    def close(self) -> None:
-        if not self.closed:
-            self.shm.close()
-            self.closed = True
+def _load_payload(buf: memoryview, copy: bool) -> any:
+    (n,) = _PAYLOAD_HEADER.unpack_from(buf, 0)
+    buffers = _read_oob(buf, _oob_align(_PAYLOAD_HEADER.size + n), copy)
+    with buf[_PAYLOAD_HEADER.size:_PAYLOAD_HEADER.size + n] as data:
+        return pickle.loads(data, buffers=buffers)
 
-    def __del__(self) -> None:
-        self.close()
 
+### SharedReturn and SharedFileTable are blocks within per-process arena of shm slabs
+#   slabs are allocated once and reused across returns, so there is no shm_open()/mmap() per return;
+#   receiver gets (slab, offset, size, sender) and releases blocks back to the sender,
+#   batched with the next request to the sender (see Parallel._notify_sender_shm_done())
+# oversized blocks get dedicated slabs, which are unlinked as soon as the block is released
 
-class _PoolOfSharedReturns:
-    shareds: dict[str, SharedReturn]
+_ARENA_SLAB_SIZE: int = 4 * 1048576
+_ARENA_BLOCK_ALIGN: int = 64
 
-    def __init__(self) -> None:
-        self.shareds = {}
+type _SharedBlockHandle = tuple[str, int]  # slab, offset
+
+
+class _ArenaSlab:
+    __slots__ = ('shm', 'top', 'nlive', 'oversized')
+    shm: shared_memory.SharedMemory
+    top: int  # bump allocator, reset when all the blocks are released
+    nlive: int
+    oversized: bool
 
-    def register(self, shared: SharedReturn) -> None:
-        self.shareds[shared.name()] = shared
+    def __init__(self, size: int, oversized: bool) -> None:
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.top = 0
+        self.nlive = 0
+        self.oversized = oversized
 
-    def done_with(self, name: str) -> None:
-        shared = self.shareds[name]
-        shared.close()
-        del self.shareds[name]
+
+class _PoolOfSharedReturns:
+    slabs: dict[str, _ArenaSlab]
+    current: _ArenaSlab | None
+    lock: Lock  # thread-executed tasks of main process may allocate concurrently
+    n_slabs_created: int
+
+    def __init__(self) -> None:
+        self.slabs = {}
+        self.current = None
+        self.lock = Lock()
+        self.n_slabs_created = 0
+
+    def alloc(self, size: int) -> tuple[_ArenaSlab, int]:
+        size = (max(size, 1) + _ARENA_BLOCK_ALIGN - 1) // _ARENA_BLOCK_ALIGN * _ARENA_BLOCK_ALIGN
+        with self.lock:
+            slab = self.current
+            if slab is None or slab.top + size > _ARENA_SLAB_SIZE:
+                slab = self._slab_with_room(size)
+            offset = slab.top
+            slab.top += size
+            slab.nlive += 1
+            return slab, offset
+
+    def _slab_with_room(self, size: int) -> _ArenaSlab:
+        if size > _ARENA_SLAB_SIZE:
+            slab = _ArenaSlab(size, True)
+        else:
+            for slab in self.slabs.values():
+                if slab.nlive == 0 and not slab.oversized:
+                    self.current = slab
+                    return slab
+            slab = _ArenaSlab(_ARENA_SLAB_SIZE, False)
+            self.current = slab
+        self.slabs[slab.shm.name] = slab
+        self.n_slabs_created += 1
+        debug('SharedReturn: new {}slab {} of {} bytes, {} slab(s) total',
+              'oversized ' if slab.oversized else '', slab.shm.name, slab.shm.size, len(self.slabs))
+        return slab
+
+    def done_with(self, handles: list[_SharedBlockHandle]) -> None:
+        with self.lock:
+            for name, _ in handles:
+                slab = self.slabs.get(name)
+                if slab is None:  # sent by our predecessor, which has died since
+                    warn('Parallel: unknown shm={}, ignoring', name)
+                    continue  # for name
+                assert slab.nlive > 0
+                slab.nlive -= 1
+                if slab.nlive > 0:
+                    continue  # for name
+                if slab.oversized:
+                    del self.slabs[name]
+                    slab.shm.close()
+                    _unlink_shm(slab.shm)
+                else:
+                    slab.top = 0
 
     def cleanup(self) -> None:
-        for name in self.shareds:
-            shared = self.shareds[name]
-            shared.close()
-        self.shareds = {}
+        with self.lock:
+            for slab in self.slabs.values():
+                slab.shm.close()
+                _unlink_shm(slab.shm)
+            self.slabs = {}
+            self.current = None
 
     def __del__(self) -> None:
         self.cleanup()
@@ -58,12 +221,268 @@ class _PoolOfSharedReturns:
 
 _pool_of_shared_returns = _PoolOfSharedReturns()
 
-type SharedReturnParam = tuple[str, int]
+type SharedReturnParam = tuple[str, int, int, int]  # slab, offset, size, sender
+
+
+class SharedReturn:
+    slab: str
+    offset: int
+    size: int
+
+    def __init__(self, item: any):
+        data, buffers = _dumps_oob(item)
+        self.size = _payload_size(data, buffers)
+        slab, self.offset = _pool_of_shared_returns.alloc(self.size)
+        with slab.shm.buf[self.offset:self.offset + self.size] as buf:
+            _write_payload(buf, data, buffers)
+        self.slab = slab.shm.name
 
 
 def make_shared_return_param(shared: SharedReturn) -> SharedReturnParam:
     # assert _proc_num>=0
-    return shared.name(), current_proc_num()
+    return shared.slab, shared.offset, shared.size, current_proc_num()
+
+
+_attached_slabs: dict[str, tuple[shared_memory.SharedMemory, int]] = {}  # receiver side: slab->(shm, sender)
+
+
+class _ReceivedBlock:  # receiver side of SharedReturn or SharedFileTable, valid until close()
+    shm: shared_memory.SharedMemory
+    buf: memoryview
+    owned: bool
+
+    def __init__(self, sharedparam: SharedReturnParam) -> None:
+        (name, offset, size, sender) = sharedparam
+        self.owned = sender == current_proc_num()
+        if self.owned:  # returned by a thread-executed task
+            self.shm = _pool_of_shared_returns.slabs[name].shm
+        else:
+            attached = _attached_slabs.get(name)
+            if attached is None:
+                attached = (_attach_shm(name), sender)
+                _attached_slabs[name] = attached
+            self.shm = attached[0]
+        self.buf = self.shm.buf[offset:offset + size]
+
+    def close(self) -> None:
+        self.buf.release()
+        if not self.owned and self.shm.size > _ARENA_SLAB_SIZE:  # oversized slabs are not reused
+            del _attached_slabs[self.shm.name]
+            try:
+                self.shm.close()
+            except BufferError:
+                warn('SharedReturnView: value is still referenced after close(), shm={} stays mapped', self.shm.name)
+
+
+class SharedReturnView:
+    # zero-copy receiving side of SharedReturn, obtained via Parallel.received_shared_return_view():
+    #   out-of-band buffers within value are views into sender's shared memory, valid until the view is closed
+    #   (and then sender reuses the memory), so nothing of value should be kept beyond that
+    value: any
+    _on_close: Callable[[], None] | None
+
+    def __init__(self, buf: memoryview, onclose: Callable[[], None] | None) -> None:
+        self.value = _load_payload(buf, False)
+        self._on_close = onclose
+
+    def close(self) -> None:
+        self.value = None
+        if self._on_close is not None:
+            onclose = self._on_close
+            self._on_close = None
+            onclose()
+
+    def __enter__(self) -> "SharedReturnView":
+        return self
+
+    def __exit__(self, exceptiontype: Type[BaseException] | None, exceptionval: BaseException | None,
+                 exceptiontraceback: TracebackType | None):
+        self.close()
+
+
+def _forget_attached_slabs(sender: int | None, unlink: bool) -> None:
+    # when sender (None means 'all') is gone; dead senders cannot unlink their slabs themselves
+    for name, (shm, snd) in list(_attached_slabs.items()):
+        if sender is not None and snd != sender:
+            continue  # for name
+        del _attached_slabs[name]
+        try:
+            shm.close()
+        except BufferError:  # SharedFileTableView is still open, mapping will go when it is closed
+            pass
+        if unlink:
+            _unlink_shm(shm)
+
+
+### SharedFileTable: columnar, zero-pickle alternative to SharedReturn for large lists of file-like records
+#   layout: header, then offsets[n+1] (int64, into paths blob), sizes[n] (int64, -1 for None),
+#           mtimes[n] (float64, NaN for None), hash flags[n] (uint8), hashes[n*hashwidth], paths blob (utf-8)
+#   if issorted, rows are sorted by path, and SharedFileTableView.find() can look them up in place
+
+_SHARED_FILE_TABLE_HEADER = struct.Struct('<qqqqq')  # nrows, hashwidth, bloblen, isascii, issorted
+
+
+def _file_table_parts(paths: list[str], hashes: list[bytes | None], sizes: list[int | None],
+                      mtimes: list[float | None], hashwidth: int, issorted: bool) -> tuple[int, tuple]:
+    n = len(paths)
+    assert len(hashes) == n and len(sizes) == n and len(mtimes) == n
+    strblob = ''.join(paths)
+    blob = strblob.encode('utf-8')
+    isascii = len(blob) == len(strblob)  # then str offsets are the same as byte ones, and much cheaper
+    offsets = array('q', accumulate(map(len, paths) if isascii else (len(p.encode('utf-8')) for p in paths),
+                                    initial=0))
+    asizes = array('q', [-1 if sz is None else sz for sz in sizes])
+    amtimes = array('d', [math.nan if mt is None else mt for mt in mtimes])
+    noh = bytes(hashwidth)
+    hflags = bytes([0 if h is None else 1 for h in hashes])
+    hblob = b''.join([noh if h is None else h for h in hashes])
+    assert len(hblob) == n * hashwidth
+
+    parts = (_SHARED_FILE_TABLE_HEADER.pack(n, hashwidth, len(blob), 1 if isascii else 0, 1 if issorted else 0),
+             offsets, asizes, amtimes, hflags, hblob, blob)
+    return sum(len(memoryview(p).cast('B')) for p in parts), parts
+
+
+def _write_file_table_parts(buf: memoryview, parts: tuple) -> None:
+    pos = 0
+    for part in parts:
+        mv = memoryview(part).cast('B')
+        buf[pos:pos + len(mv)] = mv
+        pos += len(mv)
+
+
+class SharedFileTable:
+    slab: str
+    offset: int
+    size: int
+
+    def __init__(self, paths: list[str], hashes: list[bytes | None], sizes: list[int | None],
+                 mtimes: list[float | None], hashwidth: int = 32) -> None:
+        self.size, parts = _file_table_parts(paths, hashes, sizes, mtimes, hashwidth, False)
+        slab, self.offset = _pool_of_shared_returns.alloc(self.size)
+        with slab.shm.buf[self.offset:self.offset + self.size] as buf:
+            _write_file_table_parts(buf, parts)
+        self.slab = slab.shm.name
+
+
+type SharedFileTableParam = tuple[str, int, int, int]  # slab, offset, size, sender
+
+
+def make_shared_file_table_param(shared: SharedFileTable) -> SharedFileTableParam:
+    return shared.slab, shared.offset, shared.size, current_proc_num()
+
+
+class SharedFileTableView:
+    # reading side of SharedFileTable (and of SharedFileTablePublication), columns are views into shared memory,
+    #   nothing is unpickled; obtained via Parallel.received_shared_file_table(), should be closed
+    #   (or used as context manager) as soon as possible, as sender keeps shared memory until then
+    offsets: memoryview  # int64
+    sizes: memoryview  # int64, -1 for None
+    mtimes: memoryview  # float64, NaN for None
+    hash_flags: memoryview
+    hashes: memoryview
+    blob: memoryview
+    hashwidth: int
+    isascii: bool
+    issorted: bool
+    _n: int
+    _open: bool
+    _on_close: Callable[[], None] | None
+
+    def __init__(self, buf: memoryview, onclose: Callable[[], None] | None) -> None:
+        self._open = True
+        self._on_close = onclose
+        (n, hashwidth, bloblen, isascii, issorted) = _SHARED_FILE_TABLE_HEADER.unpack_from(buf, 0)
+        self._n = n
+        self.hashwidth = hashwidth
+        self.isascii = isascii != 0
+        self.issorted = issorted != 0
+        pos = _SHARED_FILE_TABLE_HEADER.size
+        self.offsets = buf[pos:pos + 8 * (n + 1)].cast('q')
+        pos += 8 * (n + 1)
+        self.sizes = buf[pos:pos + 8 * n].cast('q')
+        pos += 8 * n
+        self.mtimes = buf[pos:pos + 8 * n].cast('d')
+        pos += 8 * n
+        self.hash_flags = buf[pos:pos + n]
+        pos += n
+        self.hashes = buf[pos:pos + n * hashwidth]
+        pos += n * hashwidth
+        self.blob = buf[pos:pos + bloblen]
+
+    def __len__(self) -> int:
+        return self._n
+
+    def path(self, i: int) -> str:
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def paths(self) -> list[str]:
+        # decoding the whole blob at once, much faster than path(i) for all i
+        offsets = self.offsets.tolist()
+        if self.isascii:
+            strblob = str(self.blob, 'ascii')
+            return [strblob[offsets[i]:offsets[i + 1]] for i in range(self._n)]
+        blob = self.blob
+        return [str(blob[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(self._n)]
+
+    def find(self, path: str) -> int:
+        # binary search right over shared memory, O(log n) and no per-process copies; -1 if not found
+        #   utf-8 byte order is the same as code point order of str, so rows sorted as str are sorted as bytes too
+        assert self.issorted
+        key = path.encode('utf-8')
+        offsets = self.offsets
+        blob = self.blob
+        lo = 0
+        hi = self._n
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if blob[offsets[mid]:offsets[mid + 1]].tobytes() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n and blob[offsets[lo]:offsets[lo + 1]] == key:
+            return lo
+        return -1
+
+    def hash(self, i: int) -> bytes | None:
+        if not self.hash_flags[i]:
+            return None
+        return bytes(self.hashes[i * self.hashwidth:(i + 1) * self.hashwidth])
+
+    def size(self, i: int) -> int | None:
+        sz = self.sizes[i]
+        return None if sz < 0 else sz
+
+    def mtime(self, i: int) -> float | None:
+        mt = self.mtimes[i]
+        return None if math.isnan(mt) else mt
+
+    def all_hashes(self) -> list[bytes | None]:
+        w = self.hashwidth
+        hashes = bytes(self.hashes)
+        return [hashes[i * w:(i + 1) * w] if flag else None for i, flag in enumerate(bytes(self.hash_flags))]
+
+    def all_sizes(self) -> list[int | None]:
+        return [None if sz < 0 else sz for sz in self.sizes.tolist()]
+
+    def all_mtimes(self) -> list[float | None]:
+        return [None if math.isnan(mt) else mt for mt in self.mtimes.tolist()]
+
+    def close(self) -> None:
+        if not self._open:
+            return
+        for mv in (self.offsets, self.sizes, self.mtimes, self.hash_flags, self.hashes, self.blob):
+            mv.release()
+        self._open = False
+        if self._on_close is not None:
+            self._on_close()
+
+    def __enter__(self) -> "SharedFileTableView":
+        return self
+
+    def __exit__(self, exceptiontype: Type[BaseException] | None, exceptionval: BaseException | None,
+                 exceptiontraceback: TracebackType | None):
+        self.close()
 
 
 ### SharedPublication
@@ -72,15 +491,48 @@ class SharedPublication:
     shm: shared_memory.SharedMemory
     closed: bool
 
-    def __init__(self, parallel: "Parallel", item: any):
-        data = pickle.dumps(item)
-        self.shm = shared_memory.SharedMemory(create=True, size=len(data))
-        shared = self.shm.buf
-        shared[:] = data
+    def __init__(self, parallel: "Parallel|ProcessPool", item: any):
+        # publications made against ProcessPool live until ProcessPool.unpublish(),
+        #   ones made against Parallel by an own task live while there are not-done tasks depending on this own task
+        #   (see Parallel.add_publication()), other ones made against Parallel are unpublished when its session ends
+        data, buffers = _dumps_oob(item)
+        self.shm = shared_memory.SharedMemory(create=True, size=_payload_size(data, buffers))
+        _write_payload(self.shm.buf, data, buffers)
+        name = self.shm.name
+        debug('SharedPublication: {}, {} out-of-band buffer(s)', name, len(buffers))
+        parallel.add_publication(name, self.shm)
+        self.closed = False
+
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self) -> None:
+        if not self.closed:
+            self.shm.close()
+            self.closed = True
+
+    def __del__(self) -> None:
+        self.close()
+
+
+class SharedFileTablePublication:
+    # publication of file records as a SharedFileTable sorted by path; children look records up in place
+    #   (SharedFileTableView.find()), without unpickling or copying the whole thing into each of them
+    #   lifetime is the same as for SharedPublication; read via from_file_table_publication()
+    shm: shared_memory.SharedMemory
+    closed: bool
+
+    def __init__(self, parallel: "Parallel|ProcessPool", paths: list[str], hashes: list[bytes | None],
+                 sizes: list[int | None], mtimes: list[float | None], hashwidth: int = 32) -> None:
+        order = sorted(range(len(paths)), key=paths.__getitem__)
+        size, parts = _file_table_parts([paths[i] for i in order], [hashes[i] for i in order],
+                                        [sizes[i] for i in order], [mtimes[i] for i in order], hashwidth, True)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        with self.shm.buf[:size] as buf:
+            _write_file_table_parts(buf, parts)
         name = self.shm.name
-        debug('SharedPublication: {}'.format(name))
-        assert name not in parallel.publications
-        parallel.publications[name] = self.shm
+        debug('SharedFileTablePublication: {}, {} rows, {} bytes', name, len(paths), size)
+        parallel.add_publication(name, self.shm)
         self.closed = False
 
     def name(self) -> str:
@@ -98,19 +550,64 @@ class SharedPublication:
 type SharedPubParam = str
 
 
-def make_shared_publication_param(shared: SharedPublication) -> str:
+def make_shared_publication_param(shared: SharedPublication | SharedFileTablePublication) -> str:
     return shared.name()
 
 
 _cache_of_published: dict[str, any] = {}  # per-process cache of published data
+# memoized data keeps its out-of-band buffers right over publication's shared memory, which stays mapped until dropped
+_published_shms: dict[str, shared_memory.SharedMemory] = {}
+_lingering_published_shms: list[shared_memory.SharedMemory] = []  # dropped, but still referenced by somebody
 
 
 def from_publication(sharedparam: SharedPubParam, should_cache=True) -> any:
     found = _cache_of_published.get(sharedparam)
     if found is not None:
         return found
-    shm = shared_memory.SharedMemory(sharedparam)
-    out = pickle.loads(shm.buf)
+    shm = _attach_shm(sharedparam)
+    out = _load_payload(shm.buf, not should_cache)
     if should_cache:
         _cache_of_published[sharedparam] = out
+        _published_shms[sharedparam] = shm
+    else:
+        shm.close()
+    return out
+
+
+def _close_published_shms(shms: list[shared_memory.SharedMemory]) -> None:
+    global _lingering_published_shms
+    lingering = []
+    for shm in _lingering_published_shms + shms:
+        try:
+            shm.close()
+        except BufferError:  # objects rebuilt over it are still alive, it will be retried next time
+            lingering.append(shm)
+    _lingering_published_shms = lingering
+
+
+def from_file_table_publication(sharedparam: SharedPubParam) -> SharedFileTableView:
+    # always cached, as it costs next to nothing; the view is closed when publication is dropped from cache
+    found = _cache_of_published.get(sharedparam)
+    if found is not None:
+        return found
+    shm = _attach_shm(sharedparam)
+    out = SharedFileTableView(shm.buf, shm.close)
+    _cache_of_published[sharedparam] = out
     return out
+
+
+def _drop_from_cache_of_published(names: list[str] | None) -> None:
+    global _cache_of_published, _published_shms
+    if names is None:
+        dropped = list(_cache_of_published.values())
+        _cache_of_published = {}
+        shms = list(_published_shms.values())
+        _published_shms = {}
+    else:
+        dropped = [_cache_of_published.pop(name) for name in names if name in _cache_of_published]
+        shms = [_published_shms.pop(name) for name in names if name in _published_shms]
+    for item in dropped:
+        if isinstance(item, SharedFileTableView):
+            item.close()
+    del dropped
+    _close_published_shms(shms)
@@ -0,0 +1,100 @@
+# execution trace of Parallel runs, written in Chrome trace-event format (chrome://tracing, ui.perfetto.dev)
+#   per task: when it became ready, when it was dispatched, when it started and ended within its worker,
+#   and when its results were received by main process; also worker, payload sizes, and ready_by,
+#   i.e. dependency which completed last and made the task ready (this is enough to restore critical path)
+# critical path and idle gaps: py -m sanguine.tasks._tasks_critical_path <trace.json>
+import json
+import time
+
+from sanguine.tasks._tasks_common import *
+
+
+class _TaskTraceRecord:
+    __slots__ = ('ready', 'ready_by', 'dispatched', 'started', 'ended', 'received', 'worker', 'attempts',
+                 'request_bytes', 'response_bytes')
+    ready: float  # all times are perf_counter(), which is shared by all the processes on the same box
+    ready_by: str | None
+    dispatched: float | None
+    started: float | None
+    ended: float | None
+    received: float | None
+    worker: str | None
+    attempts: int
+    request_bytes: int  # pickled, only for child processes
+    response_bytes: int
+
+    def __init__(self, ready: float, ready_by: str | None) -> None:
+        self.ready = ready
+        self.ready_by = ready_by
+        self.dispatched = self.started = self.ended = self.received = None
+        self.worker = None
+        self.attempts = 0
+        self.request_bytes = self.response_bytes = 0
+
+
+class _TaskTracer:
+    fname: str
+    records: dict[str, _TaskTraceRecord]
+    started: float
+
+    def __init__(self, fname: str) -> None:
+        self.fname = fname
+        self.records = {}
+        self.started = time.perf_counter()
+
+    def ready(self, name: str, ready_by: str | None) -> None:
+        if name not in self.records:  # retried tasks keep their original ready time
+            self.records[name] = _TaskTraceRecord(time.perf_counter(), ready_by)
+
+    def dispatched(self, name: str, worker: str, t: float) -> None:
+        rec = self.records[name]
+        rec.dispatched = t
+        rec.worker = worker
+        rec.attempts += 1
+
+    def pickled(self, name: str, request_bytes: int) -> None:
+        self.records[name].request_bytes = request_bytes
+
+    def completed(self, name: str, started: float | None, elapsed: float, response_bytes: int) -> None:
+        # started is None when worker clock is not comparable to ours (remote workers)
+        rec = self.records[name]
+        rec.received = time.perf_counter()
+        rec.started = started if started is not None else rec.received - elapsed
+        rec.ended = rec.started + elapsed
+        rec.response_bytes = response_bytes
+
+    def _us(self, t: float) -> float:
+        return round((t - self.started) * 1e6, 1)
+
+    def write(self) -> None:
+        # overlapping tasks of the same worker (thread pool, event loop) go to separate rows
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': 0, 'tid': 0, 'args': {'name': 'Parallel'}}]
+        rowends: dict[str, list[float]] = {}
+        tids: dict[tuple[str, int], int] = {}
+        done = [(name, rec) for name, rec in self.records.items() if rec.received is not None]
+        for name, rec in sorted(done, key=lambda x: x[1].started):
+            ends = rowends.setdefault(rec.worker, [])
+            row = 0
+            while row < len(ends) and ends[row] > rec.started:
+                row += 1
+            if row == len(ends):
+                ends.append(rec.ended)
+            else:
+                ends[row] = rec.ended
+            tid = tids.get((rec.worker, row))
+            if tid is None:
+                tid = len(tids) + 1
+                tids[(rec.worker, row)] = tid
+            events.append({'name': name, 'cat': 'task', 'ph': 'X', 'pid': 0, 'tid': tid, 'ts': self._us(rec.started),
+                           'dur': round((rec.ended - rec.started) * 1e6, 1),
+                           'args': {'worker': rec.worker, 'ready': self._us(rec.ready), 'ready_by': rec.ready_by,
+                                    'dispatched': self._us(rec.dispatched), 'received': self._us(rec.received),
+                                    'attempts': rec.attempts, 'request_bytes': rec.request_bytes,
+                                    'response_bytes': rec.response_bytes}})
+        for (worker, row), tid in sorted(tids.items()):
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': tid,
+                           'args': {'name': worker if row == 0 else '{} [{}]'.format(worker, row)}})
+
+        with open(self.fname, 'wt', encoding='utf-8') as wf:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, wf)
+        info('Parallel: trace of {} task(s) written to {}', len(done), self.fname)